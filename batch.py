@@ -0,0 +1,354 @@
+"""Compare many CSV file pairs at once.
+
+Pairs are taken from two directories, matching files by relative path, or
+from a manifest CSV with file1 and file2 columns (and optionally name).
+They run in a process pool, largest first, while their estimated memory
+fits a global limit. Each changed pair gets a result file in the output
+directory, and summary.json and summary.csv list every pair's status and
+counts.
+
+    python batch.py release-1 release-2 --output-dir diffs
+    python batch.py --manifest pairs.csv --output-dir diffs --memory-limit 8G --jobs 4
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from cli import DATA_TYPES, parse_columns, write_results
+from compressed import detect_compression
+from csvdiff import ENGINES, compare_csv_files, drop_header_row
+from exporters import EXPORT_FORMATS
+
+# File names compared when pairing two directories
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.bz2", ".csv.xz")
+
+# Peak memory of a comparison per byte of input, measured for the memory
+# engine, and the assumed size of compressed input once decompressed
+MEMORY_PER_BYTE = 8
+COMPRESSION_RATIO = 5
+
+# Default global memory limit for all running comparisons
+DEFAULT_MEMORY_LIMIT = 4 * 1024 * 1024 * 1024
+
+# Bytes hashed at a time when checking for identical files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# File name extension of the result files, by output format
+RESULT_EXTENSIONS = {
+    "text": "txt",
+    "csv": "csv",
+    "json": "json",
+    "jsonl": "jsonl"
+}
+
+# Columns of summary.csv
+SUMMARY_FIELDS = ["name", "status", "modified", "only_in_file1", "only_in_file2",
+                  "seconds", "result", "file1", "file2", "error"]
+
+# Size suffixes accepted by --memory-limit
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+def pair_directories(dir1, dir2):
+    """Pair CSV files by relative path; returns (pairs, names missing on either side).
+
+    Pairs are (name, file1, file2) with the relative path as name.
+    """
+    files1 = csv_files(dir1)
+    files2 = csv_files(dir2)
+    pairs = [
+        (name, os.path.join(dir1, name), os.path.join(dir2, name))
+        for name in sorted(files1 & files2)
+    ]
+    return pairs, sorted(files1 - files2), sorted(files2 - files1)
+
+def csv_files(directory):
+    """Relative paths of the CSV files below a directory."""
+    found = set()
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.lower().endswith(CSV_SUFFIXES):
+                found.add(os.path.relpath(os.path.join(root, name), directory))
+    return found
+
+def read_manifest(manifest_path):
+    """Read (name, file1, file2) pairs from a manifest CSV.
+
+    Relative paths are taken from the manifest's directory. Without a name
+    column pairs are named after file1's relative path. Names are made
+    relative paths below the output directory, see result_name.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    pairs = []
+    with open(manifest_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        if not reader.fieldnames or not {"file1", "file2"} <= set(reader.fieldnames):
+            raise ValueError(f"{manifest_path} needs file1 and file2 columns")
+        for row in reader:
+            name = result_name(row.get("name") or row["file1"])
+            pairs.append((name, os.path.join(base, row["file1"]), os.path.join(base, row["file2"])))
+
+    names = [name for name, _, _ in pairs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"{manifest_path} names several pairs the same")
+    return pairs
+
+def result_name(name):
+    """A pair name as a relative path that stays below the output directory.
+
+    Drives, leading separators and ".." components are dropped, so a
+    manifest cannot place result files elsewhere.
+    """
+    path = os.path.splitdrive(os.path.normpath(name))[1].replace("\\", "/")
+    parts = [part for part in path.split("/") if part not in ("", ".", "..")]
+    if not parts:
+        raise ValueError(f"pair name '{name}' is not a file name")
+    return os.path.join(*parts)
+
+def estimate_memory(file_path):
+    """Rough peak memory needed to compare a file, from its size on disk."""
+    size = os.path.getsize(file_path)
+    if detect_compression(file_path):
+        size *= COMPRESSION_RATIO
+    return size * MEMORY_PER_BYTE
+
+def file_digest(file_path):
+    """BLAKE2b digest of a file's bytes, as hex."""
+    digest = hashlib.blake2b()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def compare_pair(name, file1_path, file2_path, output_dir, key_columns, name_columns, output_format, engine):
+    """Compare one pair in a worker process and return its summary entry.
+
+    Files of the same size are hashed first and identical ones are not
+    compared. file2's header row is not counted as a row only in file2, so
+    files with the same rows are "unchanged". Errors are reported in the
+    entry instead of raised, so one bad pair does not stop the batch.
+    """
+    start = time.perf_counter()
+    entry = {"name": name, "file1": file1_path, "file2": file2_path}
+    try:
+        if os.path.getsize(file1_path) == os.path.getsize(file2_path):
+            digest1 = file_digest(file1_path)
+            if digest1 == file_digest(file2_path):
+                entry.update(status="identical", digest=digest1)
+                return entry
+
+        differences, headers = compare_csv_files(file1_path, file2_path, key_columns, name_columns, engine=engine)
+        drop_header_row(differences, file2_path, key_columns)
+        entry.update({data_type: len(differences[data_type]) for data_type in DATA_TYPES})
+        entry["status"] = "changed" if any(differences.values()) else "unchanged"
+
+        if entry["status"] == "changed":
+            result = f"{result_name(name)}.diff.{RESULT_EXTENSIONS[output_format]}"
+            result_path = os.path.join(output_dir, result)
+            os.makedirs(os.path.dirname(result_path), exist_ok=True)
+            with open(result_path, 'w', newline='' if output_format == "csv" else None, encoding='utf-8') as f:
+                write_results(f, differences, headers, DATA_TYPES, output_format, name_columns)
+            entry["result"] = result
+    except Exception as e:
+        entry.update(status="error", error=f"{type(e).__name__}: {e}")
+    finally:
+        entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+def run_batch(pairs, output_dir, key_columns=(0,), name_columns=None, output_format="json",
+              engine="memory", jobs=None, memory_limit=DEFAULT_MEMORY_LIMIT, report=None):
+    """Compare (name, file1, file2) pairs in a process pool and return their entries.
+
+    Pairs start largest first whenever a worker is free and their memory
+    estimate fits next to the running ones; when nothing fits, the next
+    smaller pair that does is started instead. A pair over the whole limit
+    runs on its own. report, if given, is called with each finished entry.
+
+    A worker that dies, e.g. killed for using too much memory, breaks the
+    pool, failing every pair running in it. Those pairs run again in a new
+    pool, each on its own, and only a pair breaking the pool a second time
+    is reported as an error.
+    """
+    key_columns = list(key_columns)
+    name_columns = list(name_columns) if name_columns is not None else key_columns
+    jobs = jobs or os.cpu_count() or 1
+
+    pending = []
+    entries = []
+    for name, file1_path, file2_path in pairs:
+        try:
+            estimate = estimate_memory(file1_path) + estimate_memory(file2_path)
+        except OSError as e:
+            entries.append({"name": name, "file1": file1_path, "file2": file2_path,
+                            "status": "error", "error": f"{type(e).__name__}: {e}"})
+            continue
+        pending.append((estimate, name, file1_path, file2_path))
+    pending.sort(key=lambda task: task[0], reverse=True)
+
+    running = {}
+    # Pairs running again after breaking a pool with others
+    retried = set()
+    pool = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        while pending or running:
+            reserved = sum(task[0] for task in running.values())
+            while pending and len(running) < jobs:
+                if retried.intersection(running.values()):
+                    # A retried pair runs alone, so a pool broken again is its fault
+                    break
+                task = next(
+                    (task for task in pending if task not in retried and reserved + task[0] <= memory_limit),
+                    None
+                )
+                if task is None:
+                    if running:
+                        break
+                    task = pending[0]
+
+                pending.remove(task)
+                _, name, file1_path, file2_path = task
+                future = pool.submit(
+                    compare_pair, name, file1_path, file2_path, output_dir,
+                    key_columns, name_columns, output_format, engine
+                )
+                running[future] = task
+                reserved += task[0]
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            finished = [(future, running.pop(future)) for future in done]
+            if any(isinstance(future.exception(), BrokenProcessPool) for future, _ in finished):
+                # Every pair still running failed with the pool; those not
+                # retried yet run again
+                pool.shutdown(wait=True)
+                finished.extend(running.items())
+                running.clear()
+                pool = ProcessPoolExecutor(max_workers=jobs)
+
+                failed = [
+                    task for future, task in finished
+                    if isinstance(future.exception(), BrokenProcessPool) and task not in retried
+                ]
+                retried.update(failed)
+                pending.extend(failed)
+                pending.sort(key=lambda task: task[0], reverse=True)
+                finished = [(future, task) for future, task in finished if task not in failed]
+
+            for future, task in finished:
+                entry = finished_entry(future, task)
+                entries.append(entry)
+                if report is not None:
+                    report(entry)
+    finally:
+        pool.shutdown(wait=True)
+
+    entries.sort(key=lambda entry: entry["name"])
+    return entries
+
+def finished_entry(future, task):
+    """Summary entry of a finished pair, also when its worker process died."""
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        _, name, file1_path, file2_path = task
+        return {"name": name, "file1": file1_path, "file2": file2_path, "status": "error",
+                "error": f"{type(e).__name__}: {e}"}
+
+def write_summary(output_dir, entries):
+    """Write summary.json and summary.csv with the entries and their totals."""
+    totals = {}
+    for entry in entries:
+        totals[entry["status"]] = totals.get(entry["status"], 0) + 1
+    for data_type in DATA_TYPES:
+        totals[data_type] = sum(entry.get(data_type, 0) for entry in entries)
+
+    with open(os.path.join(output_dir, "summary.json"), 'w', encoding='utf-8') as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "totals": totals, "pairs": entries}, f, indent=2)
+        f.write("\n")
+
+    with open(os.path.join(output_dir, "summary.csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(entries)
+    return totals
+
+def format_entry(entry):
+    """One line describing a finished pair."""
+    line = f"{entry['name']}: {entry['status']}"
+    if entry["status"] in ("changed", "unchanged"):
+        line += ", " + ", ".join(f"{data_type}: {entry[data_type]}" for data_type in DATA_TYPES)
+    if "error" in entry:
+        line += f" ({entry['error']})"
+    return line
+
+def parse_size(value):
+    """Parse a byte count with an optional K, M, G or T suffix."""
+    text = value.strip().upper().rstrip("B")
+    try:
+        if text and text[-1] in SIZE_UNITS:
+            return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+        return int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a size like 512M or 4G, got '{value}'")
+
+def main(argv=None):
+    """Run a batch comparison from the command line.
+
+    Exits with 0 when no pair differs, 1 when some do and 2 when a pair
+    failed or is missing on one side.
+    """
+    parser = argparse.ArgumentParser(description="Compare many CSV file pairs in parallel")
+    parser.add_argument("dir1", nargs="?", help="directory of first (old) files")
+    parser.add_argument("dir2", nargs="?", help="directory of second (new) files")
+    parser.add_argument("--manifest", help="CSV file with file1, file2 and optional name columns")
+    parser.add_argument("--output-dir", required=True, help="where result files and the summary go")
+    parser.add_argument("-k", "--key-columns", type=parse_columns, default=[0],
+                        help="comma separated key column indices (default: 0)")
+    parser.add_argument("-n", "--name-columns", type=parse_columns, default=None,
+                        help="comma separated columns used to name rows (default: key columns)")
+    parser.add_argument("-f", "--format", choices=sorted(EXPORT_FORMATS), default="json",
+                        help="result file format (default: json)")
+    parser.add_argument("-e", "--engine", choices=sorted(ENGINES), default="memory",
+                        help="comparison engine (default: memory)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("--memory-limit", type=parse_size, default=DEFAULT_MEMORY_LIMIT,
+                        help="estimated memory all running comparisons may use (default: 4G)")
+    args = parser.parse_args(argv)
+
+    if bool(args.manifest) == bool(args.dir1 and args.dir2):
+        parser.error("give either two directories or --manifest")
+
+    try:
+        if args.manifest:
+            pairs = read_manifest(args.manifest)
+            missing = []
+        else:
+            pairs, only1, only2 = pair_directories(args.dir1, args.dir2)
+            missing = (
+                [{"name": name, "status": "only_in_dir1", "file1": os.path.join(args.dir1, name)} for name in only1] +
+                [{"name": name, "status": "only_in_dir2", "file2": os.path.join(args.dir2, name)} for name in only2]
+            )
+        os.makedirs(args.output_dir, exist_ok=True)
+    except (OSError, ValueError) as e:
+        print(f"batch: {e}", file=sys.stderr)
+        return 2
+
+    entries = run_batch(
+        pairs, args.output_dir, args.key_columns, args.name_columns, args.format, args.engine,
+        args.jobs, args.memory_limit, report=lambda entry: print(format_entry(entry), file=sys.stderr)
+    )
+    entries = sorted(entries + missing, key=lambda entry: entry["name"])
+    totals = write_summary(args.output_dir, entries)
+
+    print(", ".join(f"{name}: {count}" for name, count in totals.items()), file=sys.stderr)
+    if totals.get("error") or missing:
+        return 2
+    return 1 if totals.get("changed") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""Reproducible benchmarks for the comparison engines.
+
+Synthetic file pairs are generated deterministically from their parameters
+and a seed, so the same case always produces the same bytes. Each engine
+runs in a fresh interpreter so its peak RSS is measured on its own.
+
+    python benchmark.py run --preset small --output results.json
+    python benchmark.py run --rows 1000000 --engines memory,sorted --baseline results.json
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from csvdiff import ENGINES, compare_csv_files
+from stats import ComparisonStats, peak_rss_kb
+
+# Version of the results file layout
+RESULTS_VERSION = 1
+
+# Engines benchmarked by default; snapshot is left out since it reuses
+# the sidecar indexes of earlier runs
+DEFAULT_ENGINES = ["memory", "sorted", "partitioned", "parallel", "fingerprint", "columnar"]
+
+# Parameters of a generated case; rates are fractions of the first file's rows
+DEFAULT_CASE = {
+    "rows": 100000,
+    "columns": 10,
+    "cell_width": 12,
+    "change_rate": 0.05,
+    "insert_rate": 0.01,
+    "delete_rate": 0.01,
+    "sorted_keys": False,
+    "quote_rate": 0.0,
+    "seed": 1
+}
+
+# Named sets of row counts
+PRESETS = {
+    "small": [10000, 100000],
+    "medium": [1000000],
+    "large": [10000000],
+    "huge": [50000000]
+}
+
+# Distinct cell values drawn from per case; changed cells use a second pool
+VALUE_POOL_SIZE = 4096
+
+# Slowdown, as a fraction, reported as a regression against the baseline
+DEFAULT_THRESHOLD = 0.10
+
+def case_name(case):
+    """Short stable name of a case, also used for its data files."""
+    return (
+        f"r{case['rows']}-c{case['columns']}-w{case['cell_width']}"
+        f"-ch{case['change_rate']}-in{case['insert_rate']}-de{case['delete_rate']}"
+        f"-{'sorted' if case['sorted_keys'] else 'shuffled'}-q{case['quote_rate']}-s{case['seed']}"
+    )
+
+def value_pool(rng, size, width, quote_rate):
+    """Random cell values; a quote_rate share of them needs CSV quoting."""
+    letters = "abcdefghijklmnopqrstuvwxyz0123456789"
+    pool = []
+    for _ in range(size):
+        value = "".join(rng.choice(letters) for _ in range(width))
+        if rng.random() < quote_rate:
+            # Commas and quotes force csv.writer to quote the cell
+            middle = width // 2
+            value = value[:middle] + rng.choice([',', '"', ', "']) + value[middle + 1:]
+        pool.append(value)
+    return pool
+
+def permuted(i, n, multiplier):
+    """Position i of a fixed permutation of range(n), without building it."""
+    return (i * multiplier + 7) % n
+
+def permutation_multiplier(n):
+    """A multiplier coprime with n, making permuted() a bijection."""
+    multiplier = 2654435761 % n or 1
+    while math.gcd(multiplier, n) != 1:
+        multiplier += 1
+    return multiplier
+
+def generate_case(case, directory):
+    """Write the file pair of a case unless it already exists.
+
+    Returns the two paths. The second file is the first with a share of
+    rows changed in one cell, deleted or newly inserted.
+    """
+    name = case_name(case)
+    path1 = os.path.join(directory, f"{name}-a.csv")
+    path2 = os.path.join(directory, f"{name}-b.csv")
+    if os.path.exists(path1) and os.path.exists(path2):
+        return path1, path2
+
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(case["seed"])
+    rows = case["rows"]
+    width = case["columns"] - 1
+    values = value_pool(rng, VALUE_POOL_SIZE, case["cell_width"], case["quote_rate"])
+    changed_values = value_pool(rng, VALUE_POOL_SIZE, case["cell_width"], case["quote_rate"])
+    multiplier = permutation_multiplier(rows) if rows else 1
+
+    with open(path1 + ".tmp", 'w', newline='') as f1, open(path2 + ".tmp", 'w', newline='') as f2:
+        writer1 = csv.writer(f1)
+        writer2 = csv.writer(f2)
+        headers = ["id"] + [f"col{i}" for i in range(1, case["columns"])]
+        writer1.writerow(headers)
+        writer2.writerow(headers)
+
+        for i in range(rows):
+            key = i if case["sorted_keys"] else permuted(i, rows, multiplier)
+            row = [f"{key:012d}"] + [values[rng.randrange(VALUE_POOL_SIZE)] for _ in range(width)]
+            writer1.writerow(row)
+
+            x = rng.random()
+            if x < case["delete_rate"]:
+                pass
+            elif x < case["delete_rate"] + case["change_rate"] and width:
+                row[1 + rng.randrange(width)] = changed_values[rng.randrange(VALUE_POOL_SIZE)]
+                writer2.writerow(row)
+            else:
+                writer2.writerow(row)
+
+            # A new key sorts right after this row's key, so sorted files stay sorted
+            if rng.random() < case["insert_rate"]:
+                new_row = [f"{key:012d}+"] + [values[rng.randrange(VALUE_POOL_SIZE)] for _ in range(width)]
+                writer2.writerow(new_row)
+
+    os.replace(path1 + ".tmp", path1)
+    os.replace(path2 + ".tmp", path2)
+    return path1, path2
+
+def measure(file1_path, file2_path, engine):
+    """Run one comparison in this process and return its measurements."""
+    stats = ComparisonStats()
+    start = time.perf_counter()
+    differences, _ = compare_csv_files(file1_path, file2_path, [0], [0], engine=engine, stats=stats)
+    counts = {kind: len(records) for kind, records in differences.items()}
+    seconds = time.perf_counter() - start
+
+    return {
+        "seconds": round(seconds, 6),
+        "peak_rss_kb": peak_rss_kb(),
+        "phases": {phase.name: round(phase.seconds, 6) for phase in stats.phases.values()},
+        "differences": counts
+    }
+
+def measure_in_subprocess(file1_path, file2_path, engine):
+    """Measure a comparison in a fresh interpreter and return its results."""
+    command = [sys.executable, os.path.abspath(__file__), "measure", file1_path, file2_path, "--engine", engine]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit status {completed.returncode}"}
+    return json.loads(completed.stdout)
+
+def run_benchmarks(cases, engines, data_dir, repeat=1):
+    """Benchmark every engine on every case and return the result entries.
+
+    With repeat > 1 the fastest run of each engine is kept.
+    """
+    results = []
+    for case in cases:
+        path1, path2 = generate_case(case, data_dir)
+        total_rows = count_rows(path1) + count_rows(path2)
+        total_bytes = os.path.getsize(path1) + os.path.getsize(path2)
+
+        for engine in engines:
+            runs = [measure_in_subprocess(path1, path2, engine) for _ in range(repeat)]
+            failed = [run for run in runs if "error" in run]
+            entry = {"case": case_name(case), "engine": engine, "params": case}
+
+            if failed:
+                entry["error"] = failed[0]["error"]
+            else:
+                best = min(runs, key=lambda run: run["seconds"])
+                seconds = max(best["seconds"], 1e-9)
+                entry.update(best)
+                entry["rows"] = total_rows
+                entry["bytes"] = total_bytes
+                entry["rows_per_second"] = round(total_rows / seconds, 1)
+                entry["mb_per_second"] = round(total_bytes / seconds / (1024 * 1024), 3)
+
+            results.append(entry)
+            print(format_entry(entry), file=sys.stderr)
+    return results
+
+def count_rows(file_path):
+    """Number of records in a CSV file, excluding the header."""
+    with open(file_path, 'r', newline='') as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+def format_entry(entry):
+    """One line summary of a result entry."""
+    if "error" in entry:
+        return f"{entry['case']} {entry['engine']}: failed: {entry['error']}"
+    rss = f"{entry['peak_rss_kb'] / 1024:,.1f} MB" if entry["peak_rss_kb"] is not None else "n/a"
+    return (
+        f"{entry['case']} {entry['engine']}: {entry['seconds']:.3f} s, "
+        f"{entry['rows_per_second']:,.0f} rows/s, {entry['mb_per_second']:.1f} MB/s, peak RSS {rss}"
+    )
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare results with a baseline results document.
+
+    Returns one line per case and engine found in both, and whether any of
+    them is slower than the baseline by more than threshold.
+    """
+    previous = {
+        (entry["case"], entry["engine"]): entry
+        for entry in baseline.get("results", []) if "error" not in entry
+    }
+    lines = []
+    regressed = False
+
+    for entry in results:
+        old = previous.get((entry["case"], entry["engine"]))
+        if old is None or "error" in entry:
+            continue
+
+        ratio = entry["seconds"] / max(old["seconds"], 1e-9)
+        slower = ratio > 1 + threshold
+        regressed = regressed or slower
+        line = f"{entry['case']} {entry['engine']}: {old['seconds']:.3f} s -> {entry['seconds']:.3f} s ({ratio:.2f}x)"
+        if old.get("peak_rss_kb") and entry.get("peak_rss_kb"):
+            line += f", peak RSS {entry['peak_rss_kb'] / old['peak_rss_kb']:.2f}x"
+        lines.append(line + (" REGRESSION" if slower else ""))
+
+    return lines, regressed
+
+def build_cases(args):
+    """Cases to run from the command line options."""
+    row_counts = PRESETS[args.preset] if args.rows is None else args.rows
+    cases = []
+    for rows in row_counts:
+        case = dict(DEFAULT_CASE)
+        case.update(
+            rows=rows, columns=args.columns, cell_width=args.cell_width,
+            change_rate=args.change_rate, insert_rate=args.insert_rate, delete_rate=args.delete_rate,
+            sorted_keys=args.sorted_keys, quote_rate=args.quote_rate, seed=args.seed
+        )
+        cases.append(case)
+    return cases
+
+def parse_list(value, convert=str):
+    """Parse a comma separated list."""
+    return [convert(item) for item in value.split(",") if item.strip()]
+
+def main(argv=None):
+    """Command line interface to run benchmarks and compare them to a baseline."""
+    parser = argparse.ArgumentParser(description="Benchmark the CSV comparison engines")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="generate cases and benchmark the engines")
+    run.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    run.add_argument("--rows", type=lambda value: parse_list(value, int), default=None,
+                     help="comma separated row counts, overriding the preset")
+    run.add_argument("--columns", type=int, default=DEFAULT_CASE["columns"])
+    run.add_argument("--cell-width", type=int, default=DEFAULT_CASE["cell_width"])
+    run.add_argument("--change-rate", type=float, default=DEFAULT_CASE["change_rate"])
+    run.add_argument("--insert-rate", type=float, default=DEFAULT_CASE["insert_rate"])
+    run.add_argument("--delete-rate", type=float, default=DEFAULT_CASE["delete_rate"])
+    run.add_argument("--sorted-keys", action="store_true", help="write both files in key order")
+    run.add_argument("--quote-rate", type=float, default=DEFAULT_CASE["quote_rate"],
+                     help="share of cell values that need CSV quoting")
+    run.add_argument("--seed", type=int, default=DEFAULT_CASE["seed"])
+    run.add_argument("--engines", type=parse_list, default=DEFAULT_ENGINES,
+                     help="comma separated engines (default: %(default)s)")
+    run.add_argument("--repeat", type=int, default=1, help="runs per engine, the fastest is kept")
+    run.add_argument("--data-dir", default="benchmark-data", help="where generated files are kept")
+    run.add_argument("-o", "--output", help="write the results as JSON to this file")
+    run.add_argument("--baseline", help="results JSON file to compare against")
+    run.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                     help="slowdown reported as a regression (default: %(default)s)")
+
+    one = commands.add_parser("measure", help="measure a single comparison, printing JSON")
+    one.add_argument("file1")
+    one.add_argument("file2")
+    one.add_argument("--engine", choices=sorted(ENGINES), default="memory")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "measure":
+        print(json.dumps(measure(args.file1, args.file2, args.engine)))
+        return 0
+
+    unknown = [engine for engine in args.engines if engine not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines: {', '.join(unknown)}")
+
+    results = run_benchmarks(build_cases(args), args.engines, args.data_dir, args.repeat)
+    document = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            lines, regressed = compare_to_baseline(results, json.load(f), args.threshold)
+        for line in lines:
+            print(line)
+        return 1 if regressed else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import os
+import threading
+from collections import OrderedDict
+
+from csvdiff import compare_csv_files, iter_csv_differences, read_csv_data
+from streaming import estimate_row_size
+
+# Default memory cap for everything held by a ComparisonCache
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+
+# Rough per-object overheads used to estimate the size of diff records;
+# a change is one column index
+RECORD_OVERHEAD = 100
+CHANGE_OVERHEAD = 8
+
+# Records sampled to estimate the size of sequences building records on access
+SIZE_SAMPLE_RECORDS = 100
+
+def file_signature(file_path):
+    """Identify a file's current contents by path, size and modification time."""
+    st = os.stat(file_path)
+    return os.path.abspath(file_path), st.st_size, st.st_mtime_ns
+
+class ComparisonCache:
+    """LRU cache of parsed files and diff results, bounded by memory."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+
+    def get(self, key):
+        """Return a cached value and mark it recently used, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        """Store a value, evicting least recently used entries to fit."""
+        with self.lock:
+            self.discard(key)
+            if size > self.max_bytes:
+                return
+
+            self.entries[key] = (value, size)
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.used_bytes -= evicted_size
+
+    def discard(self, key):
+        """Remove a single entry if present."""
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.used_bytes -= entry[1]
+
+    def clear(self):
+        """Remove every entry."""
+        with self.lock:
+            self.entries.clear()
+            self.used_bytes = 0
+
+    def read_csv_data(self, file_path, key_columns, read_header=True, progress=None, columns=None):
+        """Cached version of read_csv_data."""
+        key = (
+            "file", file_signature(file_path), tuple(key_columns), read_header,
+            None if columns is None else tuple(columns)
+        )
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        data, headers = read_csv_data(file_path, key_columns, read_header, progress, columns)
+        size = sum(estimate_row_size(row) for row in data.values())
+        self.put(key, (data, headers), size)
+        return data, headers
+
+    def compare(self, file1_path, file2_path, key_columns, name_columns=None, engine="memory",
+                progress=None, stats=None, **options):
+        """Cached version of compare_csv_files.
+
+        The result does not depend on name_columns, so changing display
+        columns is served from the cache. A result served from the cache
+        shows up in stats as a single "cached result" phase.
+        """
+        key = diff_key(file1_path, file2_path, key_columns, engine, options)
+        cached = self.get(key)
+        if cached is not None:
+            record_cached(stats, engine, file1_path, file2_path, cached)
+            return cached
+
+        if engine == "memory":
+            options["cache"] = self
+
+        result = compare_csv_files(
+            file1_path, file2_path, key_columns, name_columns, engine=engine, progress=progress,
+            stats=stats, **options
+        )
+        self.put(key, result, estimate_differences_size(result[0]))
+        return result
+
+    def iter_differences(self, file1_path, file2_path, key_columns, progress=None, stats=None, **options):
+        """Cached version of iter_csv_differences.
+
+        A cached memory engine result is yielded as ("done", result) right
+        away; otherwise the final result is cached for compare as well.
+        """
+        key = diff_key(file1_path, file2_path, key_columns, "memory", options)
+        cached = self.get(key)
+        if cached is not None:
+            record_cached(stats, "memory", file1_path, file2_path, cached)
+            yield "done", cached
+            return
+
+        for kind, payload in iter_csv_differences(
+            file1_path, file2_path, key_columns, progress=progress, stats=stats, **options
+        ):
+            if kind == "done":
+                self.put(key, payload, estimate_differences_size(payload[0]))
+            yield kind, payload
+
+def diff_key(file1_path, file2_path, key_columns, engine, options):
+    """Cache key of a comparison result."""
+    return (
+        "diff", file_signature(file1_path), file_signature(file2_path),
+        tuple(key_columns), engine,
+        tuple(sorted((name, hashable(value)) for name, value in options.items()))
+    )
+
+def record_cached(stats, engine, file1_path, file2_path, result):
+    """Record a result served from the cache as a "cached result" phase."""
+    if stats is None:
+        return
+    stats.engine = engine
+    stats.files = [file1_path, file2_path]
+    with stats.phase("cached result") as phase:
+        phase.rows += sum(len(records) for records in result[0].values())
+
+def hashable(value):
+    """Turn list option values, like column selections, into tuples."""
+    if isinstance(value, (list, set)):
+        return tuple(value)
+    return value
+
+def estimate_differences_size(differences):
+    """Cheap estimate of the memory used by a differences structure.
+
+    Lists are summed record by record. Other sequences, like the columnar
+    engine's, may build each record on access, so the size of an evenly
+    spaced sample of records is extrapolated instead.
+    """
+    size = 0
+    for records in differences.values():
+        if isinstance(records, list) or len(records) <= SIZE_SAMPLE_RECORDS:
+            size += sum(estimate_record_size(record) for record in records)
+        else:
+            step = len(records) / SIZE_SAMPLE_RECORDS
+            sample = sum(estimate_record_size(records[int(i * step)]) for i in range(SIZE_SAMPLE_RECORDS))
+            size += sample * len(records) // SIZE_SAMPLE_RECORDS
+    return size
+
+def estimate_record_size(record):
+    """Cheap estimate of the memory used by one diff record."""
+    size = RECORD_OVERHEAD + estimate_row_size(record.row)
+    if "changes" in record:
+        size += estimate_row_size(record.row2) + CHANGE_OVERHEAD * len(record.columns)
+    return size
@@ -0,0 +1,289 @@
+import csv
+import difflib
+import filecmp
+import hashlib
+import io
+import locale
+import mmap
+import os
+import zlib
+
+from csvdiff import RowRecord, compare_in_memory, modified_record, read_headers
+from fingerprint import ends_quoted
+from mapped_reader import LONE_CR, ascii_compatible
+
+# Rows per chunk: a chunk ends after a row whose hash has all of
+# BOUNDARY_MASK's bits set, giving about BOUNDARY_MASK + 1 rows on average
+BOUNDARY_MASK = 63
+MIN_CHUNK_ROWS = 8
+MAX_CHUNK_ROWS = 1024
+
+# Bytes split into lines at a time while chunking
+BLOCK_SIZE = 1024 * 1024
+
+# Below this share of matched chunks skipping does not pay for the
+# chunking pass and the files are compared in memory
+MIN_MATCHED_SHARE = 0.5
+
+# Bytes that can surround a whole field, and the number of raw matches of
+# a value checked before assuming it does occur as a field
+FIELD_BOUNDARY = b',\r\n"'
+MAX_FIELD_MATCHES = 100000
+
+def compare_chunked(file1_path, file2_path, key_columns):
+    """Compare two CSV files, skipping chunks that are identical in both.
+
+    Both files are cut into content-defined chunks at row boundaries, so an
+    inserted or deleted row only changes the chunk it is in. Chunks with
+    the same digest are matched in file order and only the rows of the
+    unmatched ones are parsed and diffed. Keys of those rows can still occur
+    in matched chunks; such rows are looked up with a cheap key scan so the
+    result is the same as the memory engine's. Files with identical bytes
+    are recognized without chunking.
+
+    Files in encodings other than ASCII supersets or with NUL bytes or lone
+    carriage returns are compared in memory instead.
+    """
+    encoding = locale.getpreferredencoding(False)
+    if not ascii_compatible(encoding):
+        return compare_in_memory(file1_path, file2_path, key_columns)
+
+    headers = read_headers(file1_path)
+
+    with open(file1_path, 'rb') as f1, open(file2_path, 'rb') as f2:
+        mm1 = map_file(f1)
+        mm2 = map_file(f2)
+        try:
+            if mm1 is None or mm2 is None:
+                return compare_in_memory(file1_path, file2_path, key_columns)
+
+            if identical_files(file1_path, file2_path):
+                differences = identical_differences(mm2, key_columns, encoding)
+                if differences is not None:
+                    return differences, headers
+
+            chunks1 = chunk_rows(mm1)
+            chunks2 = chunk_rows(mm2)
+            matched1, matched2 = match_chunks(chunks1, chunks2)
+            if len(matched1) < MIN_MATCHED_SHARE * max(len(chunks1), len(chunks2)):
+                return compare_in_memory(file1_path, file2_path, key_columns)
+
+            # Keys of unmatched rows, plus the key of file2's header row,
+            # which is data in file2 but not in file1
+            found1 = {}
+            found2 = {}
+            collect_rows(mm1, chunks1, matched1, key_columns, encoding, found1, skip_first=True)
+            collect_rows(mm2, chunks2, matched2, key_columns, encoding, found2)
+            candidates = set(found1) | set(found2)
+            candidates.update(first_key(mm2, chunks2, key_columns, encoding))
+
+            scan_matched(mm1, chunks1, matched1, key_columns, encoding, candidates, found1, skip_first=True)
+            scan_matched(mm2, chunks2, matched2, key_columns, encoding, candidates, found2)
+        finally:
+            for mm in (mm1, mm2):
+                if mm is not None:
+                    mm.close()
+
+    return diff_found(found1, found2, headers), headers
+
+def map_file(f):
+    """Memory-map an open binary file, or None if it cannot be scanned."""
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return None
+
+    if mm.find(b"\0") != -1 or LONE_CR.search(mm) is not None:
+        mm.close()
+        return None
+    return mm
+
+def identical_files(file1_path, file2_path):
+    """Whether both files have the same size and bytes."""
+    if os.path.getsize(file1_path) != os.path.getsize(file2_path):
+        return False
+    return filecmp.cmp(file1_path, file2_path, shallow=False)
+
+def identical_differences(mm, key_columns, encoding):
+    """Differences of a file compared with itself, or None if unsure.
+
+    Only the header row differs, since file2's header is read as data. It
+    is reported unless its key also belongs to a data row, which is ruled
+    out when a key value does not occur as a field after the header.
+    """
+    header_end = mm.find(b"\n") + 1 or len(mm)
+    if mm.find(b'"', 0, header_end) != -1:
+        # Quoted values may span lines or differ from their raw bytes
+        return None
+    header = next(csv.reader(io.StringIO(mm[:header_end].decode(encoding), newline='')), [])
+    key = tuple(header[i] for i in key_columns)
+
+    if all(occurs_as_field(mm, value.encode(encoding), header_end) for value in key):
+        return None
+    return {"only_in_file1": [], "only_in_file2": [RowRecord(key, header)], "modified": []}
+
+def occurs_as_field(mm, value, start):
+    """Whether value may be a whole field after start; True when unsure."""
+    if not value:
+        return True
+
+    matches = 0
+    position = mm.find(value, start)
+    while position != -1:
+        before = mm[position - 1:position]
+        after = mm[position + len(value):position + len(value) + 1]
+        # An empty after means the end of the file
+        if before in FIELD_BOUNDARY and after in FIELD_BOUNDARY:
+            return True
+        matches += 1
+        if matches >= MAX_FIELD_MATCHES:
+            return True
+        position = mm.find(value, position + 1)
+    return False
+
+def chunk_rows(mm):
+    """Cut a mapped file into content-defined chunks of whole rows.
+
+    Returns (digest, start, end, first_row) tuples. A chunk can only end at
+    a newline outside quotes, which is where csv.reader ends a row.
+    """
+    chunks = []
+    size = len(mm)
+    quoted = mm.find(b'"') != -1
+    in_quotes = False
+    start = 0
+    row = 0
+    first_row = 0
+    offset = 0
+
+    while offset < size:
+        block_end = mm.find(b"\n", min(offset + BLOCK_SIZE, size) - 1)
+        block_end = size if block_end == -1 else block_end + 1
+        lines = mm[offset:block_end].split(b"\n")
+        if lines[-1] == b"":
+            lines.pop()
+
+        for line in lines:
+            offset += len(line) + 1
+            if quoted and (in_quotes or b'"' in line):
+                in_quotes = ends_quoted(line, in_quotes)
+            if in_quotes:
+                continue
+
+            row += 1
+            rows = row - first_row
+            if rows >= MAX_CHUNK_ROWS or (
+                rows >= MIN_CHUNK_ROWS and zlib.crc32(line) & BOUNDARY_MASK == BOUNDARY_MASK
+            ):
+                end = min(offset, size)
+                chunks.append((chunk_digest(mm, start, end), start, end, first_row))
+                start = end
+                first_row = row
+        offset = block_end
+
+    if start < size:
+        # The last row may have no newline or an unterminated quote
+        chunks.append((chunk_digest(mm, start, size), start, size, first_row))
+    return chunks
+
+def chunk_digest(mm, start, end):
+    """Digest of the bytes of a chunk."""
+    return hashlib.blake2b(mm[start:end], digest_size=16).digest()
+
+def match_chunks(chunks1, chunks2):
+    """Indices of the chunks that are identical and in the same order in both files."""
+    matcher = difflib.SequenceMatcher(
+        None, [chunk[0] for chunk in chunks1], [chunk[0] for chunk in chunks2], autojunk=False
+    )
+    matched1 = set()
+    matched2 = set()
+    for i, j, size in matcher.get_matching_blocks():
+        matched1.update(range(i, i + size))
+        matched2.update(range(j, j + size))
+    return matched1, matched2
+
+def chunk_text(mm, chunk, encoding):
+    """Decoded text of a chunk."""
+    return mm[chunk[1]:chunk[2]].decode(encoding)
+
+def collect_rows(mm, chunks, matched, key_columns, encoding, found, skip_first=False):
+    """Parse the rows of unmatched chunks into found."""
+    for index, chunk in enumerate(chunks):
+        if index in matched:
+            continue
+        reader = csv.reader(io.StringIO(chunk_text(mm, chunk, encoding), newline=''))
+        for position, row in enumerate(reader, chunk[3]):
+            if skip_first and position == 0:
+                continue
+            record_row(found, tuple(row[i] for i in key_columns), position, row)
+
+def scan_matched(mm, chunks, matched, key_columns, encoding, candidates, found, skip_first=False):
+    """Add the rows of matched chunks whose keys are in candidates to found."""
+    split_at = max(key_columns) + 1
+    for index in sorted(matched):
+        chunk = chunks[index]
+        text = chunk_text(mm, chunk, encoding)
+
+        if '"' in text:
+            rows = csv.reader(io.StringIO(text, newline=''))
+            for position, row in enumerate(rows, chunk[3]):
+                key = tuple(row[i] for i in key_columns)
+                if key in candidates and not (skip_first and position == 0):
+                    record_row(found, key, position, row)
+            continue
+
+        # Without quotes every line is a row and splitting up to the last
+        # key column is enough to find the key
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+        lines = text.split("\n")
+        if text.endswith("\n"):
+            lines.pop()
+        for position, line in enumerate(lines, chunk[3]):
+            fields = line.split(",", split_at) if line else []
+            key = tuple(fields[i] for i in key_columns)
+            if key in candidates and not (skip_first and position == 0):
+                record_row(found, key, position, line.split(","))
+
+def record_row(found, key, position, row):
+    """Track the first position and the last row of a key."""
+    entry = found.get(key)
+    if entry is None:
+        found[key] = [position, position, row]
+        return
+    if position < entry[0]:
+        entry[0] = position
+    if position > entry[1]:
+        entry[1] = position
+        entry[2] = row
+
+def first_key(mm, chunks, key_columns, encoding):
+    """Key of the first row of a chunked file, as a list of at most one key."""
+    if not chunks:
+        return []
+    row = next(csv.reader(io.StringIO(chunk_text(mm, chunks[0], encoding), newline='')), None)
+    if row is None:
+        return []
+    return [tuple(row[i] for i in key_columns)]
+
+def diff_found(found1, found2, headers):
+    """Build the differences structure from the tracked keys, in file order."""
+    only1 = []
+    only2 = []
+    modified = []
+
+    for key, (position, _, row1) in found1.items():
+        entry = found2.get(key)
+        if entry is None:
+            only1.append((position, RowRecord(key, row1)))
+        elif row1 != entry[2]:
+            modified.append((position, modified_record(key, row1, entry[2], headers)))
+
+    for key, (position, _, row2) in found2.items():
+        if key not in found1:
+            only2.append((position, RowRecord(key, row2)))
+
+    return {
+        kind: [record for _, record in sorted(records, key=lambda item: item[0])]
+        for kind, records in (("only_in_file1", only1), ("only_in_file2", only2), ("modified", modified))
+    }
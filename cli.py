@@ -0,0 +1,112 @@
+import argparse
+import sqlite3
+import sys
+
+from csvdiff import ENGINES, compare_csv_files, drop_header_row
+from diffstore import save_differences
+from exporters import EXPORT_FORMATS, TITLES, write_json
+from stats import ComparisonStats, measure_phase
+
+DATA_TYPES = ["modified", "only_in_file1", "only_in_file2"]
+
+def parse_columns(value):
+    """Parse a comma separated list of column indices."""
+    try:
+        return [int(i) for i in value.split(",") if i.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma separated column indices, got '{value}'")
+
+def build_parser():
+    """Build the command line argument parser."""
+    parser = argparse.ArgumentParser(
+        prog="compare-csv",
+        description="Compare two CSV files by key and report the differences."
+    )
+    parser.add_argument("file1", help="first (old) CSV file")
+    parser.add_argument("file2", help="second (new) CSV file")
+    parser.add_argument("-k", "--key-columns", type=parse_columns, default=[0],
+                        help="comma separated key column indices (default: 0)")
+    parser.add_argument("-n", "--name-columns", type=parse_columns, default=None,
+                        help="comma separated columns used to name rows (default: key columns)")
+    parser.add_argument("-f", "--format", choices=sorted(EXPORT_FORMATS), default="text",
+                        help="output format (default: text)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output file, '-' for standard output (default)")
+    parser.add_argument("-t", "--type", choices=DATA_TYPES + ["all"], default="all", dest="data_type",
+                        help="kind of differences to report (default: all)")
+    parser.add_argument("-e", "--engine", choices=sorted(ENGINES), default="memory",
+                        help="comparison engine (default: memory)")
+    parser.add_argument("--store", metavar="FILE", default=None,
+                        help="also save all differences to a SQLite database the GUI can open")
+    parser.add_argument("--stats", metavar="FILE", default=None,
+                        help="write per-phase timings and memory as JSON, '-' for standard error")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also record the peak Python allocations of each phase (slower)")
+    return parser
+
+def write_results(f, differences, headers, data_types, output_format, name_columns):
+    """Write the requested kinds of differences to an open file."""
+    if output_format == "json":
+        # A list per kind, wrapped in an object when several are requested
+        many = len(data_types) > 1
+        f.write("{\n" if many else "")
+        for n, data_type in enumerate(data_types):
+            if many:
+                f.write(f'"{data_type}": ')
+            if differences[data_type]:
+                write_json(f, differences[data_type], data_type, headers, name_columns)
+            else:
+                f.write("[]")
+            f.write(",\n" if n < len(data_types) - 1 else "\n")
+        f.write("}\n" if many else "")
+        return
+
+    for n, data_type in enumerate(data_types):
+        if n and output_format != "jsonl":
+            f.write("\n")
+        if output_format == "csv" and len(data_types) > 1:
+            f.write(f"{TITLES[data_type]} {len(differences[data_type])}\n")
+        EXPORT_FORMATS[output_format](f, differences[data_type], data_type, headers, name_columns)
+
+def main(argv=None):
+    """Run a comparison from the command line.
+
+    Exits with 0 when the files match, 1 when they differ and 2 on errors.
+    file2's header row is not reported as a row only in file2.
+    """
+    args = build_parser().parse_args(argv)
+    name_columns = args.name_columns if args.name_columns is not None else args.key_columns
+    data_types = DATA_TYPES if args.data_type == "all" else [args.data_type]
+    stats = ComparisonStats(args.trace_memory) if args.stats else None
+
+    try:
+        differences, headers = compare_csv_files(
+            args.file1, args.file2, args.key_columns, name_columns, engine=args.engine, stats=stats
+        )
+        drop_header_row(differences, args.file2, args.key_columns)
+
+        rows = sum(len(differences[data_type]) for data_type in data_types)
+        with measure_phase(stats, "export", rows=rows):
+            if args.output == "-":
+                write_results(sys.stdout, differences, headers, data_types, args.format, name_columns)
+            else:
+                with open(args.output, 'w', newline='' if args.format == "csv" else None, encoding='utf-8') as f:
+                    write_results(f, differences, headers, data_types, args.format, name_columns)
+
+        if args.store:
+            info = {"files": [args.file1, args.file2], "key_columns": args.key_columns, "name_positions": name_columns}
+            with measure_phase(stats, "store", rows=sum(len(records) for records in differences.values())):
+                save_differences(args.store, differences, headers, info)
+
+        if stats is not None:
+            stats.write_json(sys.stderr if args.stats == "-" else args.stats)
+    except (OSError, ValueError, IndexError, sqlite3.Error) as e:
+        print(f"compare-csv: {e}", file=sys.stderr)
+        return 2
+
+    counts = {data_type: len(differences[data_type]) for data_type in DATA_TYPES}
+    print(", ".join(f"{data_type}: {count}" for data_type, count in counts.items()), file=sys.stderr)
+    return 1 if any(counts.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
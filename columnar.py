@@ -0,0 +1,249 @@
+import csv
+from collections.abc import Sequence
+
+from compressed import open_csv
+from csvdiff import ModifiedRecord, RowRecord
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Rows parsed and encoded at a time, and matched rows compared at a time
+CHUNK_ROWS = 65536
+
+# Code of a cell that is missing because its row is shorter than others
+MISSING = -1
+
+def compare_columnar(file1_path, file2_path, key_columns):
+    """Compare two CSV files column-wise with NumPy.
+
+    Both files are dictionary-encoded into integer code matrices that share
+    one value table per column, aligned by key with array lookups and
+    compared in bulk. Records are rebuilt from the codes only when they are
+    read from the result, e.g. when shown or exported.
+    """
+    if np is None:
+        raise ImportError("The columnar engine requires NumPy: pip install numpy")
+
+    encoder = ColumnEncoder(key_columns)
+    headers, table1 = encoder.encode_file(file1_path, read_header=True)
+    _, table2 = encoder.encode_file(file2_path, read_header=False)
+
+    width = len(encoder.tables)
+    codes1 = table1.matrix(width)
+    codes2 = table2.matrix(width)
+
+    unique1, rows1 = unique_keys(table1.keys)
+    unique2, rows2 = unique_keys(table2.keys)
+
+    # Row of each key's last occurrence per file, -1 when the key is absent
+    lookup1 = np.full(len(encoder.keys), -1, dtype=np.int64)
+    lookup1[unique1] = rows1
+    lookup2 = np.full(len(encoder.keys), -1, dtype=np.int64)
+    lookup2[unique2] = rows2
+
+    in_file2 = lookup2[unique1] >= 0
+    in_file1 = lookup1[unique2] >= 0
+
+    matched_keys = unique1[in_file2]
+    matched1 = rows1[in_file2]
+    matched2 = lookup2[matched_keys]
+    modified, masks = changed_rows(codes1, codes2, table1.lengths, table2.lengths, matched1, matched2)
+
+    values = DecodedValues(encoder)
+    differences = {
+        "only_in_file1": OnlyInRecords(values, unique1[~in_file2], rows1[~in_file2], codes1, table1.lengths),
+        "only_in_file2": OnlyInRecords(values, unique2[~in_file1], rows2[~in_file1], codes2, table2.lengths),
+        "modified": ModifiedRecords(
+            values, headers, matched_keys[modified], matched1[modified], matched2[modified], masks,
+            codes1, codes2, table1.lengths, table2.lengths
+        )
+    }
+    return differences, headers
+
+def unique_keys(keys):
+    """Unique key codes in first-occurrence order and the row of their last occurrence."""
+    unique, first = np.unique(keys, return_index=True)
+    _, last_reversed = np.unique(keys[::-1], return_index=True)
+    last = len(keys) - 1 - last_reversed
+
+    order = np.argsort(first, kind="stable")
+    return unique[order], last[order]
+
+def changed_rows(codes1, codes2, lengths1, lengths2, rows1, rows2):
+    """Find matched row pairs that differ and their per-column change masks.
+
+    Returns the indices of the differing pairs and a boolean matrix with
+    the changed columns of each, limited to the cells both rows have.
+    """
+    columns = np.arange(codes1.shape[1])
+    modified = []
+    masks = []
+
+    for start in range(0, len(rows1), CHUNK_ROWS):
+        r1 = rows1[start:start + CHUNK_ROWS]
+        r2 = rows2[start:start + CHUNK_ROWS]
+        changed = codes1[r1] != codes2[r2]
+        length1 = lengths1[r1]
+        length2 = lengths2[r2]
+
+        # Rows of different lengths differ even if their common cells match
+        differs = changed.any(axis=1) | (length1 != length2)
+        shared = columns[None, :] < np.minimum(length1, length2)[:, None]
+
+        modified.append(np.nonzero(differs)[0] + start)
+        masks.append(changed[differs] & shared[differs])
+
+    if not modified:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, codes1.shape[1]), dtype=bool)
+    return np.concatenate(modified), np.concatenate(masks)
+
+class ColumnEncoder:
+    """Dictionary-encodes CSV cells into integer codes shared between files."""
+
+    def __init__(self, key_columns):
+        self.key_columns = key_columns
+        self.keys = {}
+        self.tables = []
+
+    def encode_file(self, file_path, read_header=True):
+        """Encode a CSV file, returning its headers and an EncodedFile."""
+        encoded = EncodedFile()
+        headers = []
+
+        with open_csv(file_path) as f:
+            reader = csv.reader(f)
+            headers = next(reader) if read_header else []
+
+            chunk = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) == CHUNK_ROWS:
+                    self.encode_chunk(chunk, encoded)
+                    chunk = []
+            if chunk:
+                self.encode_chunk(chunk, encoded)
+
+        return headers, encoded
+
+    def encode_chunk(self, chunk, encoded):
+        """Encode a list of rows into per-column code arrays."""
+        key_columns = self.key_columns
+        keys = self.keys
+        encoded.keys.append(np.fromiter(
+            (keys.setdefault(tuple(row[i] for i in key_columns), len(keys)) for row in chunk),
+            dtype=np.int64, count=len(chunk)
+        ))
+
+        lengths = [len(row) for row in chunk]
+        width = max(lengths)
+        while len(self.tables) < width:
+            self.tables.append({})
+
+        columns = []
+        if min(lengths) == width:
+            for table, values in zip(self.tables, zip(*chunk)):
+                columns.append(np.fromiter(
+                    (table.setdefault(value, len(table)) for value in values),
+                    dtype=np.int32, count=len(chunk)
+                ))
+        else:
+            # Ragged rows: cells past the end of a row are MISSING
+            for c in range(width):
+                table = self.tables[c]
+                columns.append(np.fromiter(
+                    (table.setdefault(row[c], len(table)) if c < len(row) else MISSING for row in chunk),
+                    dtype=np.int32, count=len(chunk)
+                ))
+
+        encoded.lengths.append(np.array(lengths, dtype=np.int32))
+        encoded.chunks.append(columns)
+
+class EncodedFile:
+    """Chunks of key codes, row lengths and column codes of one file."""
+
+    def __init__(self):
+        self.keys = []
+        self.lengths = []
+        self.chunks = []
+
+    def matrix(self, width):
+        """Stack the chunks into one rows x width code matrix.
+
+        Also concatenates keys and lengths into single arrays.
+        """
+        rows = sum(len(keys) for keys in self.keys)
+        codes = np.full((rows, width), MISSING, dtype=np.int32)
+
+        start = 0
+        for keys, columns in zip(self.keys, self.chunks):
+            end = start + len(keys)
+            for c, column in enumerate(columns):
+                codes[start:end, c] = column
+            start = end
+
+        self.keys = np.concatenate(self.keys) if self.keys else np.zeros(0, dtype=np.int64)
+        self.lengths = np.concatenate(self.lengths) if self.lengths else np.zeros(0, dtype=np.int32)
+        self.chunks = None
+        return codes
+
+class DecodedValues:
+    """Code -> value lookup lists for keys and every column."""
+
+    def __init__(self, encoder):
+        self.keys = list(encoder.keys)
+        self.columns = [list(table) for table in encoder.tables]
+
+    def row(self, codes, lengths, r):
+        """Rebuild the original row list of a row of a code matrix."""
+        columns = self.columns
+        return [columns[c][code] for c, code in enumerate(codes[r, :lengths[r]].tolist())]
+
+class OnlyInRecords(Sequence):
+    """Records for keys found in one file only, built on access."""
+
+    def __init__(self, values, keys, rows, codes, lengths):
+        self.values = values
+        self.keys = keys
+        self.rows = rows
+        self.codes = codes
+        self.lengths = lengths
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return RowRecord(
+            self.values.keys[self.keys[index]],
+            self.values.row(self.codes, self.lengths, self.rows[index])
+        )
+
+class ModifiedRecords(Sequence):
+    """Records for keys whose rows differ, built on access from change masks."""
+
+    def __init__(self, values, headers, keys, rows1, rows2, masks, codes1, codes2, lengths1, lengths2):
+        self.values = values
+        self.headers = headers
+        self.keys = keys
+        self.rows1 = rows1
+        self.rows2 = rows2
+        self.masks = masks
+        self.codes1 = codes1
+        self.codes2 = codes2
+        self.lengths1 = lengths1
+        self.lengths2 = lengths2
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        row1 = self.values.row(self.codes1, self.lengths1, self.rows1[index])
+        row2 = self.values.row(self.codes2, self.lengths2, self.rows2[index])
+        columns = tuple(np.nonzero(self.masks[index])[0].tolist())
+        return ModifiedRecord(self.values.keys[self.keys[index]], row1, row2, columns, self.headers)
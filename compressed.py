@@ -0,0 +1,120 @@
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+
+# Leading bytes of each supported compression format
+MAGIC_BYTES = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz"
+}
+
+# Decompressing file objects over an open binary file, by format
+OPENERS = {
+    "gzip": lambda raw: gzip.GzipFile(fileobj=raw),
+    "bz2": bz2.BZ2File,
+    "xz": lzma.LZMAFile
+}
+
+# Decompressed bytes handed over from the decompressing thread at a time
+CHUNK_SIZE = 1024 * 1024
+
+# Chunks decompressed ahead of the parser
+QUEUE_CHUNKS = 8
+
+def detect_compression(file_path):
+    """Name of the compression format of a file from its magic bytes, or None."""
+    with open(file_path, 'rb') as f:
+        head = f.read(max(len(magic) for magic in MAGIC_BYTES))
+    for magic, name in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+def open_csv(file_path):
+    """Open a CSV file for csv.reader, decompressing it if needed.
+
+    Compressed files are detected by their content, not their name, and
+    decompressed on a background thread while the caller parses.
+    """
+    compression = detect_compression(file_path)
+    if compression is None:
+        return open(file_path, 'r', newline='')
+
+    raw = DecompressingReader(file_path, OPENERS[compression])
+    return io.TextIOWrapper(io.BufferedReader(raw, CHUNK_SIZE), newline='')
+
+class DecompressingReader(io.RawIOBase):
+    """Raw stream of a compressed file's contents, decompressed on a thread.
+
+    tell() returns the position in the compressed file, so progress can be
+    measured against its size on disk.
+    """
+
+    def __init__(self, file_path, opener):
+        super().__init__()
+        self.file_path = file_path
+        self.opener = opener
+        self.chunks = queue.Queue(QUEUE_CHUNKS)
+        self.stopping = threading.Event()
+        self.pending = memoryview(b"")
+        self.finished = False
+        self.compressed_offset = 0
+
+        self.thread = threading.Thread(target=self.decompress, daemon=True)
+        self.thread.start()
+
+    def decompress(self):
+        """Thread body: decompress the file into the chunk queue."""
+        try:
+            with open(self.file_path, 'rb') as raw, self.opener(raw) as f:
+                while not self.stopping.is_set():
+                    chunk = f.read(CHUNK_SIZE)
+                    self.compressed_offset = raw.tell()
+                    self.hand_over(chunk)
+                    if not chunk:
+                        break
+        except Exception as e:
+            self.hand_over(e)
+
+    def hand_over(self, item):
+        """Queue an item, giving up once the reader has been closed."""
+        while not self.stopping.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.pending:
+            if self.finished:
+                return 0
+            item = self.chunks.get()
+            if isinstance(item, Exception):
+                self.finished = True
+                raise item
+            if not item:
+                self.finished = True
+                return 0
+            self.pending = memoryview(item)
+
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def tell(self):
+        return self.compressed_offset
+
+    def close(self):
+        if not self.closed:
+            self.stopping.set()
+            self.thread.join()
+        super().close()
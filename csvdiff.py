@@ -0,0 +1,423 @@
+import csv
+import os
+import sys
+import time
+import importlib
+from collections.abc import Mapping
+from itertools import islice
+from operator import itemgetter
+
+from compressed import detect_compression, open_csv
+from mapped_reader import mapped_reader
+from progress import PROGRESS_INTERVAL
+from stats import measure_phase
+
+# Comparison engines, resolved lazily so optional engines only cost an
+# import when they are actually used.
+ENGINES = {
+    "memory": ("csvdiff", "compare_in_memory"),
+    "sorted": ("streaming", "compare_sorted"),
+    "partitioned": ("partitioned", "compare_partitioned"),
+    "parallel": ("parallel", "compare_parallel"),
+    "fingerprint": ("fingerprint", "compare_fingerprint"),
+    "snapshot": ("snapshot", "compare_snapshot"),
+    "columnar": ("columnar", "compare_columnar"),
+    "chunked": ("chunked", "compare_chunked"),
+    "positional": ("positional", "compare_positional"),
+    "incremental": ("incremental", "compare_incremental"),
+}
+
+# Engines that seek to byte offsets in or map the input files, which
+# compressed files do not allow
+OFFSET_ENGINES = {"parallel", "fingerprint", "snapshot", "chunked", "incremental"}
+
+# Engines that report progress to, and can be cancelled through, a
+# Progress object, and engines that support column projection
+PROGRESS_ENGINES = {"memory", "positional"}
+PROJECTION_ENGINES = {"memory", "positional"}
+
+# Engines that keep index or state files next to the compared files
+STATE_ENGINES = {"snapshot", "incremental"}
+
+# Rows read from one file before switching to the other when streaming
+STREAM_BLOCK_ROWS = 1000
+
+def get_engine(name):
+    """Return the comparison function registered under the given name."""
+    try:
+        module_name, func_name = ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown comparison engine: {name}")
+    return getattr(importlib.import_module(module_name), func_name)
+
+def compare_csv_files(file1_path, file2_path, key_columns, name_columns, engine="memory", progress=None,
+                      columns=None, ignore_columns=None, stats=None, **options):
+    """Compare two CSV files and identify differences.
+
+    A Progress object, if given, receives progress updates and can cancel
+    the comparison. Only the memory and positional engines report progress;
+    other engines run without it.
+
+    A ComparisonStats object, if given, is filled with per-phase figures.
+    The memory engine records its reading and diffing phases, other engines
+    a single "compare" phase.
+
+    columns and ignore_columns (indices or header names) limit the columns
+    that are stored and compared. The returned rows and headers then only
+    hold the remaining columns, in file order. Only the memory and
+    positional engines support projection; other engines raise ValueError.
+    """
+    start_time = time.time()
+
+    if engine in OFFSET_ENGINES and (detect_compression(file1_path) or detect_compression(file2_path)):
+        raise ValueError(f"The {engine} engine cannot read compressed files")
+    if progress is not None and engine in PROGRESS_ENGINES:
+        options["progress"] = progress
+    if columns is not None or ignore_columns is not None:
+        if engine not in PROJECTION_ENGINES:
+            raise ValueError(f"The {engine} engine does not support column projection")
+        options["columns"] = resolve_columns(read_headers(file1_path), columns, ignore_columns)
+    if stats is not None:
+        stats.engine = engine
+        stats.files = [file1_path, file2_path]
+        if engine == "memory":
+            options["stats"] = stats
+
+    with measure_phase(None if "stats" in options else stats, "compare") as phase:
+        differences, headers = get_engine(engine)(file1_path, file2_path, key_columns, **options)
+        phase.rows += sum(len(records) for records in differences.values())
+
+    print(f"Comparison completed in {time.time() - start_time:.4f} seconds", file=sys.stderr)
+    return differences, headers
+
+def drop_header_row(differences, file2_path, key_columns):
+    """Remove file2's header row from the rows only in file2.
+
+    Every engine reads file2's first row as data, as the GUI shows it, so
+    files with the same rows still differ by it. Callers that report
+    whether files match drop it here. The header is only dropped when it
+    is reported as it was read, not when a data row with its key won.
+    """
+    header = read_headers(file2_path)
+    if not header:
+        return differences
+    key = tuple(header[i] for i in key_columns)
+    records = differences["only_in_file2"]
+
+    # The header comes first in file order, so usually no search is needed
+    position = next(
+        (i for i, record in enumerate(records) if record["key"] == key and list(record["row"]) == header),
+        None
+    )
+    if position is not None:
+        differences["only_in_file2"] = records[:position] + records[position + 1:]
+    return differences
+
+def compare_in_memory(file1_path, file2_path, key_columns, cache=None, progress=None, columns=None,
+                      stats=None):
+    """Compare two CSV files by loading both of them into dictionaries.
+
+    Parsed files are taken from and stored in cache when one is given.
+    """
+    reader = cache.read_csv_data if cache is not None else read_csv_data
+
+    if progress is not None:
+        progress.update(
+            phase="Reading", total_bytes=os.path.getsize(file1_path) + os.path.getsize(file2_path)
+        )
+
+    # Read data from both files; parsing and building the key index share
+    # one loop, so they are timed together
+    with measure_phase(stats, "read and index file1", bytes_read=os.path.getsize(file1_path)) as phase:
+        data1, headers = reader(file1_path, key_columns, progress=progress, columns=columns)
+        phase.rows += len(data1)
+    with measure_phase(stats, "read and index file2", bytes_read=os.path.getsize(file2_path)) as phase:
+        data2, _ = reader(file2_path, key_columns, read_header=False, progress=progress, columns=columns)
+        phase.rows += len(data2)
+
+    return diff_keyed_rows(data1, data2, headers, progress, stats), headers
+
+def diff_keyed_rows(data1, data2, headers, progress=None, stats=None):
+    """Diff two key -> row dictionaries into the differences structure."""
+    # Find differences using dictionary comprehensions
+    with measure_phase(stats, "set difference") as phase:
+        differences = {
+            "only_in_file1": [RowRecord(k, data1[k]) for k in data1 if k not in data2],
+            "only_in_file2": [RowRecord(k, data2[k]) for k in data2 if k not in data1],
+            "modified": []
+        }
+        phase.rows += len(differences["only_in_file1"]) + len(differences["only_in_file2"])
+
+    # Process modified rows
+    with measure_phase(stats, "cell diff") as phase:
+        modified_keys = [k for k in data1 if k in data2 and data1[k] != data2[k]]
+        if progress is not None:
+            progress.update(phase="Comparing", diffs=(
+                len(differences["only_in_file1"]) + len(differences["only_in_file2"]) + len(modified_keys)
+            ))
+
+        for count, key in enumerate(modified_keys, 1):
+            differences["modified"].append(modified_record(key, data1[key], data2[key], headers))
+            if progress is not None and count % PROGRESS_INTERVAL == 0:
+                progress.update()
+        phase.rows += len(modified_keys)
+
+    return differences
+
+def iter_csv_differences(file1_path, file2_path, key_columns, progress=None, columns=None,
+                         ignore_columns=None, stats=None):
+    """Compare two CSV files in memory, yielding differences as they are found.
+
+    Yields (kind, payload) pairs: ("headers", headers) first, then
+    ("modified", record), ("only_in_file1", record) and ("only_in_file2",
+    record) as soon as each difference is known, and ("done", (differences,
+    headers)) last, with exactly what the memory engine returns.
+
+    Both files are read at the same time, a block of rows from each in turn,
+    so a modified row is found once its key has been read from both files.
+    Rows only in one file are known once the other file has been read to
+    the end. With duplicate keys the last row wins, so a key yielded early
+    can be yielded again or be left out of the final result.
+
+    progress, columns, ignore_columns and stats work as for compare_csv_files.
+    """
+    start_time = time.time()
+    sizes = os.path.getsize(file1_path) + os.path.getsize(file2_path)
+
+    if columns is not None or ignore_columns is not None:
+        columns = resolve_columns(read_headers(file1_path), columns, ignore_columns)
+    project = projector(columns) if columns is not None else None
+    if stats is not None:
+        stats.engine = "memory"
+        stats.files = [file1_path, file2_path]
+    if progress is not None:
+        progress.update(phase="Comparing", total_bytes=sizes)
+
+    data1 = {}
+    data2 = {}
+    modified = {}
+
+    with open_csv(file1_path) as f1, open_csv(file2_path) as f2:
+        reader1, tell1 = open_reader(f1)
+        reader2, tell2 = open_reader(f2)
+        headers = next(reader1, [])
+        if project is not None:
+            headers = project(headers)
+        yield "headers", headers
+
+        with measure_phase(stats, "read and diff", bytes_read=sizes) as phase:
+            done1 = done2 = False
+            while not (done1 and done2):
+                for first in (True, False):
+                    if done1 if first else done2:
+                        continue
+                    reader, own, other = (reader1, data1, data2) if first else (reader2, data2, data1)
+
+                    rows = list(islice(reader, STREAM_BLOCK_ROWS))
+                    found = merge_rows(rows, key_columns, project, own, other, first,
+                                       done2 if first else done1, headers, modified)
+                    phase.rows += len(rows)
+
+                    if len(rows) < STREAM_BLOCK_ROWS:
+                        # Keys of the other file not in this one are now settled
+                        kind = "only_in_file2" if first else "only_in_file1"
+                        found.extend((kind, RowRecord(k, other[k])) for k in other if k not in own)
+                        if first:
+                            done1 = True
+                        else:
+                            done2 = True
+
+                    yield from found
+                    if progress is not None:
+                        progress.update(bytes_read=tell1() + tell2(), rows=phase.rows, diffs=len(modified))
+
+    # The final result is in file order, like compare_in_memory's
+    with measure_phase(stats, "collect results") as phase:
+        differences = {
+            "only_in_file1": [RowRecord(k, data1[k]) for k in data1 if k not in data2],
+            "only_in_file2": [RowRecord(k, data2[k]) for k in data2 if k not in data1],
+            "modified": [modified[k] for k in data1 if k in modified]
+        }
+        phase.rows += sum(len(records) for records in differences.values())
+
+    print(f"Comparison completed in {time.time() - start_time:.4f} seconds", file=sys.stderr)
+    yield "done", (differences, headers)
+
+def merge_rows(rows, key_columns, project, own, other, first, other_done, headers, modified):
+    """Add rows of one file to its key index and return the differences they settle.
+
+    modified is kept up to date with the current record of every key whose
+    rows differ, so duplicate keys end with the last rows of both files.
+    """
+    found = []
+    kind = "only_in_file1" if first else "only_in_file2"
+    for row in rows:
+        key = tuple(row[i] for i in key_columns)
+        if project is not None:
+            row = project(row)
+        own[key] = row
+
+        other_row = other.get(key)
+        if other_row is None:
+            if other_done:
+                found.append((kind, RowRecord(key, row)))
+            continue
+
+        row1, row2 = (row, other_row) if first else (other_row, row)
+        if row1 != row2:
+            record = modified[key] = modified_record(key, row1, row2, headers)
+            found.append(("modified", record))
+        else:
+            modified.pop(key, None)
+    return found
+
+def modified_record(key, row1, row2, headers):
+    """Build the result record for a key whose row differs between files."""
+    columns = tuple(i for i, (val1, val2) in enumerate(zip(row1, row2)) if val1 != val2)
+    return ModifiedRecord(key, row1, row2, columns, headers)
+
+class RowRecord(Mapping):
+    """Result record for a key found in one file only.
+
+    Reads like the {"key", "row"} dict it replaces, without a dict per record.
+    """
+
+    __slots__ = ("key", "row")
+    FIELDS = ("key", "row")
+
+    def __init__(self, key, row):
+        self.key = key
+        self.row = row
+
+    def __getitem__(self, field):
+        if field in self.FIELDS:
+            return getattr(self, field)
+        raise KeyError(field)
+
+    def __contains__(self, field):
+        return field in self.FIELDS
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class ModifiedRecord(RowRecord):
+    """Result record for a key whose row differs between files.
+
+    Only the indices of the changed columns are stored. The shared rows and
+    headers are referenced, and the "changes" dicts are built on access.
+    """
+
+    __slots__ = ("row2", "columns", "headers")
+    FIELDS = ("key", "row", "row2", "changes")
+
+    def __init__(self, key, row1, row2, columns, headers):
+        self.key = key
+        self.row = row1
+        self.row2 = row2
+        self.columns = columns
+        self.headers = headers
+
+    @property
+    def changes(self):
+        """The changed cells as {"column", "old_value", "new_value"} dicts."""
+        return [
+            {
+                "column": self.headers[i],
+                "old_value": self.row[i],
+                "new_value": self.row2[i]
+            }
+            for i in self.columns
+        ]
+
+def read_csv_data(file_path, key_columns, read_header=True, progress=None, columns=None):
+    """Read CSV file and return data dictionary and optional headers.
+
+    Bytes and rows read are added to progress, when given, as the file is read.
+    When columns is given only those column indices of the headers and rows
+    are kept; keys are still built from the full row.
+
+    Files without quotes are memory-mapped and split directly, anything
+    else goes through csv.reader; both give the same rows.
+    """
+    data = {}
+    headers = []
+    project = projector(columns) if columns is not None else None
+    if progress is not None:
+        start_bytes, start_rows = progress.bytes_read, progress.rows
+
+    with open_csv(file_path) as f:
+        reader, tell = open_reader(f)
+        if read_header:
+            headers = next(reader, None)
+            if headers is None:
+                raise ValueError(f"{file_path} is empty")
+        if project is not None:
+            headers = project(headers)
+
+        count = 0
+        for count, row in enumerate(reader, 1):
+            key = tuple(row[i] for i in key_columns)
+            data[key] = row if project is None else project(row)
+
+            if progress is not None and count % PROGRESS_INTERVAL == 0:
+                progress.update(bytes_read=start_bytes + tell(), rows=start_rows + count)
+
+        if progress is not None:
+            progress.update(bytes_read=start_bytes + tell(), rows=start_rows + count)
+
+    return data, headers
+
+def open_reader(f):
+    """Row iterator over an open CSV file and a function giving its byte offset."""
+    reader = mapped_reader(f)
+    if reader is not None:
+        return reader, reader.tell
+    return csv.reader(f), f.buffer.tell
+
+def read_headers(file_path):
+    """Read only the header row of a CSV file."""
+    with open_csv(file_path) as f:
+        return next(csv.reader(f), [])
+
+def resolve_columns(headers, columns=None, ignore_columns=None):
+    """Turn include/ignore column selections into sorted column indices.
+
+    Columns may be given as indices or header names. Without an include
+    list every header column is included.
+    """
+    def index_of(column):
+        if isinstance(column, int):
+            if not 0 <= column < len(headers):
+                raise ValueError(f"Column index {column} is out of range")
+            return column
+        try:
+            return headers.index(column)
+        except ValueError:
+            raise ValueError(f"Unknown column: {column}")
+
+    included = set(range(len(headers))) if columns is None else {index_of(c) for c in columns}
+    ignored = set() if ignore_columns is None else {index_of(c) for c in ignore_columns}
+    return sorted(included - ignored)
+
+def projector(columns):
+    """Return a function that keeps only the given column indices of a row."""
+    if not columns:
+        return lambda row: []
+
+    getter = itemgetter(*columns)
+    last = columns[-1]
+    single = len(columns) == 1
+
+    def project(row):
+        # Short rows keep the selected cells they have
+        if len(row) <= last:
+            return [row[i] for i in columns if i < len(row)]
+        return [getter(row)] if single else list(getter(row))
+
+    return project
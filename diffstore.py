@@ -0,0 +1,322 @@
+import json
+import os
+import pathlib
+import sqlite3
+from collections.abc import Sequence
+
+from csvdiff import ModifiedRecord, RowRecord
+from filter_index import search_text
+
+# Version of the database layout, stored with every saved result
+STORE_FORMAT = 1
+
+# Tables holding the records of each kind of difference
+DATA_TYPES = ["modified", "only_in_file1", "only_in_file2"]
+
+# Records written or read per statement
+BATCH_ROWS = 10000
+
+# Shortest filter text the trigram index can look up; shorter ones scan
+TRIGRAM_SIZE = 3
+
+# Joins the searchable values of a record in the text column. SQLite
+# string functions stop at NUL, which the filter index uses instead.
+STORE_SEPARATOR = "\x1f"
+
+SCHEMA = """
+CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE modified (id INTEGER PRIMARY KEY, key TEXT, row TEXT, row2 TEXT, columns TEXT, text TEXT);
+CREATE TABLE only_in_file1 (id INTEGER PRIMARY KEY, key TEXT, row TEXT, text TEXT);
+CREATE TABLE only_in_file2 (id INTEGER PRIMARY KEY, key TEXT, row TEXT, text TEXT);
+CREATE TABLE changes (record_id INTEGER, column_index INTEGER, old_value TEXT, new_value TEXT);
+"""
+
+# Built after loading, which is much faster than updating them per row
+INDEXES = """
+CREATE INDEX modified_key ON modified (key);
+CREATE INDEX only_in_file1_key ON only_in_file1 (key);
+CREATE INDEX only_in_file2_key ON only_in_file2 (key);
+CREATE INDEX changes_record ON changes (record_id);
+CREATE INDEX changes_old_value ON changes (column_index, old_value);
+CREATE INDEX changes_new_value ON changes (column_index, new_value);
+"""
+
+def encode(value):
+    """Compact JSON text of a key, row or column list."""
+    return json.dumps(value, separators=(",", ":"))
+
+def save_differences(path, differences, headers, info=None, progress=None):
+    """Write a comparison result to a new SQLite database at path.
+
+    info holds further JSON values kept with the result, like the compared
+    files. The database is written next to path and moved into place when
+    complete, so a failed or cancelled save leaves an existing file alone.
+    A Progress object, if given, is updated per batch and can cancel.
+    """
+    temp_path = path + ".tmp"
+    remove_quietly(temp_path)
+    connection = sqlite3.connect(temp_path)
+    try:
+        # Nothing to recover if writing fails, the file is thrown away
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.executescript(SCHEMA)
+
+        meta = dict(info or {}, format=STORE_FORMAT, headers=headers)
+        connection.executemany(
+            "INSERT INTO meta VALUES (?, ?)", [(name, encode(value)) for name, value in meta.items()]
+        )
+
+        if progress is not None:
+            progress.update(phase="Saving", rows=0, total_bytes=0)
+        written = 0
+        for data_type in DATA_TYPES:
+            for batch in batches(enumerate(differences[data_type], 1)):
+                insert_records(connection, data_type, batch)
+                written += len(batch)
+                if progress is not None:
+                    progress.update(rows=written)
+
+        connection.executescript(INDEXES)
+        for data_type in DATA_TYPES:
+            create_search_index(connection, data_type)
+        connection.commit()
+    except BaseException:
+        connection.close()
+        remove_quietly(temp_path)
+        raise
+
+    connection.close()
+    os.replace(temp_path, path)
+
+def batches(items):
+    """Split an iterable into lists of BATCH_ROWS items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= BATCH_ROWS:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def insert_records(connection, data_type, numbered_records):
+    """Insert (id, record) pairs of one kind, with their changed cells."""
+    if data_type != "modified":
+        connection.executemany(
+            f"INSERT INTO {data_type} VALUES (?, ?, ?, ?)",
+            [
+                (record_id, encode(record.key), encode(record.row),
+                 search_text(record, STORE_SEPARATOR))
+                for record_id, record in numbered_records
+            ]
+        )
+        return
+
+    connection.executemany(
+        "INSERT INTO modified VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (record_id, encode(record.key), encode(record.row), encode(record.row2),
+             encode(record.columns), search_text(record, STORE_SEPARATOR))
+            for record_id, record in numbered_records
+        ]
+    )
+    connection.executemany(
+        "INSERT INTO changes VALUES (?, ?, ?, ?)",
+        [
+            (record_id, i, record.row[i], record.row2[i])
+            for record_id, record in numbered_records
+            for i in record.columns
+        ]
+    )
+
+def create_search_index(connection, data_type):
+    """Build a trigram index of a table's text column, if SQLite has FTS5."""
+    try:
+        connection.execute(
+            f"CREATE VIRTUAL TABLE {data_type}_search USING fts5"
+            f"(text, content='{data_type}', content_rowid='id', tokenize='trigram')"
+        )
+    except sqlite3.OperationalError:
+        # Without FTS5 or its trigram tokenizer filters scan the text column
+        return
+    connection.execute(f"INSERT INTO {data_type}_search ({data_type}_search) VALUES ('rebuild')")
+
+def remove_quietly(path):
+    """Remove a file, ignoring files that are already gone."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class DiffStore:
+    """A comparison result saved by save_differences, opened read-only.
+
+    Records are read on demand, so results far larger than memory can be
+    paged through, filtered and exported. The connection belongs to the
+    thread that opened the store.
+    """
+
+    def __init__(self, path):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No such file: {path}")
+
+        uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+        self.path = path
+        self.connection = sqlite3.connect(uri, uri=True)
+        try:
+            self.info = {
+                name: json.loads(value)
+                for name, value in self.connection.execute("SELECT name, value FROM meta")
+            }
+            tables = {name for name, in self.connection.execute("SELECT name FROM sqlite_master")}
+        except sqlite3.DatabaseError:
+            self.connection.close()
+            raise ValueError(f"{path} is not a saved comparison result")
+
+        if self.info.get("format") != STORE_FORMAT:
+            self.connection.close()
+            raise ValueError(f"{path} was saved in an unsupported format")
+
+        self.headers = self.info["headers"]
+        self.searchable = {data_type: f"{data_type}_search" in tables for data_type in DATA_TYPES}
+
+    def records(self, data_type, filter_text="", key=None, column=None, value=None):
+        """The records of one kind as a StoredRecords sequence.
+
+        filter_text works like FilterIndex.filter. key selects the record of
+        one key. column, a column index, selects modified records with a
+        change in that column, and value those changed from or to a value.
+        """
+        if data_type not in DATA_TYPES:
+            raise ValueError(f"Unknown kind of difference: {data_type}")
+        if column is None and value is not None:
+            raise ValueError("A value can only be looked up in a column")
+        if column is not None and data_type != "modified":
+            raise ValueError("Only modified records can be selected by column")
+        return StoredRecords(self, data_type, filter_text, key, column, value)
+
+    def differences(self):
+        """All records as a differences structure of StoredRecords."""
+        return {data_type: self.records(data_type) for data_type in DATA_TYPES}
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+class StoredRecords(Sequence):
+    """Read-only list of the records of one kind in a DiffStore.
+
+    Length, slices and iteration are answered with queries, so the records
+    of a page or a batch are all that is held in memory. The unfiltered
+    records are paged by id, filtered ones with LIMIT and OFFSET.
+    """
+
+    def __init__(self, store, data_type, filter_text="", key=None, column=None, value=None):
+        self.store = store
+        self.data_type = data_type
+        self.filter_text = filter_text
+        self.key = key
+        self.column = column
+        self.value = value
+        self.length = None
+        self.where, self.params = self.conditions()
+
+    def conditions(self):
+        """SQL condition and parameters selecting this sequence's records."""
+        table = self.data_type
+        conditions = []
+        params = []
+
+        if self.filter_text:
+            if self.store.searchable[table] and len(self.filter_text) >= TRIGRAM_SIZE:
+                # The trigram index narrows, instr checks the exact substring
+                phrase = '"' + self.filter_text.replace('"', '""') + '"'
+                conditions.append(f"id IN (SELECT rowid FROM {table}_search WHERE {table}_search MATCH ?)")
+                params.append(phrase)
+            conditions.append("instr(text, ?) > 0")
+            params.append(self.filter_text)
+
+        if self.key is not None:
+            conditions.append("key = ?")
+            params.append(encode(list(self.key)))
+
+        if self.column is not None:
+            if self.value is None:
+                conditions.append("id IN (SELECT record_id FROM changes WHERE column_index = ?)")
+                params.append(self.column)
+            else:
+                conditions.append(
+                    "id IN (SELECT record_id FROM changes WHERE column_index = ? AND old_value = ?"
+                    " UNION SELECT record_id FROM changes WHERE column_index = ? AND new_value = ?)"
+                )
+                params.extend([self.column, self.value, self.column, self.value])
+
+        return " AND ".join(conditions), params
+
+    def filter(self, filter_text):
+        """The records that also match an already lowercased filter text."""
+        if not filter_text:
+            return self
+        return StoredRecords(self.store, self.data_type, filter_text, self.key, self.column, self.value)
+
+    def __len__(self):
+        if self.length is None:
+            sql = f"SELECT count(*) FROM {self.data_type}"
+            if self.where:
+                sql += f" WHERE {self.where}"
+            self.length = self.store.connection.execute(sql, self.params).fetchone()[0]
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return list(self.fetch(start, stop - start))[::step]
+            return self.fetch(start, stop - start)
+
+        if index < 0:
+            index += len(self)
+        records = self.fetch(index, 1)
+        if not records:
+            raise IndexError("record index out of range")
+        return records[0]
+
+    def __iter__(self):
+        # Pages follow the id, which stays fast however far in they are
+        last_id = 0
+        while True:
+            rows = self.query("id > ?", [last_id], BATCH_ROWS)
+            yield from (self.record(row) for row in rows)
+            if len(rows) < BATCH_ROWS:
+                return
+            last_id = rows[-1][0]
+
+    def fetch(self, start, count):
+        """Records start to start + count, as a list."""
+        if count <= 0:
+            return []
+        if not self.where:
+            # Ids of all records are 1 to n in order
+            return [self.record(row) for row in self.query("id > ?", [start], count)]
+        return [self.record(row) for row in self.query(None, [], count, start)]
+
+    def query(self, condition, params, limit, offset=0):
+        """Rows of the records matching condition as well, in id order."""
+        conditions = [c for c in (self.where, condition) if c]
+        sql = f"SELECT * FROM {self.data_type}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id LIMIT ? OFFSET ?"
+        return self.store.connection.execute(sql, self.params + params + [limit, offset]).fetchall()
+
+    def record(self, row):
+        """Result record of a table row."""
+        if self.data_type == "modified":
+            _, key, row1, row2, columns, _ = row
+            return ModifiedRecord(
+                tuple(json.loads(key)), json.loads(row1), json.loads(row2),
+                tuple(json.loads(columns)), self.store.headers
+            )
+        _, key, row1, _ = row
+        return RowRecord(tuple(json.loads(key)), json.loads(row1))
@@ -0,0 +1,203 @@
+import csv
+import io
+import json
+
+TITLES = {
+    "modified": "Modified Rows:",
+    "only_in_file1": "Rows only in first file:",
+    "only_in_file2": "Rows only in second file:"
+}
+
+def display_name(row, name_columns):
+    """Get display name from a row using name columns."""
+    return " ".join(row[col] for col in name_columns)
+
+def export_results(output, items, data_type, headers, name_columns, output_format="json",
+                   filter_text="", exact_mode=False):
+    """Write diff records of one kind to a path or an open text file.
+
+    Records are written one at a time, so items can be any iterable.
+    """
+    writer = EXPORT_FORMATS[output_format]
+    if hasattr(output, "write"):
+        writer(output, items, data_type, headers, name_columns, filter_text, exact_mode)
+        return
+
+    with open(output, 'w', newline='' if output_format == "csv" else None, encoding='utf-8') as f:
+        writer(f, items, data_type, headers, name_columns, filter_text, exact_mode)
+
+def title_line(items, data_type):
+    """Title with the record count, when items knows its length."""
+    if hasattr(items, "__len__"):
+        return f"{TITLES[data_type]} {len(items)}"
+    return TITLES[data_type]
+
+def write_csv(f, items, data_type, headers, name_columns, filter_text="", exact_mode=False):
+    """Write diff records of one kind to a text file as CSV."""
+    writer = csv.writer(f)
+
+    if data_type == "modified":
+        # Write header for modified items
+        header_row = ["Item #", "Name"]
+        for h in headers:
+            header_row.extend([f"{h} (Old)", f"{h} (New)"])
+        header_row.append("Changes")
+        writer.writerow(header_row)
+
+        # Write data rows
+        for i, item in enumerate(items):
+            changes_str = "; ".join([
+                f"{c['column']}: '{c['old_value']}' -> '{c['new_value']}'"
+                for c in item["changes"]
+            ])
+
+            row_data = [str(i+1), display_name(item["row"], name_columns)]
+            for j in range(len(headers)):
+                row_data.append(item["row"][j] if j < len(item["row"]) else "")
+                row_data.append(item["row2"][j] if j < len(item["row2"]) else "")
+
+            row_data.append(changes_str)
+            writer.writerow(row_data)
+    else:
+        # Write header for items only in one file
+        writer.writerow(["Item #", "Name"] + headers)
+
+        # Write data rows
+        for i, item in enumerate(items):
+            writer.writerow([str(i+1), display_name(item["row"], name_columns)] + item["row"])
+
+def write_json(f, items, data_type, headers, name_columns, filter_text="", exact_mode=False):
+    """Write diff records of one kind to a text file as a JSON array.
+
+    The output matches json.dumps(records, indent=2) but is produced one
+    record at a time.
+    """
+    empty = True
+    for item in items:
+        record = json_record(item, data_type, headers, name_columns, filter_text, exact_mode)
+        f.write("[\n  " if empty else ",\n  ")
+        # Newlines inside JSON strings are escaped, so this only indents
+        f.write(json.dumps(record, indent=2).replace("\n", "\n  "))
+        empty = False
+
+    if empty:
+        f.write(f"No {data_type.replace('_', ' ')} rows found.")
+    else:
+        f.write("\n]")
+
+def write_jsonl(f, items, data_type, headers, name_columns, filter_text="", exact_mode=False):
+    """Write diff records of one kind to a text file as JSON Lines."""
+    for item in items:
+        record = {"type": data_type}
+        record.update(json_record(item, data_type, headers, name_columns, filter_text, exact_mode))
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+
+def write_text(f, items, data_type, headers, name_columns, filter_text="", exact_mode=False):
+    """Write diff records of one kind to a text file as readable text."""
+    f.write(f"{title_line(items, data_type)}\n\n")
+
+    if data_type == "modified":
+        for i, mod in enumerate(items):
+            f.write(f"{i+1}. {display_name(mod['row'], name_columns)}\n")
+
+            for change in mod["changes"]:
+                f.write(f"   Column '{change['column']}': '{change['old_value']}' -> '{change['new_value']}'\n")
+
+            f.write("\n")
+    else:
+        for i, item in enumerate(items):
+            f.write(f"{i+1}. {display_name(item['row'], name_columns)}\n")
+
+            for j, val in enumerate(item["row"]):
+                if j < len(headers):
+                    f.write(f"   {headers[j]}: {val}\n")
+
+            f.write("\n")
+
+def create_json_string(items, item_type, headers, name_columns, filter_text="", exact_mode=False):
+    """Create a JSON string from the filtered items."""
+    output = io.StringIO()
+    write_json(output, items, item_type, headers, name_columns, filter_text, exact_mode)
+    return output.getvalue()
+
+def json_record(item, item_type, headers, name_columns, filter_text="", exact_mode=False):
+    """Convert one diff record to its JSON export form.
+
+    In exact mode with a filter only the matching fields are included.
+    """
+    name_display = display_name(item["row"], name_columns)
+
+    if item_type == "modified":
+        # For modified items
+        if exact_mode and filter_text:
+            # Only include matching fields in exact mode
+            original_row = {
+                headers[i]: val for i, val in enumerate(item["row"])
+                if i < len(headers) and filter_text in str(val).lower()
+            }
+
+            new_row = {
+                headers[i]: val for i, val in enumerate(item["row2"])
+                if i < len(headers) and filter_text in str(val).lower()
+            }
+
+            filtered_changes = [
+                {
+                    "column": c["column"],
+                    "old_value": c["old_value"],
+                    "new_value": c["new_value"]
+                }
+                for c in item["changes"]
+                if (filter_text in str(c["column"]).lower() or
+                    filter_text in str(c["old_value"]).lower() or
+                    filter_text in str(c["new_value"]).lower())
+            ]
+
+            return {
+                "name": name_display,
+                "original_row": original_row,
+                "new_row": new_row,
+                "changes": filtered_changes
+            }
+
+        # Include all fields
+        return {
+            "name": name_display,
+            "original_row": {headers[i]: val for i, val in enumerate(item["row"]) if i < len(headers)},
+            "new_row": {headers[i]: val for i, val in enumerate(item["row2"]) if i < len(headers)},
+            "changes": [
+                {
+                    "column": c["column"],
+                    "old_value": c["old_value"],
+                    "new_value": c["new_value"]
+                }
+                for c in item["changes"]
+            ]
+        }
+
+    # For items only in one file
+    if exact_mode and filter_text:
+        # Only include matching fields in exact mode
+        filtered_row = {
+            headers[i]: val for i, val in enumerate(item["row"])
+            if i < len(headers) and filter_text in str(val).lower()
+        }
+
+        return {
+            "name": name_display,
+            "row": filtered_row
+        }
+
+    # Include all fields
+    return {
+        "name": name_display,
+        "row": {headers[i]: val for i, val in enumerate(item["row"]) if i < len(headers)}
+    }
+
+EXPORT_FORMATS = {
+    "text": write_text,
+    "csv": write_csv,
+    "json": write_json,
+    "jsonl": write_jsonl
+}
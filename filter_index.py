@@ -0,0 +1,100 @@
+from array import array
+from collections import OrderedDict
+
+# Length of the substrings indexed for filter lookups
+NGRAM_SIZE = 3
+
+# Number of recent queries whose results are kept for narrowing
+RECENT_QUERIES = 32
+
+# Joins the searchable values of a record; queries never span two values
+SEPARATOR = "\x00"
+
+def search_text(item, separator=SEPARATOR):
+    """Lowercased searchable text of a diff record.
+
+    Modified records are searched by the column names and values of their
+    changes, records only in one file by their row values.
+    """
+    if "changes" in item:
+        parts = (
+            part
+            for change in item["changes"]
+            for part in (change["column"], change["old_value"], change["new_value"])
+        )
+    else:
+        parts = item["row"]
+    return separator.join(str(part).lower() for part in parts)
+
+class FilterIndex:
+    """Substring filter over a list of diff records.
+
+    Record text is lowercased once and indexed by its trigrams. A query
+    that extends a recent one only searches that query's matches.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self.texts = [search_text(item) for item in items]
+        self.ngrams = None
+        self.recent = OrderedDict()
+
+    def filter(self, filter_text):
+        """Return the records matching an already lowercased filter text."""
+        if not filter_text:
+            return self.items
+        return [self.items[i] for i in self.search(filter_text)]
+
+    def search(self, query):
+        """Return the indices of the records containing query."""
+        if query in self.recent:
+            self.recent.move_to_end(query)
+            return self.recent[query]
+
+        candidates = self.narrow_from_recent(query)
+        if candidates is None:
+            candidates = self.ngram_candidates(query)
+
+        texts = self.texts
+        matches = [i for i in candidates if query in texts[i]]
+
+        self.recent[query] = matches
+        if len(self.recent) > RECENT_QUERIES:
+            self.recent.popitem(last=False)
+        return matches
+
+    def narrow_from_recent(self, query):
+        """Matches of the most selective recent query contained in query."""
+        best = None
+        for previous, matches in self.recent.items():
+            if previous in query and (best is None or len(matches) < len(best)):
+                best = matches
+        return best
+
+    def ngram_candidates(self, query):
+        """Indices of the records that may contain query, from the index."""
+        if len(query) < NGRAM_SIZE:
+            return range(len(self.texts))
+
+        if self.ngrams is None:
+            self.build_ngrams()
+
+        # The shortest posting list is a superset of the matches
+        postings = []
+        for i in range(len(query) - NGRAM_SIZE + 1):
+            posting = self.ngrams.get(query[i:i + NGRAM_SIZE])
+            if posting is None:
+                return []
+            postings.append(posting)
+        return min(postings, key=len)
+
+    def build_ngrams(self):
+        """Build the trigram -> record indices inverted index."""
+        ngrams = {}
+        for i, text in enumerate(self.texts):
+            for gram in {text[j:j + NGRAM_SIZE] for j in range(len(text) - NGRAM_SIZE + 1)}:
+                posting = ngrams.get(gram)
+                if posting is None:
+                    ngrams[gram] = posting = array('I')
+                posting.append(i)
+        self.ngrams = ngrams
@@ -0,0 +1,153 @@
+import csv
+import hashlib
+import io
+import locale
+
+from csvdiff import RowRecord, modified_record
+
+# Size of the row digest in bytes; entries are digest + 8 byte offset
+DIGEST_SIZE = 16
+
+def compare_fingerprint(file1_path, file2_path, key_columns):
+    """Compare two CSV files using a key -> (row hash, offset) index.
+
+    Only the index is held in memory. Full rows are read back from disk for
+    keys that exist on one side only or whose row hashes differ.
+    """
+    encoding = locale.getpreferredencoding(False)
+    index1, headers = build_index(file1_path, key_columns, encoding=encoding)
+    index2, _ = build_index(file2_path, key_columns, read_header=False, encoding=encoding)
+
+    return diff_indexes(file1_path, file2_path, index1, index2, headers, encoding), headers
+
+def diff_indexes(file1_path, file2_path, index1, index2, headers, encoding=None):
+    """Diff two fingerprint indexes, materializing only the rows needed."""
+    encoding = encoding or locale.getpreferredencoding(False)
+
+    only1 = [k for k in index1 if k not in index2]
+    only2 = [k for k in index2 if k not in index1]
+    changed = [k for k in index1 if k in index2 and index1[k][:DIGEST_SIZE] != index2[k][:DIGEST_SIZE]]
+
+    rows1 = read_rows_at(file1_path, (entry_offset(index1[k]) for k in only1 + changed), encoding)
+    rows2 = read_rows_at(file2_path, (entry_offset(index2[k]) for k in only2 + changed), encoding)
+
+    differences = {
+        "only_in_file1": [RowRecord(k, rows1[entry_offset(index1[k])]) for k in only1],
+        "only_in_file2": [RowRecord(k, rows2[entry_offset(index2[k])]) for k in only2],
+        "modified": []
+    }
+
+    for key in changed:
+        row1 = rows1[entry_offset(index1[key])]
+        row2 = rows2[entry_offset(index2[key])]
+        # Different bytes can still parse to the same fields, e.g. quoting
+        if row1 != row2:
+            differences["modified"].append(modified_record(key, row1, row2, headers))
+
+    return differences
+
+def build_index(file_path, key_columns, read_header=True, encoding=None):
+    """Index a CSV file as key -> digest + byte offset of the key's last row."""
+    encoding = encoding or locale.getpreferredencoding(False)
+    index = {}
+    headers = []
+
+    with open(file_path, 'rb') as f:
+        raw_rows = iter_raw_rows(f)
+        if read_header:
+            headers = next((parse_raw_row(raw, encoding) for _, raw in raw_rows), [])
+
+        for offset, raw in raw_rows:
+            row = parse_raw_row(raw, encoding)
+            key = tuple(row[i] for i in key_columns)
+            index[key] = make_entry(raw, offset)
+
+    return index, headers
+
+def make_entry(raw, offset):
+    """Pack a row digest and its byte offset into one bytes object."""
+    digest = hashlib.blake2b(raw.rstrip(b'\r\n'), digest_size=DIGEST_SIZE).digest()
+    return digest + offset.to_bytes(8, 'little')
+
+def entry_offset(entry):
+    """Byte offset stored in an index entry."""
+    return int.from_bytes(entry[DIGEST_SIZE:], 'little')
+
+def iter_raw_rows(f):
+    """Yield (offset, raw bytes) for each CSV record of a binary file.
+
+    A record continues over newlines while inside a quoted field, which is
+    tracked the way csv.reader does, see ends_quoted.
+    """
+    offset = 0
+    start = 0
+    pending = []
+    quoted = False
+
+    for line in f:
+        if not pending:
+            start = offset
+        pending.append(line)
+        offset += len(line)
+        if quoted or b'"' in line:
+            quoted = ends_quoted(line, quoted)
+
+        if not quoted:
+            yield start, b''.join(pending) if len(pending) > 1 else line
+            pending = []
+
+    if pending:
+        yield start, b''.join(pending)
+
+def ends_quoted(line, quoted=False):
+    """Whether a CSV record is inside a quoted field at the end of a line.
+
+    quoted says whether the line starts inside one. Like csv.reader, a
+    quote only opens a quoted field at the start of a field, so a quote in
+    an unquoted field such as 5" screen is an ordinary character.
+    """
+    position = 0
+    end = len(line)
+    while position < end:
+        if quoted:
+            close = line.find(b'"', position)
+            if close == -1:
+                return True
+            if line[close + 1:close + 2] == b'"':
+                # An escaped quote
+                position = close + 2
+                continue
+            quoted = False
+            position = close + 1
+        elif line[position:position + 1] == b'"':
+            quoted = True
+            position += 1
+            continue
+
+        # The rest of an unquoted field, up to the next field
+        comma = line.find(b',', position)
+        if comma == -1:
+            return False
+        position = comma + 1
+    return quoted
+
+def parse_raw_row(raw, encoding):
+    """Parse the raw bytes of one CSV record into a list of fields."""
+    text = raw.decode(encoding)
+    if '"' in text:
+        return next(csv.reader(io.StringIO(text, newline='')), [])
+
+    text = text.rstrip('\r\n')
+    return text.split(',') if text else []
+
+def read_rows_at(file_path, offsets, encoding):
+    """Read and parse the records starting at the given byte offsets."""
+    rows = {}
+
+    with open(file_path, 'rb') as f:
+        # Visit offsets in file order to keep the reads mostly sequential
+        for offset in sorted(set(offsets)):
+            f.seek(offset)
+            rows[offset] = parse_raw_row(next(iter_raw_rows(f))[1], encoding)
+
+    return rows
@@ -0,0 +1,1277 @@
+import csv
+import os.path
+import queue
+import threading
+import time
+import customtkinter as ctk
+from tkinter import filedialog, messagebox
+from datetime import datetime
+
+from cache import ComparisonCache
+from compressed import open_csv
+from diffstore import DiffStore, StoredRecords, save_differences
+from exporters import create_json_string, display_name, export_results
+from filter_index import FilterIndex
+from progress import ComparisonCancelled, Progress
+from stats import ComparisonStats, measure_phase
+
+# Set appearance mode and default color theme
+ctk.set_appearance_mode("Dark")
+ctk.set_default_color_theme("blue")
+
+# Results tabs and the kind of difference each one shows
+TAB_DATA_TYPES = {
+    "Modified Rows": "modified",
+    "Only in First File": "only_in_file1",
+    "Only in Second File": "only_in_file2"
+}
+
+# Number of records rendered at a time in each results tab
+PAGE_SIZE = 200
+
+# Pause in typing before the filter is applied, in milliseconds
+FILTER_DELAY_MS = 250
+
+# Minimum time between batches of records sent by a running comparison
+RESULT_BATCH_SECONDS = 0.2
+
+class CSVComparisonApp(ctk.CTk):
+    def __init__(self):
+        super().__init__()
+        
+        # Configure window
+        self.title("CSV Comparison Tool")
+        self.geometry("1100x800")
+        self.minsize(900, 700)
+        
+        # State variables
+        self.file1_path = ""
+        self.file2_path = ""
+        self.key_columns = [0]  # Column 0 is the key unless rows are matched by position
+        self.name_columns = []
+        # Columns left out of the comparison entirely, as selected and as
+        # applied to the running comparison and the shown results
+        self.ignored_columns = []
+        self.comparison_ignored_columns = []
+        self.result_ignored_columns = []
+        self.headers = []
+        self.comparison_results = None
+        # Parsed files and diffs are reused while the files are unchanged,
+        # so display column clicks only re-render
+        self.comparison_cache = ComparisonCache()
+
+        # Comparisons run on a worker thread and report back through a queue
+        self.comparison_queue = queue.Queue()
+        self.comparison_progress = None
+        self.comparison_job = 0
+        self.comparison_polling = False
+        # Comparisons and saves to a database share the worker machinery
+        self.comparison_task = "Comparison"
+        # Records of the running comparison by kind, shown as they arrive
+        self.live_results = None
+        # Database the shown results are read from, and the display column
+        # positions saved with them
+        self.result_store = None
+        self.result_name_positions = None
+
+        # Phase timings of the running comparison and of the shown results,
+        # which also collect filtering, rendering and export
+        self.comparison_stats = None
+        self.result_stats = None
+        self.details_window = None
+        self.details_text = None
+
+        # Filter indexes by id of the result list they search
+        self.filter_indexes = {}
+        self.filter_after_id = None
+        self.filtered_results = {
+            "modified": [],
+            "only_in_file1": [],
+            "only_in_file2": []
+        }
+        
+        # Create main UI container
+        self.main_scrollable_frame = ctk.CTkScrollableFrame(self)
+        self.main_scrollable_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        self.main_scrollable_frame.grid_columnconfigure(0, weight=1)
+        
+        # Create UI components
+        self.create_widgets()
+        
+        # Status message and cancel button for running comparisons
+        status_frame = ctk.CTkFrame(self, fg_color="transparent")
+        status_frame.pack(side="bottom", fill="x", padx=10, pady=5)
+
+        self.status_bar = ctk.CTkLabel(
+            status_frame, text="Ready", font=("Segoe UI", 12), anchor="w", height=30
+        )
+        self.status_bar.pack(side="left", fill="x", expand=True)
+
+        ctk.CTkButton(
+            status_frame, text="Details", command=self.show_details,
+            font=("Segoe UI", 12), height=30, width=100
+        ).pack(side="right", padx=(10, 0))
+
+        self.cancel_button = ctk.CTkButton(
+            status_frame, text="Cancel", command=self.cancel_comparison,
+            font=("Segoe UI", 12), height=30, width=100, fg_color="#E74C3C"
+        )
+    
+    def create_widgets(self):
+        """Create all UI widgets by calling specialized methods."""
+        self.create_header_section()
+        self.create_file_selection_section()
+        self.create_column_selection_section()
+        self.create_results_section()
+    
+    def create_header_section(self):
+        """Create the header section with app title and description."""
+        header_frame = ctk.CTkFrame(self.main_scrollable_frame, corner_radius=10)
+        header_frame.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="ew")
+        header_frame.grid_columnconfigure(0, weight=1)
+        
+        ctk.CTkLabel(
+            header_frame, 
+            text="CSV Comparison Tool",
+            font=ctk.CTkFont(family="Segoe UI", size=24, weight="bold")
+        ).grid(row=0, column=0, padx=20, pady=(15, 5), sticky="w")
+        
+        ctk.CTkLabel(
+            header_frame,
+            text="Compare two CSV files and identify differences",
+            font=ctk.CTkFont(family="Segoe UI", size=14)
+        ).grid(row=1, column=0, padx=20, pady=(0, 15), sticky="w")
+    
+    def create_file_selection_section(self):
+        """Create file selection section with browse buttons."""
+        middle_frame = ctk.CTkFrame(self.main_scrollable_frame, corner_radius=10)
+        middle_frame.grid(row=1, column=0, padx=10, pady=5, sticky="ew")
+        middle_frame.grid_columnconfigure(0, weight=1)
+        
+        file_frame = ctk.CTkFrame(middle_frame, corner_radius=10)
+        file_frame.grid(row=0, column=0, padx=15, pady=15, sticky="ew")
+        file_frame.grid_columnconfigure(1, weight=1)
+        
+        ctk.CTkLabel(
+            file_frame,
+            text="Step 1: Select CSV Files",
+            font=ctk.CTkFont(family="Segoe UI", size=16, weight="bold")
+        ).grid(row=0, column=0, columnspan=3, padx=15, pady=(15, 10), sticky="w")
+        
+        # File 1 selection
+        self.file1_entry = self.create_file_selector(
+            file_frame, 1, "First CSV File:", self.browse_file1
+        )
+        
+        # File 2 selection
+        self.file2_entry = self.create_file_selector(
+            file_frame, 2, "Second CSV File:", self.browse_file2
+        )
+        
+        # Files without a unique key column are compared row by row
+        self.positional_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            file_frame, text="No key column: match rows by position",
+            variable=self.positional_var, command=self.compare_files, font=("Segoe UI", 12)
+        ).grid(row=3, column=1, columnspan=2, padx=(0, 15), pady=(0, 15), sticky="w")
+    
+    def create_file_selector(self, parent, row, label_text, browse_command):
+        """Create a file selector row with label, entry, and browse button."""
+        ctk.CTkLabel(
+            parent, text=label_text, font=("Segoe UI", 12)
+        ).grid(row=row, column=0, padx=15, pady=10, sticky="w")
+        
+        entry = ctk.CTkEntry(parent, font=("Segoe UI", 12), height=32)
+        entry.grid(row=row, column=1, padx=(0, 10), pady=10, sticky="ew")
+        
+        ctk.CTkButton(
+            parent, 
+            text="Browse...", 
+            command=browse_command,
+            font=("Segoe UI", 12),
+            height=32
+        ).grid(row=row, column=2, padx=(0, 15), pady=10)
+        
+        return entry
+    
+    def create_column_selection_section(self):
+        """Create column selection area with available and selected columns."""
+        middle_frame = self.main_scrollable_frame.winfo_children()[1]
+        
+        column_frame = ctk.CTkFrame(middle_frame, corner_radius=10)
+        column_frame.grid(row=1, column=0, padx=15, pady=(0, 15), sticky="ew")
+        column_frame.grid_columnconfigure((0, 1, 2), weight=1)
+        
+        ctk.CTkLabel(
+            column_frame,
+            text="Step 2: Select Display Columns",
+            font=ctk.CTkFont(family="Segoe UI", size=16, weight="bold")
+        ).grid(row=0, column=0, columnspan=3, padx=15, pady=(15, 10), sticky="w")
+        
+        # Available columns frame
+        self.available_listbox = self.create_column_list(
+            column_frame, 0, "Available Columns (click to add, right-click to ignore)"
+        )
+        
+        # Selected columns frame
+        self.selected_listbox = self.create_column_list(
+            column_frame, 1, "Display Columns (click to remove)"
+        )
+        
+        # Ignored columns frame
+        self.ignored_listbox = self.create_column_list(
+            column_frame, 2, "Ignored Columns (click to compare again)"
+        )
+        
+        # Initialize button lists
+        self.available_buttons = []
+        self.selected_buttons = []
+        self.ignored_buttons = []
+    
+    def create_column_list(self, parent, col, title_text):
+        """Create a column list frame with title and scrollable area."""
+        frame = ctk.CTkFrame(parent)
+        frame.grid(row=1, column=col, padx=15, pady=(0, 15), sticky="nsew")
+        frame.grid_rowconfigure(1, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+        
+        ctk.CTkLabel(
+            frame,
+            text=title_text,
+            font=("Segoe UI", 12, "bold")
+        ).grid(row=0, column=0, padx=10, pady=(10, 5), sticky="w")
+        
+        listbox = ctk.CTkScrollableFrame(frame)
+        listbox.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="nsew")
+        listbox.grid_columnconfigure(0, weight=1)
+        
+        return listbox
+    
+    def create_results_section(self):
+        """Create results section with filter, format options and tabs."""
+        results_frame = ctk.CTkFrame(self.main_scrollable_frame, corner_radius=10)
+        results_frame.grid(row=2, column=0, padx=10, pady=5, sticky="nsew")
+        results_frame.grid_rowconfigure(1, weight=1)
+        results_frame.grid_columnconfigure(0, weight=1)
+        
+        # Results title and controls
+        controls_frame = ctk.CTkFrame(results_frame, fg_color="transparent")
+        controls_frame.grid(row=0, column=0, padx=15, pady=(15, 10), sticky="ew")
+        controls_frame.grid_columnconfigure(1, weight=1)
+        
+        ctk.CTkLabel(
+            controls_frame,
+            text="Step 3: View Results",
+            font=ctk.CTkFont(family="Segoe UI", size=16, weight="bold")
+        ).grid(row=0, column=0, padx=(0, 15), pady=0, sticky="w")
+        
+        # Filter controls
+        self.create_filter_controls(controls_frame)
+        
+        # Results tabs
+        self.results_tabs = ctk.CTkTabview(results_frame, corner_radius=10, height=300)
+        self.results_tabs.grid(row=1, column=0, padx=15, pady=(0, 15), sticky="nsew")
+        
+        # Create tabs with paging controls and text widgets
+        self.result_text_widgets = {}
+        self.result_page_labels = {}
+        self.result_page_starts = {}
+        self.display_format = "Text"
+        
+        for tab_name in TAB_DATA_TYPES:
+            tab = self.results_tabs.add(tab_name)
+            tab.grid_rowconfigure(1, weight=1)
+            tab.grid_columnconfigure(0, weight=1)
+            
+            self.result_page_labels[tab_name] = self.create_page_controls(tab, tab_name)
+            self.result_page_starts[tab_name] = 0
+            
+            text_widget = ctk.CTkTextbox(tab, font=("Segoe UI", 12))
+            text_widget.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="nsew")
+            self.result_text_widgets[tab_name] = text_widget
+    
+    def create_page_controls(self, parent, tab_name):
+        """Create paging controls for a results tab and return its page label."""
+        nav_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        nav_frame.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="ew")
+        nav_frame.grid_columnconfigure(2, weight=1)
+        
+        ctk.CTkButton(
+            nav_frame, text="◀ Previous",
+            command=lambda: self.change_page(tab_name, -1),
+            font=("Segoe UI", 12), height=28, width=100
+        ).grid(row=0, column=0, padx=(0, 5), pady=0)
+        
+        ctk.CTkButton(
+            nav_frame, text="Next ▶",
+            command=lambda: self.change_page(tab_name, 1),
+            font=("Segoe UI", 12), height=28, width=100
+        ).grid(row=0, column=1, padx=(0, 5), pady=0)
+        
+        page_label = ctk.CTkLabel(nav_frame, text="No records", font=("Segoe UI", 12), anchor="w")
+        page_label.grid(row=0, column=2, padx=10, pady=0, sticky="ew")
+        
+        # Jump to record number
+        ctk.CTkLabel(
+            nav_frame, text="Go to #:", font=("Segoe UI", 12)
+        ).grid(row=0, column=3, padx=(5, 5), pady=0, sticky="e")
+        
+        jump_entry = ctk.CTkEntry(nav_frame, font=("Segoe UI", 12), height=28, width=90)
+        jump_entry.grid(row=0, column=4, padx=0, pady=0, sticky="e")
+        jump_entry.bind("<Return>", lambda event: self.jump_to_record(tab_name, jump_entry.get()))
+        
+        return page_label
+    
+    def create_filter_controls(self, parent):
+        """Create filter controls including text entry and output options."""
+        # Filter label and entry
+        ctk.CTkLabel(
+            parent, text="Filter:", font=("Segoe UI", 12)
+        ).grid(row=0, column=1, padx=(15, 5), pady=0, sticky="e")
+        
+        self.filter_entry = ctk.CTkEntry(
+            parent, font=("Segoe UI", 12), height=32, width=200
+        )
+        self.filter_entry.grid(row=0, column=2, padx=(0, 5), pady=0, sticky="e")
+        self.filter_entry.bind("<KeyRelease>", self.schedule_filter)
+        
+        # Exact match checkbox
+        self.exact_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(
+            parent, text="Exact", variable=self.exact_var,
+            command=self.apply_filter, font=("Segoe UI", 12), height=32
+        ).grid(row=0, column=3, padx=(5, 5), pady=0, sticky="e")
+        
+        # Output format selection
+        ctk.CTkLabel(
+            parent, text="Output:", font=("Segoe UI", 12)
+        ).grid(row=0, column=4, padx=(5, 5), pady=0, sticky="e")
+        
+        self.output_format_var = ctk.StringVar(value="Text")
+        ctk.CTkOptionMenu(
+            parent, values=["Text", "CSV", "JSON"],
+            variable=self.output_format_var,
+            command=self.change_output_format,
+            font=("Segoe UI", 12), height=32, width=100
+        ).grid(row=0, column=5, padx=(0, 5), pady=0, sticky="e")
+        
+        # Download button
+        ctk.CTkButton(
+            parent, text="Download",
+            command=self.download_results,
+            font=("Segoe UI", 12), height=32, width=100
+        ).grid(row=0, column=6, padx=(5, 0), pady=0, sticky="e")
+        
+        # Saved results database buttons
+        ctk.CTkButton(
+            parent, text="Save DB",
+            command=self.save_to_database,
+            font=("Segoe UI", 12), height=32, width=100
+        ).grid(row=0, column=7, padx=(5, 0), pady=0, sticky="e")
+        
+        ctk.CTkButton(
+            parent, text="Open DB",
+            command=self.open_database,
+            font=("Segoe UI", 12), height=32, width=100
+        ).grid(row=0, column=8, padx=(5, 0), pady=0, sticky="e")
+    
+    def browse_file1(self):
+        """Browse for first CSV file."""
+        self.browse_file(is_first=True)
+    
+    def browse_file2(self):
+        """Browse for second CSV file."""
+        self.browse_file(is_first=False)
+    
+    def browse_file(self, is_first=True):
+        """Generic file browser that updates the appropriate entry."""
+        filename = filedialog.askopenfilename(
+            filetypes=[
+                ("CSV files", "*.csv *.csv.gz *.csv.bz2 *.csv.xz"),
+                ("All files", "*.*")
+            ]
+        )
+        if not filename:
+            return
+            
+        if is_first:
+            self.file1_path = filename
+            self.file1_entry.delete(0, "end")
+            self.file1_entry.insert(0, filename)
+        else:
+            self.file2_path = filename
+            self.file2_entry.delete(0, "end")
+            self.file2_entry.insert(0, filename)
+        
+        self.check_and_load_headers()
+    
+    def check_and_load_headers(self):
+        """Check if both files are selected and load headers."""
+        if (self.file1_path and os.path.isfile(self.file1_path) and 
+            self.file2_path and os.path.isfile(self.file2_path)):
+            self.load_headers()
+    
+    def load_headers(self):
+        """Load headers from the first CSV file and populate column lists."""
+        if not self.file1_path or not os.path.isfile(self.file1_path):
+            messagebox.showerror("Error", "Please select a valid first CSV file")
+            return
+        
+        try:
+            with open_csv(self.file1_path) as f:
+                reader = csv.reader(f)
+                self.headers = next(reader)
+                
+                # Clear existing buttons
+                for button in self.available_buttons + self.selected_buttons + self.ignored_buttons:
+                    button.destroy()
+                self.available_buttons = []
+                self.selected_buttons = []
+                self.ignored_buttons = []
+                
+                # Reset name and ignored columns
+                self.name_columns = []
+                self.ignored_columns = []
+                
+                # Populate available columns
+                for i, header in enumerate(self.headers):
+                    item_text = f"{i}: {header}"
+                    btn = ctk.CTkButton(
+                        self.available_listbox,
+                        text=item_text,
+                        command=lambda idx=i, txt=item_text: self.add_display_column(idx, txt),
+                        font=("Segoe UI", 12),
+                        anchor="w",
+                        height=30,
+                        fg_color=("#3B8ED0" if i % 2 == 0 else "#1F6AA5")
+                    )
+                    btn.bind("<Button-3>", lambda event, idx=i, txt=item_text: self.ignore_column(idx, txt))
+                    btn.grid(row=i, column=0, padx=5, pady=2, sticky="ew")
+                    self.available_buttons.append(btn)
+                
+                self.status_bar.configure(text=f"Loaded {len(self.headers)} columns")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load headers: {str(e)}")
+    
+    def add_display_column(self, col_index, item_text):
+        """Add a column to the display columns list."""
+        if col_index in self.name_columns:
+            return
+        
+        # A displayed column has to be compared
+        self.unignore_column(col_index, refresh=False)
+        self.name_columns.append(col_index)
+        
+        # Create removal button
+        btn = ctk.CTkButton(
+            self.selected_listbox,
+            text=item_text,
+            command=lambda idx=col_index: self.remove_display_column(idx),
+            font=("Segoe UI", 12),
+            anchor="w",
+            height=30,
+            fg_color="#E74C3C"
+        )
+        btn.grid(row=len(self.selected_buttons), column=0, padx=5, pady=2, sticky="ew")
+        self.selected_buttons.append(btn)
+        
+        self.status_bar.configure(text=f"Added '{item_text.split(':', 1)[1].strip()}' as a display column")
+        
+        # Auto-run comparison
+        self.compare_files()
+    
+    def remove_display_column(self, col_index, refresh=True):
+        """Remove a column from the display columns list."""
+        if col_index not in self.name_columns:
+            return
+            
+        idx = self.name_columns.index(col_index)
+        self.name_columns.remove(col_index)
+        
+        # Remove and destroy button
+        self.selected_buttons[idx].destroy()
+        self.selected_buttons.pop(idx)
+        
+        # Reposition remaining buttons
+        for i, btn in enumerate(self.selected_buttons):
+            btn.grid(row=i, column=0, padx=5, pady=2, sticky="ew")
+        
+        column_name = self.headers[col_index] if col_index < len(self.headers) else "Unknown"
+        self.status_bar.configure(text=f"Removed '{column_name}' from display columns")
+        
+        # Update results
+        if not refresh:
+            return
+        if self.name_columns:
+            self.compare_files()
+        else:
+            self.clear_results()
+    
+    def ignore_column(self, col_index, item_text):
+        """Leave a column out of the comparison."""
+        if col_index in self.ignored_columns:
+            return
+        
+        # An ignored column cannot be displayed
+        self.remove_display_column(col_index, refresh=False)
+        self.ignored_columns.append(col_index)
+        
+        btn = ctk.CTkButton(
+            self.ignored_listbox,
+            text=item_text,
+            command=lambda idx=col_index: self.unignore_column(idx),
+            font=("Segoe UI", 12),
+            anchor="w",
+            height=30,
+            fg_color="#7F8C8D"
+        )
+        btn.grid(row=len(self.ignored_buttons), column=0, padx=5, pady=2, sticky="ew")
+        self.ignored_buttons.append(btn)
+        
+        self.status_bar.configure(text=f"Ignoring '{item_text.split(':', 1)[1].strip()}' in comparisons")
+        
+        if self.name_columns:
+            self.compare_files()
+        else:
+            self.clear_results()
+    
+    def unignore_column(self, col_index, refresh=True):
+        """Compare a previously ignored column again."""
+        if col_index not in self.ignored_columns:
+            return
+        
+        idx = self.ignored_columns.index(col_index)
+        self.ignored_columns.remove(col_index)
+        
+        self.ignored_buttons[idx].destroy()
+        self.ignored_buttons.pop(idx)
+        
+        for i, btn in enumerate(self.ignored_buttons):
+            btn.grid(row=i, column=0, padx=5, pady=2, sticky="ew")
+        
+        column_name = self.headers[col_index] if col_index < len(self.headers) else "Unknown"
+        self.status_bar.configure(text=f"Comparing '{column_name}' again")
+        
+        if refresh and self.name_columns:
+            self.compare_files()
+    
+    def clear_results(self):
+        """Clear all result text widgets."""
+        for tab_name, text_widget in self.result_text_widgets.items():
+            text_widget.delete("1.0", "end")
+            self.result_page_labels[tab_name].configure(text="No records")
+    
+    def schedule_filter(self, event=None):
+        """Apply the filter once the user pauses typing."""
+        if self.filter_after_id is not None:
+            self.after_cancel(self.filter_after_id)
+        self.filter_after_id = self.after(FILTER_DELAY_MS, self.apply_filter)
+    
+    def apply_filter(self, event=None):
+        """Apply filter to the results as user types."""
+        self.filter_after_id = None
+        if self.live_results is not None:
+            self.filter_live_results()
+            return
+        if not self.comparison_results:
+            return
+        
+        self.display_results(
+            self.comparison_results, 
+            self.filter_entry.get().lower(),
+            self.exact_var.get(),
+            self.output_format_var.get()
+        )
+    
+    def change_output_format(self, choice):
+        """Handle output format change."""
+        if self.live_results is not None:
+            self.display_format = choice
+            for tab_name in TAB_DATA_TYPES:
+                self.render_page(tab_name)
+            return
+        if not self.comparison_results:
+            return
+        
+        self.display_results(
+            self.comparison_results,
+            self.filter_entry.get().lower(),
+            self.exact_var.get(),
+            choice
+        )
+    
+    def compare_files(self):
+        """Start comparing the two CSV files on a worker thread."""
+        # Validate inputs
+        if (not self.file1_path or not os.path.isfile(self.file1_path) or
+            not self.file2_path or not os.path.isfile(self.file2_path) or
+            not self.name_columns):
+            return
+        
+        # A new comparison replaces any that is still running
+        if self.comparison_progress is not None:
+            self.comparison_progress.cancel()
+        
+        self.comparison_job += 1
+        job = self.comparison_job
+        self.comparison_task = "Comparison"
+        self.comparison_ignored_columns = sorted(self.ignored_columns)
+        self.comparison_stats = ComparisonStats()
+        self.comparison_progress = Progress(
+            listener=lambda snapshot: self.comparison_queue.put(("progress", job, snapshot))
+        )
+        engine = "positional" if self.positional_var.get() else "memory"
+        
+        self.status_bar.configure(text="Comparing files...")
+        self.cancel_button.pack(side="right", padx=(10, 0))
+        
+        threading.Thread(
+            target=self.run_comparison,
+            args=(job, self.comparison_progress, self.file1_path, self.file2_path,
+                  list(self.key_columns), self.comparison_ignored_columns, self.comparison_stats, engine),
+            daemon=True
+        ).start()
+        
+        if not self.comparison_polling:
+            self.comparison_polling = True
+            self.after(100, self.poll_comparison)
+    
+    def run_comparison(self, job, progress, file1_path, file2_path, key_columns, ignored_columns, stats,
+                       engine="memory"):
+        """Run a comparison on the worker thread, queueing records in batches and then its outcome.
+        
+        Only the memory engine finds records while it runs; the outcome of
+        other engines is queued when they are done.
+        """
+        options = {"ignore_columns": ignored_columns} if ignored_columns else {}
+        batch = []
+        last_batch = 0.0
+        try:
+            if engine != "memory":
+                result = self.comparison_cache.compare(
+                    file1_path, file2_path, key_columns, engine=engine, progress=progress, stats=stats, **options
+                )
+                self.comparison_queue.put(("done", job, result))
+                return
+            
+            for kind, payload in self.comparison_cache.iter_differences(
+                file1_path, file2_path, key_columns, progress=progress, stats=stats, **options
+            ):
+                if kind == "done":
+                    self.comparison_queue.put(("done", job, payload))
+                elif kind == "headers":
+                    self.comparison_queue.put(("headers", job, payload))
+                else:
+                    batch.append((kind, payload))
+                    now = time.monotonic()
+                    if now - last_batch >= RESULT_BATCH_SECONDS:
+                        self.comparison_queue.put(("records", job, batch))
+                        batch = []
+                        last_batch = now
+        except ComparisonCancelled:
+            self.comparison_queue.put(("cancelled", job, None))
+        except Exception as e:
+            self.comparison_queue.put(("error", job, e))
+    
+    def poll_comparison(self):
+        """Handle messages from the comparison worker on the Tk main thread."""
+        # Filtered lengths before this poll's records, by kind
+        previous_lengths = {}
+        while True:
+            try:
+                kind, job, payload = self.comparison_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            # Ignore messages from comparisons that have been replaced
+            if job != self.comparison_job:
+                continue
+            
+            if kind == "progress":
+                self.status_bar.configure(text=self.format_progress(payload))
+                continue
+            if kind == "headers":
+                self.show_live_results(payload)
+                continue
+            if kind == "records":
+                for data_type, length in self.add_live_records(payload).items():
+                    previous_lengths.setdefault(data_type, length)
+                continue
+            
+            self.comparison_progress = None
+            self.cancel_button.pack_forget()
+            was_live = self.live_results is not None
+            self.live_results = None
+            previous_lengths = {}
+            
+            if kind == "done":
+                self.release_store()
+                self.comparison_results = payload
+                self.result_ignored_columns = self.comparison_ignored_columns
+                self.result_stats = self.comparison_stats
+                self.filter_indexes = {}
+                self.display_results(
+                    self.comparison_results,
+                    self.filter_entry.get().lower(),
+                    self.exact_var.get(),
+                    self.output_format_var.get()
+                )
+            elif kind == "saved":
+                self.status_bar.configure(text=f"Results saved to {payload}")
+            elif kind == "cancelled":
+                if was_live:
+                    self.clear_live_results()
+                self.status_bar.configure(text=f"{self.comparison_task} cancelled")
+            else:
+                if was_live:
+                    self.clear_live_results()
+                messagebox.showerror("Error", f"{self.comparison_task} failed: {str(payload)}")
+                self.status_bar.configure(text=f"{self.comparison_task} failed")
+        
+        self.refresh_live_tabs(previous_lengths)
+        
+        if self.comparison_progress is not None:
+            self.after(100, self.poll_comparison)
+        else:
+            self.comparison_polling = False
+    
+    def show_live_results(self, headers):
+        """Replace the shown results with the empty results of the running comparison."""
+        self.release_store()
+        self.comparison_results = None
+        self.live_results = {data_type: [] for data_type in TAB_DATA_TYPES.values()}
+        self.result_ignored_columns = self.comparison_ignored_columns
+        self.result_stats = self.comparison_stats
+        self.filter_indexes = {}
+        self.filtered_results = {data_type: [] for data_type in TAB_DATA_TYPES.values()}
+        self.filtered_results["headers"] = headers
+        
+        self.display_format = self.output_format_var.get()
+        for tab_name in TAB_DATA_TYPES:
+            self.result_page_starts[tab_name] = 0
+            self.render_page(tab_name)
+    
+    def add_live_records(self, batch):
+        """Add a batch of (kind, record) pairs to the running comparison's results.
+        
+        Returns the filtered length of each kind before the batch.
+        """
+        added = {}
+        for data_type, record in batch:
+            self.live_results[data_type].append(record)
+            added.setdefault(data_type, []).append(record)
+        
+        filter_text = self.filter_entry.get().lower()
+        lengths = {}
+        for data_type, records in added.items():
+            lengths[data_type] = len(self.filtered_results[data_type])
+            if filter_text:
+                # Batches are searched once; the index is built for the final results
+                records = FilterIndex(records).filter(filter_text)
+            self.filtered_results[data_type].extend(records)
+        return lengths
+    
+    def refresh_live_tabs(self, previous_lengths):
+        """Show records added to the tabs since they were last rendered.
+        
+        Only a page that was not full is rendered again; otherwise updating
+        the record count under the tab is enough.
+        """
+        for tab_name, data_type in TAB_DATA_TYPES.items():
+            if data_type not in previous_lengths:
+                continue
+            if previous_lengths[data_type] < self.result_page_starts[tab_name] + PAGE_SIZE:
+                self.render_page(tab_name)
+            else:
+                self.update_page_label(tab_name)
+    
+    def filter_live_results(self):
+        """Filter the records of the running comparison found so far."""
+        filter_text = self.filter_entry.get().lower()
+        for data_type, items in self.live_results.items():
+            # Copies, since later batches are added to both lists
+            self.filtered_results[data_type] = FilterIndex(items).filter(filter_text) if filter_text else list(items)
+        
+        for tab_name in TAB_DATA_TYPES:
+            self.result_page_starts[tab_name] = 0
+            self.render_page(tab_name)
+    
+    def clear_live_results(self):
+        """Clear the partial results of a comparison that did not finish."""
+        self.filtered_results = {data_type: [] for data_type in TAB_DATA_TYPES.values()}
+        self.clear_results()
+    
+    def save_to_database(self):
+        """Save the current results to a SQLite database on a worker thread."""
+        if not self.comparison_results or self.comparison_progress is not None:
+            messagebox.showinfo("No Data", "No comparison results to save.")
+            return
+        if self.result_store is not None:
+            messagebox.showinfo("Already Saved", f"These results are saved in {self.result_store.path}.")
+            return
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".sqlite",
+            filetypes=[("SQLite databases", "*.sqlite *.db")],
+            initialfile=f"csv_comparison_{timestamp}.sqlite"
+        )
+        if not filename:
+            return
+        
+        differences, headers = self.comparison_results
+        info = {
+            "files": [self.file1_path, self.file2_path],
+            "key_columns": self.key_columns,
+            "ignored_columns": self.result_ignored_columns,
+            "name_positions": self.name_positions()
+        }
+        
+        self.comparison_job += 1
+        job = self.comparison_job
+        self.comparison_task = "Saving"
+        self.comparison_progress = Progress(
+            listener=lambda snapshot: self.comparison_queue.put(("progress", job, snapshot))
+        )
+        
+        self.status_bar.configure(text="Saving results...")
+        self.cancel_button.pack(side="right", padx=(10, 0))
+        
+        threading.Thread(
+            target=self.run_save,
+            args=(job, self.comparison_progress, filename, differences, headers, info),
+            daemon=True
+        ).start()
+        
+        if not self.comparison_polling:
+            self.comparison_polling = True
+            self.after(100, self.poll_comparison)
+    
+    def run_save(self, job, progress, filename, differences, headers, info):
+        """Save results on the worker thread and queue the outcome."""
+        try:
+            save_differences(filename, differences, headers, info, progress)
+            self.comparison_queue.put(("saved", job, filename))
+        except ComparisonCancelled:
+            self.comparison_queue.put(("cancelled", job, None))
+        except Exception as e:
+            self.comparison_queue.put(("error", job, e))
+    
+    def open_database(self):
+        """Show results saved in a SQLite database, reading them on demand."""
+        filename = filedialog.askopenfilename(
+            filetypes=[("SQLite databases", "*.sqlite *.db"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+        
+        try:
+            store = DiffStore(filename)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open results: {str(e)}")
+            return
+        
+        # Opened results replace those of a running comparison
+        if self.comparison_progress is not None:
+            self.comparison_progress.cancel()
+            self.comparison_progress = None
+            self.comparison_job += 1
+            self.cancel_button.pack_forget()
+        self.live_results = None
+        
+        self.release_store()
+        self.result_store = store
+        self.comparison_results = (store.differences(), store.headers)
+        self.result_ignored_columns = store.info.get("ignored_columns", [])
+        self.result_name_positions = store.info.get("name_positions")
+        self.result_stats = None
+        self.filter_indexes = {}
+        self.display_results(
+            self.comparison_results,
+            self.filter_entry.get().lower(),
+            self.exact_var.get(),
+            self.output_format_var.get()
+        )
+    
+    def release_store(self):
+        """Close the database of the shown results, if they came from one."""
+        if self.result_store is not None:
+            self.result_store.close()
+            self.result_store = None
+        self.result_name_positions = None
+    
+    def cancel_comparison(self):
+        """Cancel the running comparison."""
+        if self.comparison_progress is not None:
+            self.comparison_progress.cancel()
+            self.status_bar.configure(text="Cancelling comparison...")
+    
+    def show_details(self):
+        """Show per-phase timings of the current results in a details window."""
+        if self.details_window is None or not self.details_window.winfo_exists():
+            self.details_window = ctk.CTkToplevel(self)
+            self.details_window.title("Comparison Details")
+            self.details_window.geometry("700x300")
+            
+            self.details_text = ctk.CTkTextbox(self.details_window, font=("Consolas", 12))
+            self.details_text.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        if self.result_stats is not None:
+            text = "\n".join(self.result_stats.summary_lines())
+        else:
+            text = "No comparison has finished yet."
+        
+        self.details_text.delete("1.0", "end")
+        self.details_text.insert("1.0", text)
+        self.details_window.lift()
+    
+    def format_progress(self, snapshot):
+        """Format a progress snapshot for the status bar."""
+        megabytes = 1024 * 1024
+        if self.comparison_task == "Saving":
+            return f"Saving results... {snapshot['rows']:,} records written"
+        text = f"{snapshot['phase'] or 'Comparing'}..."
+        if snapshot["total_bytes"]:
+            text += f" {snapshot['bytes_read'] / megabytes:,.1f} of {snapshot['total_bytes'] / megabytes:,.1f} MB"
+        text += f", {snapshot['rows']:,} rows parsed"
+        if snapshot["diffs"]:
+            text += f", {snapshot['diffs']:,} differences found"
+        return text
+    
+    def display_results(self, comparison_data, filter_text="", exact_mode=False, output_format="Text"):
+        """Display results with optional filtering in the selected format."""
+        differences, headers = comparison_data
+        
+        # Filter items
+        with measure_phase(self.result_stats, "filter") as phase:
+            filtered_modified = self.filter_items(differences['modified'], filter_text, exact_mode)
+            filtered_file1 = self.filter_items(differences['only_in_file1'], filter_text, exact_mode)
+            filtered_file2 = self.filter_items(differences['only_in_file2'], filter_text, exact_mode)
+            phase.rows += len(filtered_modified) + len(filtered_file1) + len(filtered_file2)
+        
+        # Store filtered results for export
+        self.filtered_results = {
+            "modified": filtered_modified,
+            "only_in_file1": filtered_file1,
+            "only_in_file2": filtered_file2,
+            "headers": headers
+        }
+        
+        # Only the first page of each tab is rendered; the rest on demand
+        self.display_format = output_format
+        for tab_name in TAB_DATA_TYPES:
+            self.result_page_starts[tab_name] = 0
+            self.render_page(tab_name)
+        
+        # Update status message
+        counts = {
+            "Modified": len(filtered_modified),
+            "Only in first": len(filtered_file1),
+            "Only in second": len(filtered_file2)
+        }
+        
+        status_parts = []
+        if filter_text:
+            status_parts.append(f"Filtered by '{filter_text}'")
+            if exact_mode:
+                status_parts.append("Exact mode enabled")
+        
+        status_parts.extend([f"{label}: {count}" for label, count in counts.items() if count > 0])
+        self.status_bar.configure(text=". ".join(status_parts) if status_parts else "No differences found")
+        
+        # Switch to tab with most differences
+        max_count = max(counts.values(), default=0)
+        if max_count > 0:
+            if max_count == counts["Modified"]:
+                self.results_tabs.set("Modified Rows")
+            elif max_count == counts["Only in first"]:
+                self.results_tabs.set("Only in First File")
+            elif max_count == counts["Only in second"]:
+                self.results_tabs.set("Only in Second File")
+    
+    def render_page(self, tab_name):
+        """Render the current page of records into a results tab."""
+        data_type = TAB_DATA_TYPES[tab_name]
+        items = self.filtered_results.get(data_type, [])
+        headers = self.filtered_results.get("headers", [])
+        start = self.result_page_starts[tab_name]
+        page = items[start:start + PAGE_SIZE]
+        
+        # Select page formatter based on format
+        page_formatters = {
+            "Text": self.format_text_page,
+            "CSV": self.format_csv_page,
+            "JSON": self.format_json_page
+        }
+        
+        titles = {
+            "modified": "Modified Rows:",
+            "only_in_file1": "Rows only in first file:",
+            "only_in_file2": "Rows only in second file:"
+        }
+        
+        with measure_phase(self.result_stats, "render", rows=len(page)):
+            text = f"{titles[data_type]} {len(items)}\n\n"
+            text += page_formatters[self.display_format](page, start, data_type, headers)
+            
+            # A single insert per page keeps rendering time independent of the total
+            text_widget = self.result_text_widgets[tab_name]
+            text_widget.delete("1.0", "end")
+            text_widget.insert("1.0", text)
+        
+        self.update_page_label(tab_name)
+    
+    def update_page_label(self, tab_name):
+        """Show the record range of the current page and the total under a results tab."""
+        items = self.filtered_results.get(TAB_DATA_TYPES[tab_name], [])
+        start = self.result_page_starts[tab_name]
+        if items:
+            page_text = f"Records {start + 1:,}-{min(start + PAGE_SIZE, len(items)):,} of {len(items):,}"
+        else:
+            page_text = "No records"
+        self.result_page_labels[tab_name].configure(text=page_text)
+    
+    def change_page(self, tab_name, step):
+        """Move a results tab forward or back by a page."""
+        total = len(self.filtered_results.get(TAB_DATA_TYPES[tab_name], []))
+        last_start = max(0, (total - 1) // PAGE_SIZE * PAGE_SIZE)
+        start = self.result_page_starts[tab_name] + step * PAGE_SIZE
+        start = min(max(start, 0), last_start)
+        
+        if start != self.result_page_starts[tab_name]:
+            self.result_page_starts[tab_name] = start
+            self.render_page(tab_name)
+    
+    def jump_to_record(self, tab_name, record_text):
+        """Show the page holding a record number and scroll to it."""
+        total = len(self.filtered_results.get(TAB_DATA_TYPES[tab_name], []))
+        try:
+            record = int(record_text.replace(",", ""))
+        except ValueError:
+            self.status_bar.configure(text=f"'{record_text}' is not a record number")
+            return
+        
+        if not 1 <= record <= total:
+            self.status_bar.configure(text=f"Record {record} is out of range (1-{total})")
+            return
+        
+        start = (record - 1) // PAGE_SIZE * PAGE_SIZE
+        if start != self.result_page_starts[tab_name]:
+            self.result_page_starts[tab_name] = start
+            self.render_page(tab_name)
+        
+        # Text and CSV pages number their records at the start of a line
+        text_widget = self.result_text_widgets[tab_name]
+        index = text_widget.search(f"^{record}[.,]", "1.0", regexp=True)
+        text_widget.see(index or "1.0")
+    
+    def name_positions(self):
+        """Positions of the display columns in result rows without ignored columns."""
+        if self.result_name_positions is not None:
+            return self.result_name_positions
+        return [
+            col - sum(1 for ignored in self.result_ignored_columns if ignored < col)
+            for col in self.name_columns
+        ]
+    
+    def get_display_name(self, row):
+        """Get display name from a row using name columns."""
+        return display_name(row, self.name_positions())
+    
+    def format_text_page(self, items, start, data_type, headers):
+        """Format a page of records in text format."""
+        if data_type == "modified":
+            return self.format_modified_text(items, start)
+        return self.format_file_only_text(items, start, headers)
+    
+    def format_modified_text(self, items, start):
+        """Format modified records in text format."""
+        lines = []
+        
+        # Show changes based on filter settings
+        filter_text = self.filter_entry.get().lower()
+        exact_mode = self.exact_var.get()
+        
+        for i, mod in enumerate(items, start):
+            lines.append(f"{i+1}. {self.get_display_name(mod['row'])}")
+            
+            changes_to_show = mod["changes"]
+            if filter_text and exact_mode:
+                # In exact mode, only show matching columns
+                changes_to_show = [
+                    c for c in mod["changes"]
+                    if (filter_text in str(c["column"]).lower() or
+                        filter_text in str(c["old_value"]).lower() or
+                        filter_text in str(c["new_value"]).lower())
+                ]
+            
+            for change in changes_to_show:
+                lines.append(f"   Column '{change['column']}': '{change['old_value']}' → '{change['new_value']}'")
+            
+            lines.append("")
+        
+        return "\n".join(lines) + "\n" if lines else ""
+    
+    def format_file_only_text(self, items, start, headers):
+        """Format records that are only in one file in text format."""
+        lines = []
+        
+        filter_text = self.filter_entry.get().lower()
+        exact_mode = self.exact_var.get()
+        
+        for i, item in enumerate(items, start):
+            lines.append(f"{i+1}. {self.get_display_name(item['row'])}")
+            
+            # Determine which fields to show based on filter
+            for j, val in enumerate(item["row"]):
+                if j >= len(headers):
+                    continue
+                    
+                # Skip non-matching fields in exact mode with filter
+                if filter_text and exact_mode and filter_text not in str(val).lower():
+                    continue
+                    
+                lines.append(f"   {headers[j]}: {val}")
+            
+            lines.append("")
+        
+        return "\n".join(lines) + "\n" if lines else ""
+    
+    def format_csv_page(self, items, start, data_type, headers):
+        """Format a page of records in CSV format."""
+        if not items:
+            return ""
+        
+        lines = []
+        if data_type == "modified":
+            # Create header row
+            header_row = "Item #,Name"
+            for h in headers:
+                header_row += f",{h} (Old),{h} (New)"
+            lines.append(header_row)
+            
+            # Create data rows
+            for i, item in enumerate(items, start):
+                row = f"{i+1},{self.get_display_name(item['row'])}"
+                for j in range(len(headers)):
+                    old_val = item["row"][j] if j < len(item["row"]) else ""
+                    new_val = item["row2"][j] if j < len(item["row2"]) else ""
+                    row += f",{old_val},{new_val}"
+                lines.append(row)
+        else:
+            # Header row
+            lines.append("Item #,Name," + ",".join(headers))
+            
+            # Data rows
+            for i, item in enumerate(items, start):
+                row = f"{i+1},{self.get_display_name(item['row'])}"
+                for j in range(len(headers)):
+                    val = item["row"][j] if j < len(item["row"]) else ""
+                    row += f",{val}"
+                lines.append(row)
+        
+        return "\n".join(lines) + "\n"
+    
+    def format_json_page(self, items, start, data_type, headers):
+        """Format a page of records in JSON format."""
+        return self.create_json_string(items, data_type, headers)
+    
+    def create_json_string(self, items, item_type, headers):
+        """Create a JSON string from the filtered items."""
+        return create_json_string(
+            items, item_type, headers, self.name_positions(),
+            self.filter_entry.get().lower(), self.exact_var.get()
+        )
+    
+    def filter_items(self, items, filter_text, exact_mode=False):
+        """Filter items based on filter text."""
+        if not filter_text:
+            return items
+        
+        # Saved results are filtered by the database
+        if isinstance(items, StoredRecords):
+            return items.filter(filter_text)
+        
+        # Indexes are built on first use and kept until the results change
+        index = self.filter_indexes.get(id(items))
+        if index is None or index.items is not items:
+            with measure_phase(self.result_stats, "filter index", rows=len(items)):
+                index = FilterIndex(items)
+            self.filter_indexes[id(items)] = index
+        
+        return index.filter(filter_text)
+    
+    def download_results(self):
+        """Download the current results in the selected format."""
+        if not self.comparison_results:
+            messagebox.showinfo("No Data", "No comparison results to download.")
+            return
+        
+        # Get current tab and data type
+        current_tab = self.results_tabs.get()
+        data_type = TAB_DATA_TYPES[current_tab]
+        items = self.filtered_results[data_type]
+        
+        # Configure file format options
+        format_config = {
+            "CSV": {
+                "ext": ".csv",
+                "filetypes": [("CSV files", "*.csv")],
+                "save_func": self.save_as_csv
+            },
+            "JSON": {
+                "ext": ".json",
+                "filetypes": [("JSON files", "*.json"), ("JSON Lines files", "*.jsonl")],
+                "save_func": self.save_as_json
+            },
+            "Text": {
+                "ext": ".txt",
+                "filetypes": [("Text files", "*.txt")],
+                "save_func": self.save_as_text
+            }
+        }
+        
+        output_format = self.output_format_var.get()
+        config = format_config[output_format]
+        
+        # Generate timestamp and filename
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_filename = f"csv_comparison_{data_type}_{timestamp}"
+        
+        filename = filedialog.asksaveasfilename(
+            defaultextension=config["ext"],
+            filetypes=config["filetypes"],
+            initialfile=f"{base_filename}{config['ext']}"
+        )
+        
+        if filename:
+            try:
+                with measure_phase(self.result_stats, "export", rows=len(items)):
+                    config["save_func"](filename, items, data_type)
+                self.status_bar.configure(text=f"Results saved to {filename}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save file: {str(e)}")
+    
+    def save_as_csv(self, filename, items, data_type):
+        """Save the filtered results as a CSV file."""
+        export_results(filename, items, data_type, self.filtered_results["headers"], self.name_positions(), "csv")
+    
+    def save_as_json(self, filename, items, data_type):
+        """Save the filtered results as a JSON file, or JSON Lines for .jsonl names."""
+        output_format = "jsonl" if filename.lower().endswith(".jsonl") else "json"
+        export_results(
+            filename, items, data_type, self.filtered_results["headers"], self.name_positions(),
+            output_format, self.filter_entry.get().lower(), self.exact_var.get()
+        )
+    
+    def save_as_text(self, filename, items, data_type):
+        """Save the filtered results as a text file."""
+        export_results(filename, items, data_type, self.filtered_results["headers"], self.name_positions(), "text")
+
+def main():
+    """Launch the CSV Comparison Tool window."""
+    app = CSVComparisonApp()
+    app.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+import argparse
+import hashlib
+import json
+import locale
+import os
+import struct
+import sys
+import time
+
+from csvdiff import RowRecord, compare_in_memory, modified_record
+from fingerprint import DIGEST_SIZE, ends_quoted, entry_offset, iter_raw_rows, make_entry, parse_raw_row, read_rows_at
+from mapped_reader import ascii_compatible
+from snapshot import pack_record, read_records, read_sidecar, write_sidecar
+
+# State files live next to file1 as <name>.csv + STATE_SUFFIX
+STATE_SUFFIX = ".csvdiff-tail"
+
+# State files start in the snapshot sidecar layout: JSON metadata, then
+# the (key, entry) records of file1's index and of file2's. Each later
+# save appends an update in the same layout, holding the records indexed
+# since in the order they were applied.
+STATE_MAGIC = b"CSVDIFFTAIL2\n"
+
+# Bytes per digest of the parsed part of a file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Seconds between refreshes when watching
+DEFAULT_INTERVAL = 5.0
+
+def compare_incremental(file1_path, file2_path, key_columns, state_path=None):
+    """Compare two append-only CSV files, parsing only what was appended.
+
+    The key indexes and differences of the last run are kept in a state
+    file, by default next to file1, and only rows appended since then are
+    parsed and applied. A file that shrank or whose parsed bytes changed
+    was rewritten and is read again from the start, as is a file whose
+    last row had no line ending when it was parsed; see appended_only for
+    how much of the parsed bytes is checked. The result is the same as the
+    memory engine's.
+
+    Files in encodings other than ASCII supersets are compared in memory
+    instead.
+    """
+    encoding = locale.getpreferredencoding(False)
+    if not ascii_compatible(encoding):
+        return compare_in_memory(file1_path, file2_path, key_columns)
+
+    state_path = state_path or state_file_path(file1_path)
+    comparison = load_comparison(state_path)
+    if comparison is None or not comparison.matches(file1_path, file2_path, key_columns, encoding):
+        comparison = TailComparison(file1_path, file2_path, key_columns, encoding)
+
+    result = comparison.refresh()
+    if comparison.last_refresh != "unchanged":
+        try:
+            comparison.save(state_path)
+        except OSError:
+            # E.g. a read-only directory; the next run starts over
+            pass
+    return result
+
+def state_file_path(file1_path):
+    """Path of the default state file of comparisons against file1."""
+    return file1_path + STATE_SUFFIX
+
+def load_comparison(state_path):
+    """Load a TailComparison saved with save, or None if there is none.
+
+    The snapshot at the start of the file is restored and the updates
+    appended to it are applied in order. An update cut short, e.g. by a
+    crash while saving, is ignored; the rows it held are read again.
+    """
+    try:
+        meta, data = read_sidecar(state_path, STATE_MAGIC)
+        key_count = len(meta["key_columns"])
+        records1, pos = read_records(data, meta["rows"][0], key_count)
+        records2, pos = read_records(data, meta["rows"][1], key_count, pos)
+        if pos > len(data):
+            return None
+
+        comparison = TailComparison(*meta["paths"], meta["key_columns"], meta["encoding"])
+        comparison.indexes = [dict(records1), dict(records2)]
+        comparison.keys = {kind: dict.fromkeys(map(tuple, keys)) for kind, keys in meta["keys"].items()}
+        comparison.modified_unordered = meta["modified_unordered"]
+        comparison.apply_meta(meta)
+
+        while True:
+            update = read_update(data, pos, key_count)
+            if update is None:
+                break
+            meta, records, pos = update
+            for i in (0, 1):
+                for key, entry in records[i]:
+                    comparison.add_entry(i, key, entry)
+            comparison.apply_meta(meta)
+
+        comparison.log = [[], []]
+        comparison.saved = (state_path, os.path.getsize(state_path) - len(data) + pos)
+    except (OSError, ValueError, KeyError, TypeError, IndexError, struct.error):
+        return None
+    return comparison
+
+def read_update(data, pos, key_count):
+    """Decode the update at pos of a state file: (meta, records per file, end).
+
+    Returns None at the end of the data or for an update cut short.
+    """
+    line_end = data.find(b"\n", pos)
+    if line_end == -1:
+        return None
+    try:
+        meta = json.loads(data[pos:line_end])
+        end = line_end + 1 + meta["size"]
+        if end > len(data):
+            return None
+        records1, pos = read_records(data, meta["rows"][0], key_count, line_end + 1)
+        records2, pos = read_records(data, meta["rows"][1], key_count, pos)
+    except (ValueError, KeyError, TypeError, IndexError, struct.error):
+        return None
+    if pos != end:
+        return None
+    return meta, (records1, records2), end
+
+def range_hasher(f, start, end):
+    """A hasher fed with the bytes from start to end of a binary file."""
+    hasher = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    f.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = f.read(min(HASH_BLOCK_SIZE, remaining))
+        if not block:
+            break
+        hasher.update(block)
+        remaining -= len(block)
+    return hasher
+
+def complete(raw):
+    """Whether a raw record ends with a line ending outside quotes."""
+    return raw.endswith(b"\n") and not (b'"' in raw and ends_quoted(raw))
+
+class TailComparison:
+    """Differences of two append-only CSV files, kept up to date by refresh.
+
+    Holds fingerprint indexes (key -> row digest + offset) of both files
+    and the keys of each kind of difference. Rows appended since the last
+    refresh update them in place, and full rows are only read back for the
+    differences, so a refresh costs about as much as the appended bytes
+    and the differences. Duplicate keys behave as in the memory engine:
+    the last row wins and the key keeps the position of its first row.
+    """
+
+    def __init__(self, file1_path, file2_path, key_columns, encoding=None):
+        self.paths = [os.path.abspath(file1_path), os.path.abspath(file2_path)]
+        self.key_columns = list(key_columns)
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.last_refresh = None
+        self.reset()
+
+    def reset(self):
+        """Forget everything read so far."""
+        # Per file: bytes parsed, digests of their whole HASH_BLOCK_SIZE
+        # blocks and of the bytes after those, [size, mtime_ns] when last
+        # read and key -> entry
+        self.offsets = [0, 0]
+        self.blocks = [[], []]
+        self.digests = [None, None]
+        self.stats = [None, None]
+        # Per file: whether the parsed bytes end in a row without a line ending
+        self.partial = [False, False]
+        # Per file: hasher of the bytes after the whole blocks, while refreshing
+        self.hashers = [hashlib.blake2b(digest_size=DIGEST_SIZE) for _ in range(2)]
+        self.indexes = [{}, {}]
+        self.headers = []
+        # Keys of each kind of difference, as ordered sets
+        self.keys = {"only_in_file1": {}, "only_in_file2": {}, "modified": {}}
+        # Whether modified keys were added out of file1 order
+        self.modified_unordered = False
+        # key -> ((entry1, entry2), record) of the last result's records
+        self.records = {}
+        # Per file: (key, entry) records indexed since the last save, or
+        # None when the next save writes a snapshot; the state file and its
+        # size after that save; and the block digests saved in it
+        self.log = None
+        self.saved = None
+        self.saved_blocks = [0, 0]
+
+    def matches(self, file1_path, file2_path, key_columns, encoding):
+        """Whether this comparison is of the given files and settings."""
+        return (self.paths == [os.path.abspath(file1_path), os.path.abspath(file2_path)] and
+                self.key_columns == list(key_columns) and self.encoding == encoding)
+
+    def refresh(self, partial_rows=True):
+        """Apply rows appended to either file and return (differences, headers).
+
+        A last row without a line ending is parsed unless partial_rows is
+        False, which leaves it for a later refresh when files are still
+        being written. A file changed after such a row was parsed is read
+        again in full, since the row may have grown.
+
+        last_refresh is set to "unchanged", "appended" or "full", the last
+        on the first refresh or when a file was rewritten and everything
+        was read again. Files whose size and mtime did not change since
+        they were last read are not opened.
+        """
+        stats = []
+        for path in self.paths:
+            st = os.stat(path)
+            stats.append([st.st_size, st.st_mtime_ns])
+        changed = [stats[i] != self.stats[i] for i in (0, 1)]
+
+        if self.offsets == [0, 0] or not all(
+            not self.partial[i] and self.appended_only(i, stats[i][0]) for i in (0, 1) if changed[i]
+        ):
+            self.reset()
+            self.last_refresh = "full"
+            changed = [True, True]
+        else:
+            self.last_refresh = "unchanged"
+
+        for i in (0, 1):
+            if not changed[i]:
+                continue
+            # Stats from before reading, so bytes appended while reading
+            # are seen as a change next time
+            self.stats[i] = stats[i]
+            if self.read_tail(i, partial_rows) and self.last_refresh == "unchanged":
+                self.last_refresh = "appended"
+
+        return self.result(), self.headers
+
+    def appended_only(self, i, size):
+        """Whether file i, now size bytes long, still starts with the bytes parsed from it.
+
+        Of a file that grew, the first and the last whole block of the
+        parsed bytes and the bytes after them are hashed again, so the check
+        does not grow with the file. A file that did not grow was not
+        appended to, so all of its parsed bytes are checked. The hasher of
+        the bytes after the whole blocks is kept so the appended rows can
+        be added to it.
+        """
+        offset = self.offsets[i]
+        if offset == 0:
+            self.hashers[i] = hashlib.blake2b(digest_size=DIGEST_SIZE)
+            return True
+        if size < offset:
+            return False
+
+        blocks = self.blocks[i]
+        if self.stats[i] is None or size <= self.stats[i][0]:
+            checked = range(len(blocks))
+        else:
+            checked = sorted({0, len(blocks) - 1}) if blocks else []
+        with open(self.paths[i], 'rb') as f:
+            for n in checked:
+                if range_hasher(f, n * HASH_BLOCK_SIZE, (n + 1) * HASH_BLOCK_SIZE).digest() != blocks[n]:
+                    return False
+            hasher = range_hasher(f, len(blocks) * HASH_BLOCK_SIZE, offset)
+        if hasher.digest() != self.digests[i]:
+            return False
+        self.hashers[i] = hasher
+        return True
+
+    def read_tail(self, i, partial_rows=True):
+        """Index the rows appended to file i; whether there were any.
+
+        A last row without a line ending is only indexed with partial_rows.
+        """
+        start = self.offsets[i]
+        with open(self.paths[i], 'rb') as f:
+            f.seek(start)
+            for offset, raw in iter_raw_rows(f):
+                if not complete(raw):
+                    if not partial_rows:
+                        break
+                    self.partial[i] = True
+                offset += start
+                if i == 0 and offset == 0:
+                    # file1's first row holds the headers, file2's is data
+                    self.headers = parse_raw_row(raw, self.encoding)
+                else:
+                    row = parse_raw_row(raw, self.encoding)
+                    key = tuple(row[c] for c in self.key_columns)
+                    entry = make_entry(raw, offset)
+                    self.add_entry(i, key, entry)
+                    if self.log is not None:
+                        self.log[i].append((key, entry))
+                self.offsets[i] = offset + len(raw)
+                self.hash_row(i, offset, raw)
+
+        if self.offsets[i] == start:
+            return False
+        self.digests[i] = self.hashers[i].digest()
+        return True
+
+    def hash_row(self, i, offset, raw):
+        """Add a row parsed from file i at offset to its block digests."""
+        while raw:
+            size = HASH_BLOCK_SIZE - offset % HASH_BLOCK_SIZE
+            if len(raw) < size:
+                self.hashers[i].update(raw)
+                return
+            self.hashers[i].update(raw[:size])
+            self.blocks[i].append(self.hashers[i].digest())
+            self.hashers[i] = hashlib.blake2b(digest_size=DIGEST_SIZE)
+            raw = raw[size:]
+            offset += size
+
+    def add_entry(self, i, key, entry):
+        """Apply a row appended to file i to the indexes and difference keys."""
+        index = self.indexes[i]
+        new_key = key not in index
+        index[key] = entry
+        entry1 = self.indexes[0].get(key)
+        entry2 = self.indexes[1].get(key)
+        only1 = self.keys["only_in_file1"]
+        only2 = self.keys["only_in_file2"]
+        modified = self.keys["modified"]
+
+        if entry2 is None:
+            only1[key] = None
+            return
+        if entry1 is None:
+            only2[key] = None
+            return
+
+        only1.pop(key, None)
+        only2.pop(key, None)
+        if entry1[:DIGEST_SIZE] == entry2[:DIGEST_SIZE]:
+            modified.pop(key, None)
+        elif key not in modified:
+            # Only a key new to file1 is known to come after all others
+            if modified and not (i == 0 and new_key):
+                self.modified_unordered = True
+            modified[key] = None
+
+    def result(self):
+        """Build the differences structure, in the memory engine's order.
+
+        Modified keys added out of order are put back in file1 order, which
+        walks file1's index once.
+        """
+        index1, index2 = self.indexes
+        if self.modified_unordered:
+            modified = self.keys["modified"]
+            self.keys["modified"] = {key: None for key in index1 if key in modified}
+            self.modified_unordered = False
+
+        # Records are only built again for keys with a new row since
+        # the last result; rows in an append-only file never change
+        missing = []
+        for keys in self.keys.values():
+            for key in keys:
+                entries = (index1.get(key), index2.get(key))
+                cached = self.records.get(key)
+                if cached is None or cached[0] != entries:
+                    missing.append((key, entries))
+
+        rows1 = read_rows_at(
+            self.paths[0], (entry_offset(entry1) for _, (entry1, _) in missing if entry1), self.encoding
+        )
+        rows2 = read_rows_at(
+            self.paths[1], (entry_offset(entry2) for _, (_, entry2) in missing if entry2), self.encoding
+        )
+        built = {}
+        for key, (entry1, entry2) in missing:
+            row1 = rows1[entry_offset(entry1)] if entry1 else None
+            row2 = rows2[entry_offset(entry2)] if entry2 else None
+            if row2 is None:
+                record = RowRecord(key, row1)
+            elif row1 is None:
+                record = RowRecord(key, row2)
+            elif row1 != row2:
+                record = modified_record(key, row1, row2, self.headers)
+            else:
+                # Different bytes can still parse to the same fields, e.g. quoting
+                record = None
+            built[key] = ((entry1, entry2), record)
+
+        self.records = {
+            key: built.get(key) or self.records[key] for keys in self.keys.values() for key in keys
+        }
+        return {
+            kind: [record for record in (self.records[key][1] for key in keys) if record is not None]
+            for kind, keys in self.keys.items()
+        }
+
+    def save(self, path):
+        """Save the comparison state to a file.
+
+        If the file is as this comparison last saved or loaded it, only the
+        records indexed since are appended, as an update. Otherwise, e.g.
+        after a full read, a snapshot of the indexes and difference keys is
+        written atomically.
+        """
+        try:
+            appending = self.log is not None and self.saved == (path, os.path.getsize(path))
+        except OSError:
+            appending = False
+
+        if appending:
+            buffer = bytearray()
+            for records in self.log:
+                for key, entry in records:
+                    pack_record(buffer, key, entry)
+            meta = self.state_meta(self.saved_blocks)
+            meta["rows"] = [len(records) for records in self.log]
+            meta["size"] = len(buffer)
+            with open(path, 'ab') as f:
+                f.write(json.dumps(meta).encode("utf-8") + b"\n")
+                f.write(buffer)
+                size = f.tell()
+        else:
+            meta = {
+                "paths": self.paths,
+                "key_columns": self.key_columns,
+                "encoding": self.encoding,
+                "keys": {kind: list(keys) for kind, keys in self.keys.items()},
+                "modified_unordered": self.modified_unordered,
+                "rows": [len(index) for index in self.indexes]
+            }
+            meta.update(self.state_meta([0, 0]))
+            records = (record for index in self.indexes for record in index.items())
+            write_sidecar(path, meta, records, STATE_MAGIC)
+            size = os.path.getsize(path)
+
+        self.log = [[], []]
+        self.saved = (path, size)
+        self.saved_blocks = [len(blocks) for blocks in self.blocks]
+
+    def state_meta(self, saved_blocks):
+        """Metadata of the parsed bytes, with the block digests after saved_blocks."""
+        return {
+            "offsets": self.offsets,
+            "blocks": [[digest.hex() for digest in blocks[n:]] for blocks, n in zip(self.blocks, saved_blocks)],
+            "digests": [None if digest is None else digest.hex() for digest in self.digests],
+            "stats": self.stats,
+            "partial": self.partial,
+            "headers": self.headers
+        }
+
+    def apply_meta(self, meta):
+        """Restore the metadata saved by state_meta."""
+        self.offsets = meta["offsets"]
+        for blocks, digests in zip(self.blocks, meta["blocks"]):
+            blocks.extend(bytes.fromhex(digest) for digest in digests)
+        self.saved_blocks = [len(blocks) for blocks in self.blocks]
+        self.digests = [None if digest is None else bytes.fromhex(digest) for digest in meta["digests"]]
+        self.stats = meta["stats"]
+        self.partial = meta["partial"]
+        self.headers = meta["headers"]
+
+def main(argv=None):
+    """Watch two growing CSV files and report their differences as they change."""
+    parser = argparse.ArgumentParser(description="Compare two append-only CSV files as they grow")
+    parser.add_argument("file1")
+    parser.add_argument("file2")
+    parser.add_argument("-k", "--key-columns", default="0",
+                        help="comma separated key column indices (default: 0)")
+    parser.add_argument("--state", help="state file (default: file1 + " + STATE_SUFFIX + ")")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"seconds between checks (default: {DEFAULT_INTERVAL:g})")
+    parser.add_argument("--once", action="store_true", help="refresh once and exit")
+    args = parser.parse_args(argv)
+
+    key_columns = [int(i) for i in args.key_columns.split(",")]
+    state_path = args.state or state_file_path(args.file1)
+    encoding = locale.getpreferredencoding(False)
+    if not ascii_compatible(encoding):
+        print(f"incremental: the {encoding} encoding is not supported", file=sys.stderr)
+        return 2
+
+    comparison = load_comparison(state_path)
+    if comparison is None or not comparison.matches(args.file1, args.file2, key_columns, encoding):
+        comparison = TailComparison(args.file1, args.file2, key_columns, encoding)
+
+    saving = True
+    try:
+        while True:
+            start = time.perf_counter()
+            differences, _ = comparison.refresh(partial_rows=False)
+            if comparison.last_refresh != "unchanged" and saving:
+                try:
+                    comparison.save(state_path)
+                except OSError as e:
+                    print(f"incremental: not saving state: {e}", file=sys.stderr)
+                    saving = False
+            if comparison.last_refresh != "unchanged":
+                counts = ", ".join(f"{kind}: {len(records)}" for kind, records in differences.items())
+                print(f"{time.strftime('%H:%M:%S')} {comparison.last_refresh} in "
+                      f"{time.perf_counter() - start:.3f}s, {counts}", flush=True)
+            if args.once:
+                return 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+    except (OSError, ValueError, IndexError) as e:
+        print(f"incremental: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
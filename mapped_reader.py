@@ -0,0 +1,99 @@
+import codecs
+import csv
+import mmap
+import re
+
+# Bytes decoded and split at a time
+CHUNK_SIZE = 1024 * 1024
+
+# A carriage return that does not start a \r\n line ending
+LONE_CR = re.compile(rb"\r(?!\n)")
+
+# Encodings in which quote, comma, CR, LF and NUL bytes only ever stand
+# for those characters, so the bytes can be scanned before decoding
+ASCII_COMPATIBLE = {"utf-8", "ascii", "cp1250", "cp1251", "cp1252", "cp1253", "cp1254",
+                    "cp1257", "cp437", "cp850"}
+
+def mapped_reader(f):
+    """Return a MappedReader for an open text CSV file, or None.
+
+    None means the file has to go through csv.reader: it is empty, cannot
+    be memory-mapped, uses an unsupported encoding, or contains quotes, NUL
+    bytes or lone carriage returns, which csv.reader treats specially.
+    """
+    if not ascii_compatible(f.encoding):
+        return None
+    encoding = codecs.lookup(f.encoding).name
+
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return None
+
+    if mm.find(b'"') != -1 or mm.find(b"\0") != -1 or LONE_CR.search(mm) is not None:
+        mm.close()
+        return None
+    return MappedReader(mm, encoding, f.errors, mm.find(b"\r") != -1)
+
+def ascii_compatible(encoding):
+    """Whether structural CSV bytes can be scanned before decoding."""
+    name = codecs.lookup(encoding).name
+    return name in ASCII_COMPATIBLE or name.startswith("iso8859-")
+
+class MappedReader:
+    """Row iterator over a memory-mapped, quote-free CSV file.
+
+    Yields the same lists as csv.reader for such files, and like it raises
+    csv.Error for a field longer than csv.field_size_limit(). The file is
+    decoded a chunk of whole lines at a time and split with str.split.
+    """
+
+    def __init__(self, mm, encoding, errors, crlf):
+        self.mm = mm
+        self.encoding = encoding
+        self.errors = errors
+        self.crlf = crlf
+        self.offset = 0
+        self.rows = self.iter_rows()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.rows)
+
+    def tell(self):
+        """Byte offset up to which the file has been split into rows."""
+        return self.offset
+
+    def iter_rows(self):
+        """Yield the rows of the file chunk by chunk."""
+        mm = self.mm
+        size = len(mm)
+        try:
+            while self.offset < size:
+                # Chunks end after a newline, which is never part of a
+                # multi-byte character in the supported encodings
+                end = mm.find(b"\n", min(self.offset + CHUNK_SIZE, size) - 1)
+                end = size if end == -1 else end + 1
+
+                text = mm[self.offset:end].decode(self.encoding, self.errors)
+                if self.crlf:
+                    text = text.replace("\r\n", "\n")
+                lines = text.split("\n")
+                if text.endswith("\n"):
+                    lines.pop()
+
+                # Only a line longer than the limit can hold a field that is
+                limit = csv.field_size_limit()
+                long_lines = max(map(len, lines), default=0) > limit
+
+                self.offset = end
+                for line in lines:
+                    # csv.reader returns an empty row for an empty line
+                    row = line.split(",") if line else []
+                    if long_lines and len(line) > limit and max(map(len, row)) > limit:
+                        raise csv.Error(f"field larger than field limit ({limit})")
+                    yield row
+        finally:
+            mm.close()
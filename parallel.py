@@ -0,0 +1,182 @@
+import csv
+import io
+import locale
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from csvdiff import diff_keyed_rows, read_headers
+from fingerprint import ends_quoted
+from partitioned import merge_ordered_differences, order_differences, partition_of
+
+# Files are not split into ranges smaller or larger than these sizes
+MIN_RANGE_SIZE = 4 * 1024 * 1024
+MAX_RANGE_SIZE = 256 * 1024 * 1024
+
+# Ranges per worker, so uneven ranges still keep every worker busy
+RANGES_PER_WORKER = 4
+
+def compare_parallel(file1_path, file2_path, key_columns, workers=None, temp_dir=None):
+    """Compare two CSV files by parsing and diffing them across a process pool.
+
+    Both files are cut into newline-aligned byte ranges that are parsed in
+    parallel, with every row routed to a shard by key hash. Each shard is
+    then diffed by one worker and the partial results are merged back in
+    file order, so the output matches the memory engine exactly.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = workers
+    headers = read_headers(file1_path)
+    encoding = locale.getpreferredencoding(False)
+
+    with tempfile.TemporaryDirectory(prefix="csvdiff_", dir=temp_dir) as work_dir, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        shard_files = []
+        for prefix, file_path, read_header in (("a", file1_path, True), ("b", file2_path, False)):
+            ranges = split_ranges(pool, file_path, workers)
+            futures = [
+                pool.submit(
+                    parse_range, file_path, start, end, key_columns, shards,
+                    os.path.join(work_dir, f"{prefix}{index}_"), encoding,
+                    read_header and index == 0
+                )
+                for index, (start, end) in enumerate(ranges)
+            ]
+
+            # Row numbers of each range start where the previous range ended
+            files = [[] for _ in range(shards)]
+            base = 0
+            for future in futures:
+                paths, count = future.result()
+                for shard, path in enumerate(paths):
+                    files[shard].append((path, base))
+                base += count
+            shard_files.append(files)
+
+        parts = pool.map(
+            diff_shard, shard_files[0], shard_files[1],
+            [key_columns] * shards, [headers] * shards
+        )
+        differences = merge_ordered_differences(list(parts))
+
+    return differences, headers
+
+def split_ranges(pool, file_path, workers):
+    """Split a file into byte ranges that start and end on row boundaries."""
+    size = os.path.getsize(file_path)
+    count = max(
+        1,
+        min(workers * RANGES_PER_WORKER, size // MIN_RANGE_SIZE),
+        -(-size // MAX_RANGE_SIZE)
+    )
+
+    with open(file_path, 'rb') as f:
+        starts = [0] + [line_start(f, size * i // count) for i in range(1, count)] + [size]
+
+    # A line starts a row unless it is inside a quoted field. Whether it
+    # is depends on everything before it, so every range reports the state
+    # at its end for both states at its start and the states are chained
+    states = list(pool.map(quote_states, [file_path] * count, starts[:-1], starts[1:]))
+
+    boundaries = [0]
+    quoted = False
+    with open(file_path, 'rb') as f:
+        for i in range(1, count):
+            quoted = states[i - 1][quoted]
+            boundary = row_end(f, starts[i]) if quoted else starts[i]
+            boundaries.append(max(boundary, boundaries[-1]))
+    boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def line_start(f, offset):
+    """The first line start at or after offset."""
+    if offset == 0:
+        return 0
+    f.seek(offset - 1)
+    f.readline()
+    return f.tell()
+
+def quote_states(file_path, start, end):
+    """Whether the lines from start to end end inside a quoted field.
+
+    Returns the answers for starting outside and inside a quoted field.
+    """
+    outside, inside = False, True
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            line = f.readline(end - position)
+            if not line:
+                break
+            position += len(line)
+            # Once both starts agree they stay the same
+            converged = inside == outside
+            if outside or b'"' in line:
+                outside = ends_quoted(line, outside)
+            inside = outside if converged else ends_quoted(line, inside)
+    return outside, inside
+
+def row_end(f, offset):
+    """Offset just after the row that continues at offset inside a quoted field."""
+    f.seek(offset)
+    quoted = True
+    while quoted:
+        line = f.readline()
+        if not line:
+            break
+        quoted = ends_quoted(line, quoted)
+    return f.tell()
+
+def parse_range(file_path, start, end, key_columns, shards, prefix, encoding, skip_header):
+    """Parse a byte range of a CSV file and route its rows to shard files.
+
+    Rows are written with their row number inside the range. Returns the
+    shard file paths and the number of rows parsed.
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+
+    paths = [f"{prefix}{shard}.csv" for shard in range(shards)]
+    files = [open(path, 'w', newline='', encoding='utf-8', errors='surrogatepass') for path in paths]
+    count = 0
+    try:
+        writers = [csv.writer(f) for f in files]
+        reader = csv.reader(io.StringIO(text, newline=''))
+        if skip_header:
+            next(reader, None)
+
+        for position, row in enumerate(reader):
+            key = tuple(row[i] for i in key_columns)
+            writers[partition_of(key, shards)].writerow([position] + row)
+            count = position + 1
+    finally:
+        for f in files:
+            f.close()
+
+    return paths, count
+
+def diff_shard(files1, files2, key_columns, headers):
+    """Diff one shard, returning position-tagged partial results."""
+    data1, positions1 = read_shard(files1, key_columns)
+    data2, positions2 = read_shard(files2, key_columns)
+    return order_differences(diff_keyed_rows(data1, data2, headers), positions1, positions2)
+
+def read_shard(files, key_columns):
+    """Load shard files, given in file order, into a dictionary and first positions."""
+    data = {}
+    positions = {}
+
+    for path, base in files:
+        with open(path, 'r', newline='', encoding='utf-8', errors='surrogatepass') as f:
+            for row in csv.reader(f):
+                position = base + int(row.pop(0))
+                key = tuple(row[i] for i in key_columns)
+                if key not in positions:
+                    positions[key] = position
+                data[key] = row
+        os.remove(path)
+
+    return data, positions
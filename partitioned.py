@@ -0,0 +1,115 @@
+import csv
+import heapq
+import os
+import tempfile
+import zlib
+
+from compressed import open_csv
+from csvdiff import diff_keyed_rows, read_headers
+from streaming import DEFAULT_MEMORY_BUDGET
+
+# How much bigger parsed rows are in memory than their bytes on disk
+MEMORY_EXPANSION = 4
+
+# Upper bound on buckets, since one file handle is open per bucket
+MAX_PARTITIONS = 512
+
+def compare_partitioned(file1_path, file2_path, key_columns, partitions=None,
+                        memory_budget=DEFAULT_MEMORY_BUDGET, temp_dir=None):
+    """Compare two CSV files by hash-partitioning them into on-disk buckets.
+
+    Each pair of buckets is diffed in memory, so only one bucket per file
+    is loaded at a time. Results are in the same order as the memory engine.
+    """
+    if partitions is None:
+        partitions = choose_partitions(file1_path, file2_path, memory_budget)
+
+    headers = read_headers(file1_path)
+    parts = []
+
+    with tempfile.TemporaryDirectory(prefix="csvdiff_", dir=temp_dir) as work_dir:
+        buckets1 = partition_file(file1_path, key_columns, partitions, work_dir, "a", True)
+        buckets2 = partition_file(file2_path, key_columns, partitions, work_dir, "b", False)
+
+        for bucket1, bucket2 in zip(buckets1, buckets2):
+            data1, positions1 = read_bucket(bucket1, key_columns)
+            data2, positions2 = read_bucket(bucket2, key_columns)
+            os.remove(bucket1)
+            os.remove(bucket2)
+
+            parts.append(order_differences(
+                diff_keyed_rows(data1, data2, headers), positions1, positions2
+            ))
+
+    return merge_ordered_differences(parts), headers
+
+def choose_partitions(file1_path, file2_path, memory_budget):
+    """Pick enough buckets for a bucket pair to fit in the memory budget."""
+    total = os.path.getsize(file1_path) + os.path.getsize(file2_path)
+    needed = -(-total * MEMORY_EXPANSION // max(memory_budget, 1))
+    return max(1, min(MAX_PARTITIONS, needed))
+
+def partition_of(key, partitions):
+    """Stable bucket number for a key tuple, identical across processes."""
+    data = "\x1f".join(key).encode("utf-8", "surrogatepass")
+    return zlib.crc32(data) % partitions
+
+def partition_file(file_path, key_columns, partitions, work_dir, prefix, read_header=True):
+    """Split a CSV file into bucket files by key hash.
+
+    Each bucket row is prefixed with its row number in the source file so
+    the original order can be restored after the per-bucket diff.
+    """
+    paths = [os.path.join(work_dir, f"{prefix}{i}.csv") for i in range(partitions)]
+    files = [open(path, 'w', newline='', encoding='utf-8', errors='surrogatepass') for path in paths]
+    try:
+        writers = [csv.writer(f) for f in files]
+
+        with open_csv(file_path) as f:
+            reader = csv.reader(f)
+            if read_header:
+                next(reader, None)
+
+            for position, row in enumerate(reader):
+                key = tuple(row[i] for i in key_columns)
+                writers[partition_of(key, partitions)].writerow([position] + row)
+    finally:
+        for f in files:
+            f.close()
+
+    return paths
+
+def read_bucket(path, key_columns):
+    """Load a bucket file into a key -> row dictionary and first positions."""
+    data = {}
+    positions = {}
+
+    with open(path, 'r', newline='', encoding='utf-8', errors='surrogatepass') as f:
+        for row in csv.reader(f):
+            position = int(row.pop(0))
+            key = tuple(row[i] for i in key_columns)
+            if key not in positions:
+                positions[key] = position
+            data[key] = row
+
+    return data, positions
+
+def order_differences(differences, positions1, positions2):
+    """Tag each record with the row number its key first appeared at."""
+    return {
+        "only_in_file1": [(positions1[r["key"]], r) for r in differences["only_in_file1"]],
+        "only_in_file2": [(positions2[r["key"]], r) for r in differences["only_in_file2"]],
+        "modified": [(positions1[r["key"]], r) for r in differences["modified"]]
+    }
+
+def merge_ordered_differences(parts):
+    """Merge position-tagged partial results back into file order."""
+    # Records inside a part are already in file order, so a k-way merge works
+    return {
+        kind: [record for _, record in heapq.merge(*(part[kind] for part in parts), key=position_of)]
+        for kind in ("only_in_file1", "only_in_file2", "modified")
+    }
+
+def position_of(item):
+    """Sort key for (position, record) pairs."""
+    return item[0]
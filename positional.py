@@ -0,0 +1,397 @@
+import os
+from bisect import bisect_left
+from collections import Counter
+from math import isqrt
+
+from compressed import open_csv
+from csvdiff import RowRecord, modified_record, open_reader, projector
+from progress import PROGRESS_INTERVAL
+
+# Rows occurring more often than this in a region are not used as anchors
+# when no row is unique; such regions are aligned with a Myers diff
+MAX_OCCURRENCES = 64
+
+# Edits a Myers diff of a region may cost before it settles for the best
+# path found so far: the square root of the region's size, but at least
+# MIN_EDIT_COST, as git bounds its diffs
+MIN_EDIT_COST = 256
+
+# Diagonal steps all Myers diffs of one alignment may take per item of
+# both sequences; beyond that regions are matched at equal offsets
+MYERS_STEPS_PER_ITEM = 4
+
+def compare_positional(file1_path, file2_path, key_columns=None, progress=None, columns=None):
+    """Compare two CSV files row by row in file order, without a key.
+
+    For files without a unique key column; key_columns is ignored. Both
+    files' header rows are headers here. Rows are aligned like a text diff
+    aligns lines, see align. Deleted rows are reported as only_in_file1,
+    inserted ones as only_in_file2. The rows of a changed run are paired in
+    order as modified records, the rest of the longer side counts as
+    deleted or inserted. Records are keyed by data row numbers from 1:
+    (row,) for rows of one file and (row1, row2) for modified ones.
+
+    columns limits the columns that are stored and compared, like in
+    compare_in_memory.
+    """
+    if progress is not None:
+        progress.update(
+            phase="Reading", total_bytes=os.path.getsize(file1_path) + os.path.getsize(file2_path)
+        )
+
+    # Distinct rows by id, so sequences of ids can be aligned
+    ids = {}
+    headers, sequence1 = read_ids(file1_path, ids, progress, columns)
+    _, sequence2 = read_ids(file2_path, ids, progress, columns)
+    rows = list(ids)
+
+    if progress is not None:
+        progress.update(phase="Aligning")
+    opcodes = align(sequence1, sequence2)
+
+    differences = {"only_in_file1": [], "only_in_file2": [], "modified": []}
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            continue
+        paired = min(i2 - i1, j2 - j1)
+        for offset in range(paired):
+            i, j = i1 + offset, j1 + offset
+            differences["modified"].append(
+                modified_record((i + 1, j + 1), list(rows[sequence1[i]]), list(rows[sequence2[j]]), headers)
+            )
+        for i in range(i1 + paired, i2):
+            differences["only_in_file1"].append(RowRecord((i + 1,), list(rows[sequence1[i]])))
+        for j in range(j1 + paired, j2):
+            differences["only_in_file2"].append(RowRecord((j + 1,), list(rows[sequence2[j]])))
+
+    return differences, headers
+
+def read_ids(file_path, ids, progress=None, columns=None):
+    """Read a CSV file's headers and the id of each data row in ids."""
+    project = projector(columns) if columns is not None else None
+    sequence = []
+    if progress is not None:
+        start_bytes, start_rows = progress.bytes_read, progress.rows
+
+    with open_csv(file_path) as f:
+        reader, tell = open_reader(f)
+        headers = next(reader, [])
+        if project is not None:
+            headers = project(headers)
+
+        for count, row in enumerate(reader, 1):
+            if project is not None:
+                row = project(row)
+            row = tuple(row)
+            row_id = ids.get(row)
+            if row_id is None:
+                row_id = ids[row] = len(ids)
+            sequence.append(row_id)
+
+            if progress is not None and count % PROGRESS_INTERVAL == 0:
+                progress.update(bytes_read=start_bytes + tell(), rows=start_rows + count)
+
+        if progress is not None:
+            progress.update(bytes_read=start_bytes + tell(), rows=start_rows + len(sequence))
+
+    return headers, sequence
+
+def align(a, b):
+    """Opcodes turning sequence a into b, like SequenceMatcher.get_opcodes.
+
+    Common leading and trailing runs are matched first. What remains is
+    split at the longest increasing run of items that occur once on both
+    sides, as in patience diff. A region without such items is split at
+    the longest match of its rarest item, as in histogram diff. Where every
+    item of a occurs more than MAX_OCCURRENCES times, the region is aligned
+    with a Myers diff of bounded cost, see myers_matches. A region that is
+    mostly different, or found once the Myers diffs have used up their
+    steps, is matched where items are equal at the same offset from its
+    start. Regions are handled with a stack, not recursion.
+    """
+    budget = [MYERS_STEPS_PER_ITEM * (len(a) + len(b))]
+    blocks = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        lo1, hi1, lo2, hi2 = regions.pop()
+
+        size = common_prefix(a, b, lo1, hi1, lo2, hi2)
+        if size:
+            blocks.append((lo1, lo2, size))
+            lo1 += size
+            lo2 += size
+        size = common_suffix(a, b, lo1, hi1, lo2, hi2)
+        if size:
+            blocks.append((hi1 - size, hi2 - size, size))
+            hi1 -= size
+            hi2 -= size
+        if lo1 == hi1 or lo2 == hi2:
+            continue
+
+        anchors = unique_anchors(a, b, lo1, hi1, lo2, hi2)
+        if not anchors:
+            match = rarest_match(a, b, lo1, hi1, lo2, hi2)
+            if match is not None:
+                anchors = [match]
+            else:
+                anchors = (myers_matches(a, b, lo1, hi1, lo2, hi2, budget) or
+                           diagonal_matches(a, b, lo1, hi1, lo2, hi2))
+        if not anchors:
+            # Nothing in common, the region is one changed run
+            continue
+
+        # Matched items between anchors are found when their gaps are trimmed
+        previous1, previous2 = lo1, lo2
+        for i, j, size in anchors:
+            if i > previous1 or j > previous2:
+                regions.append((previous1, i, previous2, j))
+                blocks.append((i, j, size))
+            elif previous1 > lo1:
+                # Anchors next to each other extend one block
+                start1, start2, run = blocks[-1]
+                blocks[-1] = (start1, start2, run + size)
+            else:
+                blocks.append((i, j, size))
+            previous1, previous2 = i + size, j + size
+        if hi1 > previous1 or hi2 > previous2:
+            regions.append((previous1, hi1, previous2, hi2))
+
+    return opcodes(blocks, len(a), len(b))
+
+def common_prefix(a, b, lo1, hi1, lo2, hi2):
+    """Length of the common leading run of two regions."""
+    limit = min(hi1 - lo1, hi2 - lo2)
+    size = 0
+    step = 1
+    # Slices are compared in C, growing while they match
+    while size < limit:
+        step = min(step, limit - size)
+        if a[lo1 + size:lo1 + size + step] == b[lo2 + size:lo2 + size + step]:
+            size += step
+            step *= 2
+        elif step == 1:
+            break
+        else:
+            step //= 2
+    return size
+
+def common_suffix(a, b, lo1, hi1, lo2, hi2):
+    """Length of the common trailing run of two regions."""
+    limit = min(hi1 - lo1, hi2 - lo2)
+    size = 0
+    step = 1
+    while size < limit:
+        step = min(step, limit - size)
+        if a[hi1 - size - step:hi1 - size] == b[hi2 - size - step:hi2 - size]:
+            size += step
+            step *= 2
+        elif step == 1:
+            break
+        else:
+            step //= 2
+    return size
+
+def unique_anchors(a, b, lo1, hi1, lo2, hi2):
+    """(i, j, 1) matches of items unique in both regions, in order.
+
+    Of the pairs, the longest run increasing on both sides is kept, found
+    by patience sorting.
+    """
+    counts1 = Counter(a[lo1:hi1])
+    counts2 = Counter(b[lo2:hi2])
+    positions = {item: i for i, item in enumerate(a[lo1:hi1], lo1) if counts1[item] == 1}
+    pairs = [
+        (positions[item], j) for j, item in enumerate(b[lo2:hi2], lo2)
+        if counts2[item] == 1 and item in positions
+    ]
+    if not pairs:
+        return []
+
+    # tails[k] is the smallest i ending an increasing run of length k + 1
+    tails = []
+    tail_pairs = []
+    previous = [-1] * len(pairs)
+    for n, (i, _) in enumerate(pairs):
+        k = len(tails) if not tails or i > tails[-1] else bisect_left(tails, i)
+        if k:
+            previous[n] = tail_pairs[k - 1]
+        if k == len(tails):
+            tails.append(i)
+            tail_pairs.append(n)
+        else:
+            tails[k] = i
+            tail_pairs[k] = n
+
+    anchors = []
+    n = tail_pairs[-1]
+    while n != -1:
+        i, j = pairs[n]
+        anchors.append((i, j, 1))
+        n = previous[n]
+    anchors.reverse()
+    return anchors
+
+def rarest_match(a, b, lo1, hi1, lo2, hi2):
+    """(i, j, size) of the longest match around the rarest item of a in b, or None.
+
+    Items occurring more than MAX_OCCURRENCES times in a are not tried.
+    """
+    positions = {}
+    for i in range(lo1, hi1):
+        positions.setdefault(a[i], []).append(i)
+
+    best = None
+    best_count = MAX_OCCURRENCES
+    j = lo2
+    while j < hi2:
+        occurrences = positions.get(b[j])
+        if occurrences is None or len(occurrences) > best_count:
+            j += 1
+            continue
+
+        # Items inside a match found here are not tried again
+        next_j = j + 1
+        for i in occurrences:
+            start1, start2 = i, j
+            while start1 > lo1 and start2 > lo2 and a[start1 - 1] == b[start2 - 1]:
+                start1 -= 1
+                start2 -= 1
+            end1, end2 = i + 1, j + 1
+            while end1 < hi1 and end2 < hi2 and a[end1] == b[end2]:
+                end1 += 1
+                end2 += 1
+
+            size = end1 - start1
+            if best is None or len(occurrences) < best_count or size > best[2]:
+                best = (start1, start2, size)
+                best_count = len(occurrences)
+            next_j = max(next_j, end2)
+        j = next_j
+
+    return best
+
+def myers_matches(a, b, lo1, hi1, lo2, hi2, budget):
+    """(i, j, size) runs of a shortest edit script of two regions, in order.
+
+    Myers' greedy algorithm: for each edit cost d, the furthest point
+    reachable on every diagonal k = x - y is kept, and a path is traced
+    back from where the regions' ends are reached. Past the edit cost
+    limit the path reaching furthest is used instead; it only covers the
+    start of the regions, and the rest is aligned again as its own region.
+    When that path has fewer matched items than edits, the regions are
+    mostly different and no runs are returned.
+
+    budget is a one-item list with the diagonal steps left, shared by all
+    calls of one alignment; no runs are returned once it is used up.
+    """
+    n = hi1 - lo1
+    m = hi2 - lo2
+    limit = max(MIN_EDIT_COST, isqrt(n + m))
+    if budget[0] <= 0:
+        return []
+
+    # furthest[offset + k] is the furthest x reached on diagonal k, -1
+    # where it cannot be reached; diagonals of one cost only read those of
+    # the previous cost, which have the other parity, so one list serves
+    offset = limit + 1
+    furthest = [-1] * (2 * limit + 3)
+    furthest[offset] = common_prefix(a, b, lo1, hi1, lo2, hi2)
+    # Per cost, the furthest x of diagonals -cost to cost
+    trace = [furthest[offset:offset + 1]]
+    end = None
+    for cost in range(1, limit + 1):
+        if furthest[offset + n - m] == n:
+            end = n - m
+            break
+        budget[0] -= cost
+        if budget[0] <= 0:
+            return []
+
+        for k in range(-cost, cost + 1, 2):
+            x = step(furthest[offset + k + 1], furthest[offset + k - 1], k, n, m)
+            if x >= 0:
+                y = x - k
+                if x < n and y < m and a[lo1 + x] == b[lo2 + y]:
+                    x += common_prefix(a, b, lo1 + x, hi1, lo2 + y, hi2)
+            furthest[offset + k] = x
+        trace.append(furthest[offset - cost:offset + cost + 1])
+
+    if end is None:
+        if furthest[offset + n - m] == n:
+            end = n - m
+        else:
+            cost = len(trace) - 1
+            end = max(range(-cost, cost + 1, 2), key=lambda k: 2 * furthest[offset + k] - k)
+            # The path reaching x + y with cost edits matched (x + y - cost) / 2 items
+            if 2 * furthest[offset + end] - end - cost < 2 * cost:
+                return []
+
+    matches = []
+    k = end
+    x = trace[-1][k + len(trace) - 1]
+    for cost in range(len(trace) - 1, 0, -1):
+        previous = trace[cost - 1]
+        down = previous[k + cost] if k + 1 <= cost - 1 else -1
+        right = previous[k + cost - 2] if k - 1 >= 1 - cost else -1
+        previous_x = step(down, right, k, n, m)
+        # step returns right + 1 for a deletion
+        if previous_x == down:
+            origin, start = k + 1, down
+        else:
+            origin, start = k - 1, previous_x
+            previous_x -= 1
+        if x > start:
+            matches.append((lo1 + start, lo2 + start - k, x - start))
+        x, k = previous_x, origin
+    if x:
+        matches.append((lo1, lo2, x))
+    matches.reverse()
+    return matches
+
+def step(down, right, k, n, m):
+    """Start x on diagonal k after one more edit, or -1 if it cannot be reached.
+
+    down and right are the furthest x of diagonals k + 1 and k - 1, or -1.
+    An insertion from k + 1 keeps x, a deletion from k - 1 moves it on by
+    one. Ties go to the insertion.
+    """
+    if down >= 0 and down - k > m:
+        down = -1
+    right = right + 1 if 0 <= right < n else -1
+    return down if down >= right else right
+
+def diagonal_matches(a, b, lo1, hi1, lo2, hi2):
+    """(i, j, size) runs of equal items at the same offset in both regions."""
+    matches = []
+    start = None
+    for offset in range(min(hi1 - lo1, hi2 - lo2)):
+        if a[lo1 + offset] == b[lo2 + offset]:
+            if start is None:
+                start = offset
+        elif start is not None:
+            matches.append((lo1 + start, lo2 + start, offset - start))
+            start = None
+    if start is not None:
+        matches.append((lo1 + start, lo2 + start, min(hi1 - lo1, hi2 - lo2) - start))
+    return matches
+
+def opcodes(blocks, length1, length2):
+    """Turn unordered matching (i, j, size) blocks into opcodes."""
+    codes = []
+    i = j = 0
+    for block_i, block_j, size in sorted(blocks) + [(length1, length2, 0)]:
+        if i < block_i and j < block_j:
+            codes.append(("replace", i, block_i, j, block_j))
+        elif i < block_i:
+            codes.append(("delete", i, block_i, j, j))
+        elif j < block_j:
+            codes.append(("insert", i, i, j, block_j))
+
+        if size:
+            # Adjacent blocks form one equal run
+            if codes and codes[-1][0] == "equal" and codes[-1][2] == block_i:
+                codes[-1] = ("equal", codes[-1][1], block_i + size, codes[-1][3], block_j + size)
+            else:
+                codes.append(("equal", block_i, block_i + size, block_j, block_j + size))
+        i, j = block_i + size, block_j + size
+    return codes
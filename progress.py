@@ -0,0 +1,54 @@
+import threading
+import time
+
+# Rows processed between progress updates and cancellation checks
+PROGRESS_INTERVAL = 1000
+
+class ComparisonCancelled(Exception):
+    """Raised inside a comparison when its Progress has been cancelled."""
+
+class Progress:
+    """Progress counters and cancellation flag shared with a running comparison.
+
+    The comparison calls update() as it goes, which hands a snapshot of the
+    counters to the listener at most once per interval and raises
+    ComparisonCancelled once cancel() has been called from another thread.
+    """
+
+    def __init__(self, listener=None, interval=0.1):
+        self.listener = listener
+        self.interval = interval
+        self.phase = ""
+        self.total_bytes = 0
+        self.bytes_read = 0
+        self.rows = 0
+        self.diffs = 0
+        self.cancelled = threading.Event()
+        self.last_report = 0.0
+
+    def update(self, force=False, **counters):
+        """Update counters, report them if due and stop if cancelled."""
+        for name, value in counters.items():
+            setattr(self, name, value)
+
+        if self.cancelled.is_set():
+            raise ComparisonCancelled()
+
+        now = time.monotonic()
+        if self.listener is not None and (force or now - self.last_report >= self.interval):
+            self.last_report = now
+            self.listener(self.snapshot())
+
+    def cancel(self):
+        """Ask the comparison to stop at its next update."""
+        self.cancelled.set()
+
+    def snapshot(self):
+        """Current counters as a plain dictionary."""
+        return {
+            "phase": self.phase,
+            "total_bytes": self.total_bytes,
+            "bytes_read": self.bytes_read,
+            "rows": self.rows,
+            "diffs": self.diffs
+        }
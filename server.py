@@ -0,0 +1,416 @@
+"""Local HTTP service answering queries about comparison results.
+
+Parsed files, comparison results and filter indexes are kept in one shared
+ComparisonCache, so every client asking about the same file pair pays the
+parsing cost once. Requests run on a fixed pool of threads and comparisons
+on a smaller one of their own, so a long comparison does not hold up
+queries about results already known. The service listens on localhost or
+a Unix socket and only reads files below its working directory, or below
+--root; engines writing files next to their input are not offered.
+Requests naming another host in their Host header are refused, so web
+pages cannot reach the service through DNS rebinding.
+
+    python server.py --port 8765 --cache-size 4G
+    curl 'localhost:8765/compare?file1=old.csv&file2=new.csv&key=0'
+    curl 'localhost:8765/records?file1=old.csv&file2=new.csv&type=modified&filter=berlin&limit=50'
+    curl 'localhost:8765/export?file1=old.csv&file2=new.csv&type=only_in_file2&format=csv'
+"""
+import argparse
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from batch import parse_size
+from cache import DEFAULT_CACHE_BYTES, RECORD_OVERHEAD, ComparisonCache, diff_key
+from cli import DATA_TYPES
+from csvdiff import ENGINES, STATE_ENGINES
+from exporters import EXPORT_FORMATS, json_record
+from filter_index import FilterIndex
+
+# Default address, number of request threads and number of comparisons
+# run at once, each of which can take several times its files' size
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 16
+DEFAULT_COMPARISONS = 2
+
+# Engines clients may ask for; those keeping state files would write
+# below the served root
+SERVED_ENGINES = set(ENGINES) - STATE_ENGINES
+
+# Records per page of /records, unless the request asks for another count
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+# Host header names always accepted, besides the address listened on
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+# Content types of the export formats
+CONTENT_TYPES = {
+    "text": "text/plain; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+    "jsonl": "application/x-ndjson"
+}
+
+class QueryError(Exception):
+    """A request answered without a result, with the HTTP status to send."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class DiffService:
+    """Comparisons and queries shared by all requests of a server.
+
+    Thread-safe. A comparison asked for by several requests at once runs
+    once and the others wait for its result. Only files below root, by
+    default the working directory, are read.
+    """
+
+    def __init__(self, cache_bytes=DEFAULT_CACHE_BYTES, root=None, comparisons=DEFAULT_COMPARISONS):
+        self.cache = ComparisonCache(cache_bytes)
+        self.root = os.path.realpath(root if root is not None else os.getcwd())
+        self.comparisons = ThreadPoolExecutor(comparisons, thread_name_prefix="comparison")
+        self.lock = threading.Lock()
+        self.running = {}
+
+    def resolve(self, path):
+        """Absolute path of a requested file, which must be inside root."""
+        if not path:
+            raise QueryError(400, "file1 and file2 are required")
+
+        resolved = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([self.root, resolved]) != self.root:
+            raise QueryError(403, f"{path} is outside the served directory")
+        return resolved
+
+    def compare(self, file1_path, file2_path, key_columns, engine="memory", wait=True):
+        """Cached comparison result of two files, as (differences, headers).
+
+        Comparisons run on the service's own threads, at most comparisons
+        at a time. One asked for by several requests at once runs once.
+        With wait=False None is returned while the comparison runs.
+        """
+        key = diff_key(file1_path, file2_path, key_columns, engine, {})
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self.lock:
+            future = self.running.get(key)
+            if future is None:
+                future = self.running[key] = self.comparisons.submit(
+                    self.run_comparison, key, file1_path, file2_path, key_columns, engine
+                )
+        if not wait and not future.done():
+            return None
+        return future.result()
+
+    def run_comparison(self, key, file1_path, file2_path, key_columns, engine):
+        """Compare two files into the cache on a comparison thread."""
+        try:
+            return self.cache.compare(file1_path, file2_path, key_columns, engine=engine)
+        finally:
+            with self.lock:
+                del self.running[key]
+
+    def filter(self, file1_path, file2_path, key_columns, engine, data_type, records, filter_text):
+        """The records matching a lowercased filter text, from a cached FilterIndex."""
+        if not filter_text:
+            return records
+
+        key = ("filter", diff_key(file1_path, file2_path, key_columns, engine, {}), data_type)
+        entry = self.cache.get(key)
+        if entry is None or entry[0].items is not records:
+            index = FilterIndex(records)
+            # The trigram index built by the first longer query takes
+            # about as much again as the texts
+            size = 2 * sum(len(text) + RECORD_OVERHEAD for text in index.texts)
+            entry = (index, threading.Lock())
+            self.cache.put(key, entry, size)
+
+        # Queries update the index's recent results, one at a time
+        with entry[1]:
+            return entry[0].filter(filter_text)
+
+    def status(self):
+        """Cache usage and the comparisons running now."""
+        with self.cache.lock:
+            entries = list(self.cache.entries)
+        return {
+            "cache_bytes": self.cache.used_bytes,
+            "cache_limit": self.cache.max_bytes,
+            "results": sum(1 for key in entries if key[0] == "diff"),
+            "parsed_files": sum(1 for key in entries if key[0] == "file"),
+            "filter_indexes": sum(1 for key in entries if key[0] == "filter"),
+            "running": len(self.running)
+        }
+
+    def close(self):
+        """Wait for running comparisons and stop the comparison threads."""
+        self.comparisons.shutdown(wait=True)
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Answers GET requests for /compare, /records, /export and /status.
+
+    Files and settings are given as query parameters: file1, file2, key
+    (comma separated column indices, default 0), engine (one of
+    SERVED_ENGINES, default memory), name (columns naming rows, default the
+    key columns), type (a kind of difference), filter and exact. Answers
+    are JSON, except exports. With wait=0 a request whose comparison is
+    still running is answered with 202 and {"running": true} at once, so
+    clients can poll instead of holding a request thread.
+
+    Requests whose Host header names neither a local host nor the address
+    listened on are refused.
+    """
+
+    server_version = "csvdiff-server"
+
+    # Whether the response has started, so an error can no longer be sent
+    responding = False
+
+    def do_GET(self):
+        self.responding = False
+        if not self.host_allowed():
+            self.send_json({"error": "Host not allowed"}, 403)
+            return
+
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        actions = {
+            "/compare": self.compare,
+            "/records": self.records,
+            "/export": self.export,
+            "/status": self.status
+        }
+        try:
+            action = actions.get(url.path)
+            if action is None:
+                raise QueryError(404, f"Unknown path: {url.path}")
+            action(params)
+        except QueryError as e:
+            if e.status == 202:
+                self.send_json({"running": True}, e.status)
+            else:
+                self.send_json({"error": str(e)}, e.status)
+        except FileNotFoundError as e:
+            self.send_json({"error": str(e)}, 404)
+        except (OSError, ValueError, IndexError) as e:
+            self.send_json({"error": str(e)}, 400)
+        except Exception as e:
+            self.log_error("%s", traceback.format_exc())
+            if self.responding:
+                # A streamed export broke off; the client sees it end early
+                self.close_connection = True
+            else:
+                self.send_json({"error": f"Internal error: {e!r}"}, 500)
+
+    def host_allowed(self):
+        """Whether the Host header names this server."""
+        host = self.headers.get("Host")
+        if host is None:
+            return False
+        if host.startswith("["):
+            host = host[1:].partition("]")[0]
+        elif host.count(":") == 1:
+            host = host.partition(":")[0]
+        return host.lower() in LOCAL_HOSTS or host == self.server.bound_host
+
+    def comparison(self, params):
+        """Resolve a request's files and settings and return its cached result.
+
+        Returns (file1, file2, key columns, engine, differences, headers).
+        """
+        service = self.server.service
+        file1_path = service.resolve(params.get("file1"))
+        file2_path = service.resolve(params.get("file2"))
+        key_columns = parse_columns(params.get("key", "0"))
+        engine = params.get("engine", "memory")
+        if engine not in SERVED_ENGINES:
+            raise QueryError(400, f"Unknown or unserved comparison engine: {engine}")
+
+        wait = params.get("wait", "1") not in ("0", "false", "")
+        result = service.compare(file1_path, file2_path, key_columns, engine, wait)
+        if result is None:
+            raise QueryError(202, "The comparison is still running")
+        differences, headers = result
+        return file1_path, file2_path, key_columns, engine, differences, headers
+
+    def selected(self, params):
+        """The filtered records of the requested kind, with what it takes to show them.
+
+        Returns (records, data_type, headers, name columns, filter text, exact mode).
+        """
+        file1_path, file2_path, key_columns, engine, differences, headers = self.comparison(params)
+        data_type = params.get("type", "modified")
+        if data_type not in DATA_TYPES:
+            raise QueryError(400, f"type must be one of {', '.join(DATA_TYPES)}")
+
+        filter_text = params.get("filter", "").lower()
+        records = self.server.service.filter(
+            file1_path, file2_path, key_columns, engine, data_type, differences[data_type], filter_text
+        )
+        name_columns = parse_columns(params["name"]) if "name" in params else key_columns
+        exact_mode = params.get("exact", "0") not in ("0", "false", "")
+        return records, data_type, headers, name_columns, filter_text, exact_mode
+
+    def compare(self, params):
+        """Counts of each kind of difference, comparing the files if needed."""
+        start = time.perf_counter()
+        _, _, _, _, differences, headers = self.comparison(params)
+        self.send_json({
+            "headers": headers,
+            "counts": {data_type: len(differences[data_type]) for data_type in DATA_TYPES},
+            "seconds": round(time.perf_counter() - start, 3)
+        })
+
+    def records(self, params):
+        """One page of the filtered records of a kind, as export JSON records."""
+        records, data_type, headers, name_columns, filter_text, exact_mode = self.selected(params)
+        offset = max(int(params.get("offset", 0)), 0)
+        limit = min(max(int(params.get("limit", DEFAULT_PAGE_SIZE)), 0), MAX_PAGE_SIZE)
+        self.send_json({
+            "type": data_type,
+            "total": len(records),
+            "offset": offset,
+            "records": [
+                json_record(record, data_type, headers, name_columns, filter_text, exact_mode)
+                for record in records[offset:offset + limit]
+            ]
+        })
+
+    def export(self, params):
+        """All filtered records of a kind in an export format, streamed."""
+        records, data_type, headers, name_columns, filter_text, exact_mode = self.selected(params)
+        output_format = params.get("format", "json")
+        if output_format not in EXPORT_FORMATS:
+            raise QueryError(400, f"format must be one of {', '.join(sorted(EXPORT_FORMATS))}")
+
+        self.responding = True
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[output_format])
+        self.end_headers()
+        f = io.TextIOWrapper(self.wfile, encoding="utf-8", newline='' if output_format == "csv" else None)
+        try:
+            EXPORT_FORMATS[output_format](f, records, data_type, headers, name_columns, filter_text, exact_mode)
+            f.flush()
+        finally:
+            # The socket file stays open for the server to close
+            f.detach()
+
+    def status(self, params):
+        """Cache usage of the service."""
+        self.send_json(self.server.service.status())
+
+    def send_json(self, value, status=200):
+        """Send a JSON response."""
+        body = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "local"
+
+class PoolMixIn:
+    """Handle each request on a fixed pool of threads.
+
+    Like socketserver.ThreadingMixIn, but the number of requests handled
+    at once is bounded; further connections wait for a free thread.
+    """
+
+    workers = DEFAULT_WORKERS
+
+    def process_request(self, request, client_address):
+        if not hasattr(self, "pool"):
+            self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="request")
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        if hasattr(self, "pool"):
+            self.pool.shutdown(wait=True)
+
+class PooledHTTPServer(PoolMixIn, HTTPServer):
+    """HTTP server on a TCP port answering requests on a thread pool."""
+
+class PooledUnixHTTPServer(PoolMixIn, socketserver.UnixStreamServer):
+    """HTTP server on a Unix socket answering requests on a thread pool."""
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None, workers=DEFAULT_WORKERS):
+    """Create a server for a DiffService on a TCP port or a Unix socket."""
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = PooledUnixHTTPServer(unix_socket, QueryHandler)
+        server.bound_host = None
+    else:
+        server = PooledHTTPServer((host, port), QueryHandler)
+        server.bound_host = server.server_address[0]
+    server.workers = workers
+    server.service = service
+    return server
+
+def parse_columns(value):
+    """Parse a comma separated list of column indices."""
+    try:
+        return [int(i) for i in value.split(",") if i.strip()]
+    except ValueError:
+        raise QueryError(400, f"expected comma separated column indices, got '{value}'")
+
+def main(argv=None):
+    """Run the query service until interrupted."""
+    parser = argparse.ArgumentParser(description="Serve comparison results to local clients")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--unix-socket", help="listen on this Unix socket instead of a port")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"requests handled at once (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--comparisons", type=int, default=DEFAULT_COMPARISONS,
+                        help=f"comparisons run at once (default: {DEFAULT_COMPARISONS})")
+    parser.add_argument("--cache-size", type=parse_size, default=DEFAULT_CACHE_BYTES,
+                        help="memory for parsed files, results and filter indexes (default: 1G)")
+    parser.add_argument("--root", help="only serve files below this directory, relative paths start there "
+                                       "(default: the working directory)")
+    args = parser.parse_args(argv)
+
+    service = DiffService(args.cache_size, args.root, args.comparisons)
+    server = make_server(service, args.host, args.port, args.unix_socket, args.workers)
+    where = args.unix_socket or "http://{}:{}".format(*server.server_address[:2])
+    print(f"Serving comparisons on {where}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.unix_socket is not None and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+import argparse
+import hashlib
+import json
+import locale
+import os
+import struct
+import sys
+
+from fingerprint import DIGEST_SIZE, diff_indexes, iter_raw_rows, make_entry, parse_raw_row
+
+# Sidecar files live next to their CSV as <name>.csv + SIDECAR_SUFFIX
+SIDECAR_SUFFIX = ".csvdiff-index"
+MAGIC = b"CSVDIFFIDX1\n"
+
+ENTRY_SIZE = DIGEST_SIZE + 8
+FIELD_LENGTH = struct.Struct("<I")
+
+# Metadata every sidecar holds, with the type of each value
+META_TYPES = {
+    "size": int,
+    "mtime_ns": int,
+    "content_hash": str,
+    "key_columns": list,
+    "encoding": str,
+    "headers": list,
+    "rows": int
+}
+
+# Block size used when hashing files and writing sidecars
+BLOCK_SIZE = 1024 * 1024
+
+def compare_snapshot(file1_path, file2_path, key_columns, write=True):
+    """Compare two CSV files using their sidecar snapshot indexes.
+
+    Missing or stale sidecars are rebuilt, and written back unless write is
+    False or they cannot be written, so each file is only parsed once
+    across recurring comparisons.
+    """
+    encoding = locale.getpreferredencoding(False)
+    index1, headers = load_or_build_index(file1_path, key_columns, True, write, encoding)
+    index2, _ = load_or_build_index(file2_path, key_columns, False, write, encoding)
+
+    return diff_indexes(file1_path, file2_path, index1, index2, headers, encoding), headers
+
+def sidecar_path(file_path):
+    """Path of the sidecar snapshot index for a CSV file."""
+    return file_path + SIDECAR_SUFFIX
+
+def load_or_build_index(file_path, key_columns, read_header=True, write=True, encoding=None):
+    """Return a fingerprint index for a file, from its sidecar when valid."""
+    encoding = encoding or locale.getpreferredencoding(False)
+    snapshot = load_snapshot(file_path, key_columns, encoding)
+    if snapshot is None:
+        snapshot = build_snapshot(file_path, key_columns, encoding, write=False)
+        if write:
+            try:
+                write_snapshot(sidecar_path(file_path), snapshot)
+            except OSError:
+                # E.g. a read-only directory; the next comparison rebuilds it
+                pass
+
+    return snapshot_index(snapshot, read_header), snapshot["headers"]
+
+def build_snapshot(file_path, key_columns, encoding=None, write=True):
+    """Index every row of a file, header included, optionally saving a sidecar."""
+    encoding = encoding or locale.getpreferredencoding(False)
+    st = os.stat(file_path)
+    hasher = hashlib.blake2b()
+    headers = []
+    records = []
+
+    with open(file_path, 'rb') as f:
+        for offset, raw in iter_raw_rows(hashed_lines(f, hasher)):
+            row = parse_raw_row(raw, encoding)
+            if not records:
+                headers = row
+            records.append((tuple(row[i] for i in key_columns), make_entry(raw, offset)))
+
+    snapshot = {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "content_hash": hasher.hexdigest(),
+        "key_columns": list(key_columns),
+        "encoding": encoding,
+        "headers": headers,
+        "records": records
+    }
+    if write:
+        write_snapshot(sidecar_path(file_path), snapshot)
+    return snapshot
+
+def hashed_lines(f, hasher):
+    """Iterate over the lines of a binary file while hashing them."""
+    for line in f:
+        hasher.update(line)
+        yield line
+
+def snapshot_index(snapshot, read_header=True):
+    """Turn snapshot records into the key -> entry index build_index returns."""
+    records = snapshot["records"]
+    if read_header:
+        records = records[1:]
+    return dict(records)
+
+def write_snapshot(path, snapshot):
+    """Write a snapshot to a sidecar file atomically."""
+    meta = {name: value for name, value in snapshot.items() if name != "records"}
+    meta["rows"] = len(snapshot["records"])
+    write_sidecar(path, meta, snapshot["records"])
+
+def write_sidecar(path, meta, records, magic=MAGIC):
+    """Write JSON metadata and (key, entry) records to a file atomically."""
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(magic)
+            f.write(json.dumps(meta).encode("utf-8") + b"\n")
+
+            buffer = bytearray()
+            for key, entry in records:
+                pack_record(buffer, key, entry)
+                if len(buffer) >= BLOCK_SIZE:
+                    f.write(buffer)
+                    buffer.clear()
+            f.write(buffer)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def pack_record(buffer, key, entry):
+    """Append a (key, entry) record to a bytearray, as sidecars store them."""
+    buffer += entry
+    for field in key:
+        data = field.encode("utf-8", "surrogatepass")
+        buffer += FIELD_LENGTH.pack(len(data))
+        buffer += data
+
+def read_snapshot_meta(path):
+    """Read the metadata of a sidecar file, or None if it is not a sidecar.
+
+    Metadata missing a value of META_TYPES, e.g. of a truncated file, is
+    not a sidecar either.
+    """
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            meta = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(meta, dict):
+        return None
+    for name, value_type in META_TYPES.items():
+        if not isinstance(meta.get(name), value_type):
+            return None
+    return meta
+
+def read_snapshot(path):
+    """Read a whole sidecar file into a snapshot dictionary."""
+    snapshot, data = read_sidecar(path)
+    snapshot["records"], _ = read_records(data, snapshot.pop("rows"), len(snapshot["key_columns"]))
+    return snapshot
+
+def read_sidecar(path, magic=MAGIC):
+    """Read the JSON metadata and the undecoded records of a sidecar file."""
+    with open(path, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"{path} is not a csvdiff sidecar file")
+        meta = json.loads(f.readline())
+        return meta, f.read()
+
+def read_records(data, count, key_count, pos=0):
+    """Decode count (key, entry) records from data at pos; returns them and the end."""
+    records = []
+    for _ in range(count):
+        entry = data[pos:pos + ENTRY_SIZE]
+        pos += ENTRY_SIZE
+        key = []
+        for _ in range(key_count):
+            (length,) = FIELD_LENGTH.unpack_from(data, pos)
+            pos += FIELD_LENGTH.size
+            key.append(data[pos:pos + length].decode("utf-8", "surrogatepass"))
+            pos += length
+        records.append((tuple(key), entry))
+    return records, pos
+
+def load_snapshot(file_path, key_columns, encoding=None):
+    """Load a file's sidecar if it matches the file and settings, else None.
+
+    Size and mtime are checked first. A sidecar whose size matches but whose
+    mtime does not, e.g. after a copy, is accepted if the content hash does.
+    """
+    encoding = encoding or locale.getpreferredencoding(False)
+    path = sidecar_path(file_path)
+    meta = read_snapshot_meta(path)
+    if (meta is None or meta["key_columns"] != list(key_columns) or
+            meta["encoding"] != encoding or check_snapshot(file_path, meta) != "ok"):
+        return None
+
+    try:
+        return read_snapshot(path)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+
+def check_snapshot(file_path, meta, full=False):
+    """Check sidecar metadata against its file: 'ok', 'stale' or 'missing'.
+
+    With full=True the content hash is always compared.
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return "missing"
+
+    if st.st_size != meta["size"]:
+        return "stale"
+    if st.st_mtime_ns == meta["mtime_ns"] and not full:
+        return "ok"
+    return "ok" if content_hash(file_path) == meta["content_hash"] else "stale"
+
+def content_hash(file_path):
+    """blake2b hex digest of a file's bytes."""
+    hasher = hashlib.blake2b()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def verify_snapshot(file_path):
+    """Fully verify a file's sidecar: 'ok', 'stale', 'missing' or 'invalid'."""
+    meta = read_snapshot_meta(sidecar_path(file_path))
+    if meta is None:
+        return "missing" if not os.path.exists(sidecar_path(file_path)) else "invalid"
+    return check_snapshot(file_path, meta, full=True)
+
+def prune_snapshots(directory, recursive=False, dry_run=False):
+    """Remove sidecars whose CSV file is gone or has changed.
+
+    Returns the paths of the removed sidecars.
+    """
+    removed = []
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(SIDECAR_SUFFIX):
+                continue
+            path = os.path.join(root, name)
+            meta = read_snapshot_meta(path)
+            if meta is None or check_snapshot(path[:-len(SIDECAR_SUFFIX)], meta) != "ok":
+                if not dry_run:
+                    os.remove(path)
+                removed.append(path)
+        if not recursive:
+            break
+    return removed
+
+def main(argv=None):
+    """Command line interface to build, verify and prune snapshot indexes."""
+    parser = argparse.ArgumentParser(description="Manage CSV snapshot indexes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build sidecar indexes for CSV files")
+    build.add_argument("files", nargs="+")
+    build.add_argument("-k", "--key-columns", default="0",
+                       help="comma separated key column indices (default: 0)")
+
+    verify = commands.add_parser("verify", help="check sidecar indexes against their files")
+    verify.add_argument("files", nargs="+")
+
+    prune = commands.add_parser("prune", help="remove stale or orphaned sidecar indexes")
+    prune.add_argument("directories", nargs="+")
+    prune.add_argument("-r", "--recursive", action="store_true")
+    prune.add_argument("-n", "--dry-run", action="store_true")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        key_columns = [int(i) for i in args.key_columns.split(",")]
+        for file_path in args.files:
+            snapshot = build_snapshot(file_path, key_columns)
+            print(f"{sidecar_path(file_path)}: {len(snapshot['records'])} rows")
+        return 0
+
+    if args.command == "verify":
+        failed = 0
+        for file_path in args.files:
+            status = verify_snapshot(file_path)
+            failed += status != "ok"
+            print(f"{file_path}: {status}")
+        return 1 if failed else 0
+
+    for directory in args.directories:
+        for path in prune_snapshots(directory, args.recursive, args.dry_run):
+            print(f"{'would remove' if args.dry_run else 'removed'} {path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def peak_rss_kb():
+    """Peak resident set size of this process and its children in KB."""
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    # ru_maxrss is in bytes on macOS and in KB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def measure_phase(stats, name, **counters):
+    """stats.phase(name), or a throwaway phase when stats is None."""
+    if stats is None:
+        return nullcontext(PhaseStats(name))
+    return stats.phase(name, **counters)
+
+class PhaseStats:
+    """Time, row and byte counts and peak memory of one named phase."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.bytes_read = 0
+        self.peak_rss_kb = None
+        self.peak_traced_kb = None
+
+    def to_dict(self):
+        """Phase figures as a plain dictionary."""
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "seconds": round(self.seconds, 6),
+            "rows": self.rows,
+            "bytes_read": self.bytes_read,
+            "peak_rss_kb": self.peak_rss_kb,
+            "peak_traced_kb": self.peak_traced_kb
+        }
+
+class ComparisonStats:
+    """Per-phase timings and counters of a comparison and what follows it.
+
+    Pass one to compare_csv_files to have it filled in. Phases entered more
+    than once, like rendering pages, add up. Peak RSS is the process peak
+    when a phase ends; with trace_memory the peak of Python allocations
+    during each phase is recorded as well, at a noticeable cost in speed.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.engine = None
+        self.files = []
+        self.phases = {}
+        self.trace_memory = trace_memory
+        self.created = time.time()
+
+    @contextmanager
+    def phase(self, name, rows=0, bytes_read=0):
+        """Time a block as the named phase, yielding its PhaseStats.
+
+        The block can add to the phase's rows and bytes_read as it goes.
+        """
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = PhaseStats(name)
+
+        tracing = self.trace_memory
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+
+        phase.calls += 1
+        phase.rows += rows
+        phase.bytes_read += bytes_read
+        start = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds += time.perf_counter() - start
+            phase.peak_rss_kb = peak_rss_kb()
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] // 1024
+                phase.peak_traced_kb = max(phase.peak_traced_kb or 0, peak)
+
+    @property
+    def total_seconds(self):
+        """Time spent in all phases."""
+        return sum(phase.seconds for phase in self.phases.values())
+
+    def to_dict(self):
+        """All figures as a plain dictionary."""
+        return {
+            "engine": self.engine,
+            "files": self.files,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.created)),
+            "total_seconds": round(self.total_seconds, 6),
+            "phases": [phase.to_dict() for phase in self.phases.values()]
+        }
+
+    def write_json(self, output):
+        """Write the figures as JSON to a path or an open text file."""
+        if hasattr(output, "write"):
+            json.dump(self.to_dict(), output, indent=2)
+            output.write("\n")
+            return
+
+        with open(output, 'w', encoding='utf-8') as f:
+            self.write_json(f)
+
+    def summary_lines(self):
+        """Readable one line summary per phase."""
+        megabytes = 1024 * 1024
+        lines = [f"Engine: {self.engine or 'unknown'}, {self.total_seconds:.3f} s in total"]
+        for phase in self.phases.values():
+            line = f"{phase.name}: {phase.seconds:.3f} s"
+            if phase.calls > 1:
+                line += f" in {phase.calls} calls"
+            if phase.rows:
+                line += f", {phase.rows:,} rows"
+            if phase.bytes_read:
+                line += f", {phase.bytes_read / megabytes:,.1f} MB read"
+            if phase.peak_traced_kb is not None:
+                line += f", peak allocated {phase.peak_traced_kb / 1024:,.1f} MB"
+            if phase.peak_rss_kb is not None:
+                line += f", peak RSS {phase.peak_rss_kb / 1024:,.1f} MB"
+            lines.append(line)
+        return lines
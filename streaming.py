@@ -0,0 +1,193 @@
+import csv
+import heapq
+import os
+import tempfile
+from itertools import groupby
+
+from compressed import open_csv
+from csvdiff import RowRecord, modified_record, read_headers
+
+# Default amount of row data held in memory before a sorted run is spilled
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Maximum number of runs merged at once; more runs are merged in passes
+MAX_MERGE_FAN_IN = 64
+
+# Rough per-object overheads used to estimate the in-memory size of a row
+ROW_OVERHEAD = 120
+CELL_OVERHEAD = 57
+
+def compare_sorted(file1_path, file2_path, key_columns, memory_budget=DEFAULT_MEMORY_BUDGET,
+                   assume_sorted=False, temp_dir=None):
+    """Compare two CSV files with a sort-merge join using bounded memory."""
+    differences = {
+        "only_in_file1": [],
+        "only_in_file2": [],
+        "modified": []
+    }
+
+    headers = read_headers(file1_path)
+    for kind, record in iter_differences(
+        file1_path, file2_path, key_columns, headers,
+        memory_budget=memory_budget, assume_sorted=assume_sorted, temp_dir=temp_dir
+    ):
+        differences[kind].append(record)
+
+    return differences, headers
+
+def iter_differences(file1_path, file2_path, key_columns, headers,
+                     memory_budget=DEFAULT_MEMORY_BUDGET, assume_sorted=False, temp_dir=None):
+    """Yield (kind, record) pairs by walking both files in key order."""
+    # Each file gets half of the budget since both are sorted side by side
+    budget = memory_budget // 2
+
+    with tempfile.TemporaryDirectory(prefix="csvdiff_", dir=temp_dir) as work_dir:
+        rows1 = iter_sorted_rows(file1_path, key_columns, budget, True, assume_sorted, work_dir)
+        rows2 = iter_sorted_rows(file2_path, key_columns, budget, False, assume_sorted, work_dir)
+
+        yield from merge_join(rows1, rows2, headers)
+
+def merge_join(rows1, rows2, headers):
+    """Merge two key-ordered (key, row) streams into difference records."""
+    sentinel = (None, None)
+    key1, row1 = next(rows1, sentinel)
+    key2, row2 = next(rows2, sentinel)
+
+    while row1 is not None or row2 is not None:
+        if row2 is None or (row1 is not None and key1 < key2):
+            yield "only_in_file1", RowRecord(key1, row1)
+            key1, row1 = next(rows1, sentinel)
+        elif row1 is None or key2 < key1:
+            yield "only_in_file2", RowRecord(key2, row2)
+            key2, row2 = next(rows2, sentinel)
+        else:
+            if row1 != row2:
+                yield "modified", modified_record(key1, row1, row2, headers)
+            key1, row1 = next(rows1, sentinel)
+            key2, row2 = next(rows2, sentinel)
+
+def iter_sorted_rows(file_path, key_columns, memory_budget, read_header=True,
+                     assume_sorted=False, work_dir=None):
+    """Yield unique (key, row) pairs of a CSV file in key order.
+
+    When a key occurs more than once the last row wins, matching read_csv_data.
+    """
+    with open_csv(file_path) as f:
+        reader = csv.reader(f)
+        if read_header:
+            next(reader, None)
+
+        keyed = ((tuple(row[i] for i in key_columns), row) for row in reader)
+        if assume_sorted:
+            yield from last_per_key(check_sorted(keyed, file_path))
+            return
+
+        in_memory, runs = spill_sorted_runs(keyed, memory_budget, work_dir)
+
+    if not runs:
+        # Everything fitted in the budget, so no temp files were written
+        yield from last_per_key(iter(in_memory))
+        return
+
+    runs = reduce_runs(runs, key_columns, work_dir)
+    readers = [iter_run(path, key_columns) for path in runs]
+    try:
+        yield from last_per_key(heapq.merge(*readers, key=run_sort_key))
+    finally:
+        for reader in readers:
+            reader.close()
+        for path in runs:
+            remove_quietly(path)
+
+def spill_sorted_runs(keyed_rows, memory_budget, work_dir):
+    """Sort rows in budget-sized chunks, writing each chunk to a run file.
+
+    Returns (rows, runs): the sorted (key, row) list when the input fits in
+    memory and no runs, otherwise an empty list and the run file paths in
+    file order.
+    """
+    runs = []
+    buffer = []
+    used = 0
+
+    for key, row in keyed_rows:
+        buffer.append((key, row))
+        used += estimate_row_size(row)
+        if used >= memory_budget:
+            runs.append(write_run(buffer, work_dir))
+            buffer = []
+            used = 0
+
+    if not runs:
+        # Stable sort keeps duplicate keys in file order
+        buffer.sort(key=run_sort_key)
+        return buffer, []
+
+    if buffer:
+        runs.append(write_run(buffer, work_dir))
+    return [], runs
+
+def reduce_runs(runs, key_columns, work_dir):
+    """Merge runs in passes until no more than MAX_MERGE_FAN_IN remain."""
+    while len(runs) > MAX_MERGE_FAN_IN:
+        merged = []
+        for start in range(0, len(runs), MAX_MERGE_FAN_IN):
+            group = runs[start:start + MAX_MERGE_FAN_IN]
+            readers = [iter_run(path, key_columns) for path in group]
+            try:
+                merged.append(write_run(heapq.merge(*readers, key=run_sort_key), work_dir, presorted=True))
+            finally:
+                for reader in readers:
+                    reader.close()
+                for path in group:
+                    remove_quietly(path)
+        runs = merged
+    return runs
+
+def write_run(keyed_rows, work_dir, presorted=False):
+    """Write (key, row) pairs to a temporary run file and return its path."""
+    if not presorted:
+        keyed_rows.sort(key=run_sort_key)
+
+    fd, path = tempfile.mkstemp(suffix=".run", dir=work_dir)
+    with open(fd, 'w', newline='', encoding='utf-8', errors='surrogatepass') as f:
+        writer = csv.writer(f)
+        writer.writerows(row for _, row in keyed_rows)
+    return path
+
+def iter_run(path, key_columns):
+    """Read (key, row) pairs back from a run file."""
+    with open(path, 'r', newline='', encoding='utf-8', errors='surrogatepass') as f:
+        for row in csv.reader(f):
+            yield tuple(row[i] for i in key_columns), row
+
+def run_sort_key(item):
+    """Sort key for (key, row) pairs."""
+    return item[0]
+
+def last_per_key(keyed_rows):
+    """Collapse runs of equal keys to their last row."""
+    for key, group in groupby(keyed_rows, key=run_sort_key):
+        for _, row in group:
+            pass
+        yield key, row
+
+def check_sorted(keyed_rows, file_path):
+    """Pass through (key, row) pairs, failing if keys are out of order."""
+    previous = None
+    for key, row in keyed_rows:
+        if previous is not None and key < previous:
+            raise ValueError(f"{file_path} is not sorted by the key columns")
+        previous = key
+        yield key, row
+
+def estimate_row_size(row):
+    """Cheap estimate of the memory used by a parsed row."""
+    return ROW_OVERHEAD + CELL_OVERHEAD * len(row) + sum(map(len, row))
+
+def remove_quietly(path):
+    """Remove a file, ignoring files that are already gone."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,54 @@
+import os
+
+import batch
+
+def write(path, text):
+    with open(path, "w", newline="") as f:
+        f.write(text)
+    return str(path)
+
+compare_pair = batch.compare_pair
+
+def dying_compare_pair(name, *args):
+    """compare_pair whose worker process dies for the pair named "bad"."""
+    if name == "bad":
+        os._exit(1)
+    return compare_pair(name, *args)
+
+def test_same_rows_in_other_bytes_are_unchanged(tmp_path):
+    file1 = write(tmp_path / "a.csv", "id,value\n1,a\n2,b\n")
+    file2 = write(tmp_path / "b.csv", 'id,value\n2,b\n1,"a"\n')
+    entry = batch.compare_pair("pair", file1, file2, str(tmp_path), [0], [0], "json", "memory")
+    assert entry["status"] == "unchanged"
+    assert entry["only_in_file2"] == 0
+
+def test_dead_worker_is_reported_as_error(tmp_path, monkeypatch):
+    file1 = write(tmp_path / "a.csv", "id,value\n1,a\n")
+    file2 = write(tmp_path / "b.csv", "id,value\n1,b\n")
+    monkeypatch.setattr(batch, "compare_pair", dying_compare_pair)
+
+    pairs = [("bad", file1, file2), ("good", file1, file2)]
+    entries = batch.run_batch(pairs, str(tmp_path / "out"), jobs=1)
+    statuses = {entry["name"]: entry["status"] for entry in entries}
+    assert statuses == {"bad": "error", "good": "changed"}
+
+def test_pairs_running_beside_a_dead_worker_are_retried(tmp_path, monkeypatch):
+    file1 = write(tmp_path / "a.csv", "id,value\n1,a\n")
+    file2 = write(tmp_path / "b.csv", "id,value\n1,b\n")
+    monkeypatch.setattr(batch, "compare_pair", dying_compare_pair)
+
+    pairs = [("bad", file1, file2)] + [(f"good{i}", file1, file2) for i in range(5)]
+    entries = batch.run_batch(pairs, str(tmp_path / "out"), jobs=3)
+    statuses = {entry["name"]: entry["status"] for entry in entries}
+    assert statuses.pop("bad") == "error"
+    assert set(statuses.values()) == {"changed"}
+
+def test_manifest_names_stay_in_output_dir(tmp_path):
+    file1 = write(tmp_path / "a.csv", "id,value\n1,a\n")
+    file2 = write(tmp_path / "b.csv", "id,value\n1,b\n")
+    manifest = write(tmp_path / "pairs.csv", "name,file1,file2\n../x,a.csv,b.csv\n/abs/y,a.csv,b.csv\n")
+    output_dir = tmp_path / "out"
+
+    assert batch.main(["--manifest", manifest, "--output-dir", str(output_dir), "--jobs", "1"]) == 1
+    assert sorted(os.listdir(output_dir)) == ["abs", "summary.csv", "summary.json", "x.diff.json"]
+    assert not os.path.exists(tmp_path / "x.diff.json")
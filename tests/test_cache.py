@@ -0,0 +1,26 @@
+from collections.abc import Sequence
+
+from cache import SIZE_SAMPLE_RECORDS, estimate_differences_size
+from csvdiff import RowRecord
+
+class LazyRecords(Sequence):
+    """Records built on access, counting how many were built."""
+
+    def __init__(self, count):
+        self.count = count
+        self.built = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        self.built += 1
+        return RowRecord((str(index),), [str(index), "value"])
+
+def test_lazy_records_are_sampled():
+    lazy = LazyRecords(100000)
+    listed = [RowRecord((str(i),), [str(i), "value"]) for i in range(100000)]
+
+    estimate = estimate_differences_size({"only_in_file1": lazy})
+    assert lazy.built == SIZE_SAMPLE_RECORDS
+    assert abs(estimate - estimate_differences_size({"only_in_file1": listed})) < estimate // 10
@@ -0,0 +1,31 @@
+import pytest
+
+import cli
+
+def write(path, text):
+    with open(path, "w", newline="") as f:
+        f.write(text)
+    return str(path)
+
+@pytest.mark.parametrize("engine", ["memory", "sorted", "fingerprint", "chunked"])
+def test_matching_files_exit_0(tmp_path, engine):
+    file1 = write(tmp_path / "a.csv", "id,value\n1,a\n2,b\n")
+    file2 = write(tmp_path / "b.csv", 'id,value\n2,b\n1,"a"\n')
+    assert cli.main([file1, file2, "-e", engine, "-o", str(tmp_path / "out.txt")]) == 0
+
+def test_differing_files_exit_1(tmp_path):
+    file1 = write(tmp_path / "a.csv", "id,value\n1,a\n")
+    file2 = write(tmp_path / "b.csv", "id,value\n1,b\n")
+    assert cli.main([file1, file2, "-o", str(tmp_path / "out.txt")]) == 1
+
+def test_header_key_in_data_is_still_reported(tmp_path):
+    # A data row with the header's key replaces it, so it is a real difference
+    file1 = write(tmp_path / "a.csv", "id,value\n1,a\n")
+    file2 = write(tmp_path / "b.csv", "id,value\n1,a\nid,x\n")
+    assert cli.main([file1, file2, "-o", str(tmp_path / "out.txt")]) == 1
+
+def test_empty_file_exits_2(tmp_path, capsys):
+    file1 = write(tmp_path / "a.csv", "")
+    file2 = write(tmp_path / "b.csv", "id,value\n1,a\n")
+    assert cli.main([file1, file2, "-o", str(tmp_path / "out.txt")]) == 2
+    assert "is empty" in capsys.readouterr().err
@@ -0,0 +1,326 @@
+"""Every engine must report the same differences as the memory engine."""
+import bz2
+import csv
+import gzip
+import lzma
+import os
+import random
+
+import pytest
+
+import chunked
+import incremental
+import parallel
+import snapshot
+from csvdiff import ENGINES, OFFSET_ENGINES, PROJECTION_ENGINES, compare_csv_files, get_engine, read_csv_data
+from progress import Progress
+
+# Engines compared against the memory engine; positional has no key
+KEYED_ENGINES = sorted(name for name in ENGINES if name not in ("memory", "positional"))
+
+# Engines that can read compressed files
+STREAM_ENGINES = sorted(name for name in KEYED_ENGINES if name not in OFFSET_ENGINES)
+
+CASES = {
+    "plain": (
+        "id,name,value\n1,a,10\n2,b,20\n3,c,30\n4,d,40\n",
+        "id,name,value\n1,a,10\n2,b,21\n4,d,40\n5,e,50\n"
+    ),
+    "quoted multi-line fields": (
+        'id,note,value\n1,"first\nline",10\n2,"a, b",20\n3,"say ""hi""",30\n4,"x\r\ny",40\n',
+        'id,note,value\n1,"first\nline",10\n2,"a, c",20\n3,"say ""hi""",31\n4,"x\r\ny\nz",40\n'
+    ),
+    "same fields with other quoting": (
+        'id,name\n1,a\n2,"b"\n3,c\n',
+        'id,name\n1,"a"\n2,b\n3,"c "\n'
+    ),
+    "duplicate keys": (
+        "id,value\n1,a\n2,b\n1,c\n3,d\n2,e\n",
+        "id,value\n2,b\n1,c\n3,x\n3,d\n4,f\n4,g\n"
+    ),
+    "crlf line endings": (
+        "id,value\r\n1,a\r\n2,b\r\n3,c\r\n",
+        "id,value\r\n1,a\r\n2,x\r\n4,d\r\n"
+    ),
+    "last row without a line ending": (
+        "id,value\n1,a\n2,b\n3,c",
+        'id,value\n1,a\n2,b\n3,"c\nd"'
+    ),
+    "identical": (
+        "id,value\n1,a\n2,b\n",
+        "id,value\n1,a\n2,b\n"
+    ),
+}
+
+def write(path, text):
+    """Write text to a file without newline translation."""
+    with open(path, "w", newline="") as f:
+        f.write(text)
+    return str(path)
+
+def normalized(differences):
+    """Differences as sorted plain values, since the sorted engine orders by key."""
+    return {
+        kind: sorted(
+            (record["key"], list(record["row"]), list(record.get("row2", [])),
+             record.get("changes", []) and [sorted(c.items()) for c in record["changes"]])
+            for record in records
+        )
+        for kind, records in differences.items()
+    }
+
+def run_engine(engine, file1, file2, key_columns=(0,)):
+    """Compare two files with an engine, returning normalized differences and headers."""
+    if engine == "columnar":
+        pytest.importorskip("numpy")
+    differences, headers = get_engine(engine)(file1, file2, list(key_columns))
+    return normalized(differences), list(headers)
+
+def random_csv(rng, rows, values):
+    """Random CSV text with duplicate keys, quoted, multi-line fields and stray quotes."""
+    lines = ["id,a,b"]
+    for _ in range(rows):
+        fields = [str(rng.randrange(rows))]
+        for _ in range(2):
+            value = rng.choice(values)
+            if "," in value or "\n" in value or value.startswith('"'):
+                value = '"' + value.replace('"', '""') + '"'
+            fields.append(value)
+        lines.append(",".join(fields))
+    return "\n".join(lines) + "\n"
+
+@pytest.fixture(autouse=True)
+def small_pieces(monkeypatch):
+    """Let the parallel and chunked engines cut even small test files into many pieces."""
+    monkeypatch.setattr(parallel, "MIN_RANGE_SIZE", 16)
+    monkeypatch.setattr(chunked, "MIN_CHUNK_ROWS", 1)
+    monkeypatch.setattr(chunked, "BOUNDARY_MASK", 1)
+
+@pytest.mark.parametrize("engine", KEYED_ENGINES)
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_engine_matches_memory(tmp_path, engine, case):
+    file1 = write(tmp_path / "a.csv", CASES[case][0])
+    file2 = write(tmp_path / "b.csv", CASES[case][1])
+    assert run_engine(engine, file1, file2) == run_engine("memory", file1, file2)
+
+@pytest.mark.parametrize("engine", KEYED_ENGINES)
+def test_quote_in_unquoted_field(tmp_path, engine):
+    # A quote inside an unquoted field is an ordinary character and must
+    # not join the following lines into one record
+    rows = [f'{i},"item\n{i}",{i}' if i % 5 == 0 else f"{i},item {i},{i}" for i in range(1, 400)]
+    changed = [row + "0" if i % 50 == 0 else row for i, row in enumerate(rows, 1)]
+    file1 = write(tmp_path / "a.csv", 'id,name,value\n0,5" screen,1\n' + "\n".join(rows) + "\n")
+    file2 = write(tmp_path / "b.csv", 'id,name,value\n0,5" screen,1\n' + "\n".join(changed) + "\n")
+    expected = run_engine("memory", file1, file2)
+    assert len(expected[0]["modified"]) == 7
+    assert run_engine(engine, file1, file2) == expected
+
+@pytest.mark.parametrize("engine", KEYED_ENGINES)
+def test_engine_matches_memory_on_random_files(tmp_path, engine):
+    rng = random.Random(1234)
+    values = ["x", "y", "a,b", '"q"', '5" screen', "multi\nline", ""]
+    for attempt in range(5):
+        text1 = random_csv(rng, 400, values)
+        # Mostly the same rows, so chunks and ranges line up between files
+        lines = text1.split("\n")
+        for _ in range(20):
+            row = random_csv(rng, 1, values).split("\n", 1)[1].rstrip("\n")
+            lines[rng.randrange(1, len(lines) - 1)] = row
+        file1 = write(tmp_path / f"a{attempt}.csv", text1)
+        file2 = write(tmp_path / f"b{attempt}.csv", "\n".join(lines))
+        assert run_engine(engine, file1, file2) == run_engine("memory", file1, file2)
+
+@pytest.mark.parametrize("engine", KEYED_ENGINES)
+def test_engine_matches_memory_on_composite_keys(tmp_path, engine):
+    file1 = write(tmp_path / "a.csv", "id,part,value\n1,x,a\n1,y,b\n2,x,c\n")
+    file2 = write(tmp_path / "b.csv", "id,part,value\n1,x,a\n1,y,z\n2,y,c\n")
+    expected = run_engine("memory", file1, file2, (0, 1))
+    assert run_engine(engine, file1, file2, (0, 1)) == expected
+
+@pytest.mark.parametrize("engine", KEYED_ENGINES)
+def test_progress_is_accepted_by_every_engine(tmp_path, engine):
+    if engine == "columnar":
+        pytest.importorskip("numpy")
+    text1, text2 = CASES["plain"]
+    file1 = write(tmp_path / "a.csv", text1)
+    file2 = write(tmp_path / "b.csv", text2)
+    differences, _ = compare_csv_files(file1, file2, [0], [0], engine=engine, progress=Progress())
+    assert normalized(differences) == run_engine("memory", file1, file2)[0]
+
+@pytest.mark.parametrize("engine", sorted(set(ENGINES) - PROJECTION_ENGINES))
+def test_projection_is_refused_by_other_engines(tmp_path, engine):
+    text1, text2 = CASES["plain"]
+    file1 = write(tmp_path / "a.csv", text1)
+    file2 = write(tmp_path / "b.csv", text2)
+    with pytest.raises(ValueError, match="column projection"):
+        compare_csv_files(file1, file2, [0], [0], engine=engine, columns=[0, 1])
+
+def test_snapshot_compares_without_writable_sidecar(tmp_path):
+    text1, text2 = CASES["plain"]
+    file1 = write(tmp_path / "a.csv", text1)
+    file2 = write(tmp_path / "b.csv", text2)
+    # A directory in the sidecar's place makes writing it fail like a
+    # read-only directory would, even when running as root
+    (tmp_path / ("a.csv" + snapshot.SIDECAR_SUFFIX)).mkdir()
+
+    assert run_engine("snapshot", file1, file2) == run_engine("memory", file1, file2)
+    assert os.path.exists(snapshot.sidecar_path(file2))
+    assert not os.path.exists(snapshot.sidecar_path(file1) + ".tmp")
+
+@pytest.mark.parametrize("meta", [b"", b"{}\n", b'{"size": 1}\n', b"[1, 2]\n", b'{"size": "1"'])
+def test_snapshot_rebuilds_broken_sidecar(tmp_path, meta):
+    text1, text2 = CASES["plain"]
+    file1 = write(tmp_path / "a.csv", text1)
+    file2 = write(tmp_path / "b.csv", text2)
+    with open(snapshot.sidecar_path(file1), "wb") as f:
+        f.write(snapshot.MAGIC + meta)
+
+    assert snapshot.verify_snapshot(file1) == "invalid"
+    assert run_engine("snapshot", file1, file2) == run_engine("memory", file1, file2)
+    assert snapshot.verify_snapshot(file1) == "ok"
+
+    with open(snapshot.sidecar_path(file1), "wb") as f:
+        f.write(snapshot.MAGIC + meta)
+    assert snapshot.prune_snapshots(str(tmp_path)) == [snapshot.sidecar_path(file1)]
+
+@pytest.mark.parametrize("engine", ["memory"] + STREAM_ENGINES)
+@pytest.mark.parametrize("suffix, opener", [(".gz", gzip.open), (".bz2", bz2.open), (".xz", lzma.open)])
+def test_compressed_input(tmp_path, engine, suffix, opener):
+    text1, text2 = CASES["quoted multi-line fields"]
+    plain1 = write(tmp_path / "a.csv", text1)
+    plain2 = write(tmp_path / "b.csv", text2)
+    packed1 = str(tmp_path / ("a.csv" + suffix))
+    packed2 = str(tmp_path / ("b.csv" + suffix))
+    for path, text in ((packed1, text1), (packed2, text2)):
+        with opener(path, "wb") as f:
+            f.write(text.encode())
+
+    assert run_engine(engine, packed1, packed2) == run_engine("memory", plain1, plain2)
+
+@pytest.mark.parametrize("engine", sorted(OFFSET_ENGINES))
+def test_offset_engines_reject_compressed_input(tmp_path, engine):
+    file1 = str(tmp_path / "a.csv.gz")
+    with gzip.open(file1, "wb") as f:
+        f.write(b"id\n1\n")
+    with pytest.raises(ValueError):
+        compare_csv_files(file1, file1, [0], [0], engine=engine)
+
+def test_incremental_sees_rewritten_middle(tmp_path):
+    rows = [f"{i},{'x' * 20}" for i in range(20000)]
+    file1 = write(tmp_path / "a.csv", "id,value\n" + "\n".join(rows) + "\n")
+    file2 = write(tmp_path / "b.csv", "id,value\n" + "\n".join(rows) + "\n")
+    assert run_engine("incremental", file1, file2) == run_engine("memory", file1, file2)
+
+    # Same size, changed far from both ends of the file
+    rows[10000] = f"10000,{'y' * 20}"
+    write(tmp_path / "b.csv", "id,value\n" + "\n".join(rows) + "\n")
+    st = os.stat(file2)
+    os.utime(file2, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    expected = run_engine("memory", file1, file2)
+    assert len(expected[0]["modified"]) == 1
+    assert run_engine("incremental", file1, file2) == expected
+
+def test_incremental_rereads_a_completed_last_row(tmp_path):
+    file1 = write(tmp_path / "a.csv", "id,value\n1,a\n2,b\n")
+    file2 = write(tmp_path / "b.csv", "id,value\n1,a\n2,b")
+    assert run_engine("incremental", file1, file2) == run_engine("memory", file1, file2)
+
+    with open(file2, "a", newline="") as f:
+        f.write("x\n3,c\n")
+    st = os.stat(file2)
+    os.utime(file2, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    expected = run_engine("memory", file1, file2)
+    assert len(expected[0]["modified"]) == 1
+    assert run_engine("incremental", file1, file2) == expected
+
+def test_incremental_state_round_trip(tmp_path):
+    text1, text2 = CASES["quoted multi-line fields"]
+    file1 = write(tmp_path / "a.csv", text1)
+    file2 = write(tmp_path / "b.csv", text2)
+    expected = run_engine("memory", file1, file2)
+    assert run_engine("incremental", file1, file2) == expected
+
+    comparison = incremental.load_comparison(incremental.state_file_path(file1))
+    assert comparison is not None
+    differences, _ = comparison.refresh()
+    assert comparison.last_refresh == "unchanged"
+    assert normalized(differences) == expected[0]
+
+def test_incremental_compares_without_writable_state(tmp_path):
+    text1, text2 = CASES["plain"]
+    file1 = write(tmp_path / "a.csv", text1)
+    file2 = write(tmp_path / "b.csv", text2)
+    os.mkdir(incremental.state_file_path(file1))
+
+    assert run_engine("incremental", file1, file2) == run_engine("memory", file1, file2)
+
+def test_positional_aligns_repetitive_rows(tmp_path):
+    rows = [f"{i % 3},x" for i in range(3000)]
+    inserted = list(rows)
+    for position in (2500, 1700, 900, 40):
+        inserted.insert(position, "new,row")
+    file1 = write(tmp_path / "a.csv", "\n".join(["id,value"] + rows) + "\n")
+    file2 = write(tmp_path / "b.csv", "\n".join(["id,value"] + inserted) + "\n")
+
+    differences, _ = run_engine("positional", file1, file2)
+    assert len(differences["only_in_file2"]) == 4
+    assert not differences["modified"]
+    assert not differences["only_in_file1"]
+
+@pytest.mark.parametrize("quote", ["", '"'])
+def test_field_size_limit_applies_without_quotes(tmp_path, quote):
+    file_path = write(tmp_path / "a.csv", f"id,value\n1,{quote}{'x' * 10}{quote}\n2,{'y' * 11}\n")
+    limit = csv.field_size_limit(10)
+    try:
+        with pytest.raises(csv.Error, match="field limit"):
+            read_csv_data(file_path, [0])
+    finally:
+        csv.field_size_limit(limit)
+
+def test_incremental_appends_updates_to_its_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental, "HASH_BLOCK_SIZE", 64)
+    rng = random.Random(7)
+    values = ["a", "b", "c, d", 'say "hi"', "two\nlines"]
+    text1, text2 = random_csv(rng, 30, values), random_csv(rng, 30, values)
+    file1 = write(tmp_path / "a.csv", text1)
+    file2 = write(tmp_path / "b.csv", text2)
+    state_path = incremental.state_file_path(file1)
+    assert run_engine("incremental", file1, file2) == run_engine("memory", file1, file2)
+
+    for step in range(12):
+        with open(state_path, "rb") as f:
+            state = f.read()
+        path = file1 if step % 3 == 0 else file2
+        with open(path, "a", newline="") as f:
+            f.write(random_csv(rng, 30, values).split("\n", 1)[1])
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+        assert run_engine("incremental", file1, file2) == run_engine("memory", file1, file2)
+        with open(state_path, "rb") as f:
+            assert f.read().startswith(state)
+
+    # A state file cut short in its last update loses only that update
+    with open(state_path, "r+b") as f:
+        f.truncate(os.path.getsize(state_path) - 5)
+    assert run_engine("incremental", file1, file2) == run_engine("memory", file1, file2)
+    comparison = incremental.load_comparison(state_path)
+    differences, _ = comparison.refresh()
+    assert comparison.last_refresh == "unchanged"
+    assert normalized(differences) == run_engine("memory", file1, file2)[0]
+
+def test_incremental_sees_rewrite_without_growth(tmp_path, monkeypatch):
+    monkeypatch.setattr(incremental, "HASH_BLOCK_SIZE", 64)
+    rows = [f"{i},{'x' * 20}" for i in range(200)]
+    file1 = write(tmp_path / "a.csv", "id,value\n" + "\n".join(rows) + "\n")
+    file2 = write(tmp_path / "b.csv", "id,value\n" + "\n".join(rows) + "\n")
+    assert run_engine("incremental", file1, file2) == run_engine("memory", file1, file2)
+
+    # Same size, changed in a block that a grown file would not have checked
+    rows[100] = f"100,{'y' * 20}"
+    write(tmp_path / "b.csv", "id,value\n" + "\n".join(rows) + "\n")
+    st = os.stat(file2)
+    os.utime(file2, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    expected = run_engine("memory", file1, file2)
+    assert len(expected[0]["modified"]) == 1
+    assert run_engine("incremental", file1, file2) == expected
@@ -0,0 +1,64 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+import server
+
+@pytest.fixture
+def service_url(tmp_path):
+    """A running server serving tmp_path, as (host, port)."""
+    for name in ("a.csv", "b.csv"):
+        (tmp_path / name).write_text("id,value\n1,a\n2,b\n")
+    service = server.DiffService(root=str(tmp_path))
+    httpd = server.make_server(service, port=0, workers=2)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[:2]
+    httpd.shutdown()
+    httpd.server_close()
+    service.close()
+
+def get(address, path, host=None):
+    """Send a GET request and return (status, decoded JSON body)."""
+    connection = http.client.HTTPConnection(*address)
+    try:
+        connection.putrequest("GET", path, skip_host=host is not None)
+        if host is not None:
+            connection.putheader("Host", host)
+        connection.endheaders()
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+def test_compare(service_url):
+    status, body = get(service_url, "/compare?file1=a.csv&file2=b.csv")
+    assert status == 200
+    assert body["headers"] == ["id", "value"]
+
+@pytest.mark.parametrize("path", ["/etc/passwd", "../outside.csv"])
+def test_files_outside_root_are_refused(service_url, path):
+    status, body = get(service_url, f"/export?file1={path}&file2=b.csv")
+    assert status == 403
+
+def test_foreign_host_is_refused(service_url):
+    status, body = get(service_url, "/status", host="attacker.example:8765")
+    assert status == 403
+    assert get(service_url, "/status", host="localhost:8765")[0] == 200
+
+def test_unexpected_errors_answer_500(service_url, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(server.DiffService, "compare", broken)
+
+    status, body = get(service_url, "/compare?file1=a.csv&file2=b.csv")
+    assert status == 500
+    assert "boom" in body["error"]
+
+@pytest.mark.parametrize("engine", sorted(server.STATE_ENGINES))
+def test_engines_writing_files_are_refused(service_url, tmp_path, engine):
+    status, body = get(service_url, f"/compare?file1=a.csv&file2=b.csv&engine={engine}")
+    assert status == 400
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.csv", "b.csv"]